@@ -8,6 +8,9 @@ HEIGHT = 600
 TRACK_WIDTH = 100
 NUM_TRACK_POINTS = 6
 NUM_CURVE_POINTS = 100
+SENSING_TOLERANCE = 0.5  # Pixels the sensed track boundaries may stray from the drawn ones, see resample_centreline
+TRACK_SEED = None  # Set to an integer to train on one fixed track, None draws a new one each time
+ACTION_REPEAT = 1  # Physics substeps per environment step, collisions are checked on each of them
 
 # Car settings
 CAR_LENGTH = 48
@@ -0,0 +1,58 @@
+import numpy as np
+from game_environment import GameEnvironment
+from config import ACTION_REPEAT
+
+class BufferedGameEnvironment:
+    """
+    Gym-style reset(seed=...) and step(action) over a GameEnvironment that fill one float32 observation
+    buffer in place and update one info dict, instead of building a new array, list and dict every step.
+    The returned observation and info are the same objects every call, copy them to keep a snapshot.
+    Sensing and the corner check reuse the simulation's scratch arrays too; only the corridor lookup
+    still builds its small per-step temporaries, which measured faster than filling buffers in place.
+    """
+    def __init__(self, env=None, observation=None, **kwargs):
+        """
+        :param env: GameEnvironment to drive, built from kwargs (headless unless given) if None
+        :param observation: Caller-owned float32 buffer of shape (env.num_observations,), allocated if None
+        """
+        kwargs.setdefault('headless', True)
+        self.env = env if env is not None else GameEnvironment(**kwargs)
+        if observation is None:
+            observation = np.zeros(self.env.num_observations, dtype=np.float32)
+        if observation.shape != (self.env.num_observations,):
+            raise ValueError(f"observation buffer must have shape ({self.env.num_observations},), "
+                             f"got {observation.shape}")
+        self.observation = observation
+        self.info = {'score': 0, 'distance': 0, 'speed': 0.0, 'steps': 0}
+
+    def reset(self, seed=None, options=None):
+        """
+        Start a new episode. The only randomness of an episode is its track, so a seed selects the
+        track as track_seed does for GameEnvironment; None keeps the current one.
+        :return: observation, info
+        """
+        if seed is not None and seed != self.env.track_seed:
+            self.env.track_seed = seed
+            self.env.initialize_track()
+        self.env.place_at_start()
+        if not self.env.headless:
+            self.env.render()
+        return self.env.observe(self.observation), self._update_info()
+
+    def step(self, action, repeat=ACTION_REPEAT):
+        """
+        Take one action as GameEnvironment.step does, held for repeat physics substeps.
+        :return: observation, reward, terminated, truncated, info. Episodes are never truncated here.
+        """
+        reward, done = self.env.advance(action, repeat)
+        if not self.env.headless:
+            self.env.render()
+        return self.env.observe(self.observation), reward, done, False, self._update_info()
+
+    def _update_info(self):
+        info = self.info
+        info['score'] = self.env.score
+        info['distance'] = self.env.distance_covered
+        info['speed'] = self.env.speed
+        info['steps'] = self.env.steps_taken
+        return info
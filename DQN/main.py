@@ -1,13 +1,23 @@
+import sys
+import os
 import pygame
 import math
 import random
 from pygame import mixer
-from track import draw_track, TRACK_WIDTH, catmull_rom_chain, generate_track
+
+# trackkit, the track code shared by every game mode, is imported from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from trackkit import TRACK_WIDTH, TrackCache, TrackCorridor
+from trackkit.render import draw_track
 
 pygame.init()
 mixer.init()
 
 NUM_POINTS = 100
+TRACK_SEED = None  # Set to an integer to replay the same track, None draws a new one every game
+TRACK_CACHE = TrackCache()
 WIDTH, HEIGHT = 800, 600
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Track Invaders")
@@ -172,7 +182,7 @@ def rules_menu():
         pygame.display.update()
 
 
-def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
+def generate_tree_positions(num_trees, track_geometry, tree_size, min_distance):
     tree_positions = []
     control_areas = [(WIDTH - 150, HEIGHT - 150, 100, 100),  # Steering wheel area
                      (0, HEIGHT - 100, 100, 100),  # Accelerator area
@@ -183,12 +193,7 @@ def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
         tree_y = random.randint(0, HEIGHT - tree_size[1])
 
         # Check if the tree is outside the track and controls
-        on_track_or_controls = False
-        for outer_point in outer_points:
-            distance = math.sqrt((tree_x - outer_point[0]) ** 2 + (tree_y - outer_point[1]) ** 2)
-            if distance < TRACK_WIDTH:
-                on_track_or_controls = True
-                break
+        on_track_or_controls = track_geometry.distance_to_outer((tree_x, tree_y)) < TRACK_WIDTH
         for area in control_areas:
             if area[0] <= tree_x <= area[0] + area[2] and area[1] <= tree_y <= area[1] + area[3]:
                 on_track_or_controls = True
@@ -233,9 +238,6 @@ def draw_pedals(accelerating, braking):
 
 
 def is_within_track(car_rect, inner_points, outer_points):
-    def get_distance(point1, point2):
-        return math.sqrt((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2)
-
     car_length = car_rect.height // 2  
     angle_rad = math.radians(-angle)  
 
@@ -244,47 +246,21 @@ def is_within_track(car_rect, inner_points, outer_points):
     rear_point = (car_rect.centerx - car_length * math.cos(angle_rad),
                   car_rect.centery - car_length * math.sin(angle_rad))
 
-    for i in range(len(inner_points) - 1):
-        inner_front_dist = get_distance(front_point, inner_points[i])
-        outer_front_dist = get_distance(front_point, outer_points[i])
-        inner_rear_dist = get_distance(rear_point, inner_points[i])
-        outer_rear_dist = get_distance(rear_point, outer_points[i])
-
-        if (inner_front_dist < TRACK_WIDTH and outer_front_dist < TRACK_WIDTH) and \
-           (inner_rear_dist < TRACK_WIDTH and outer_rear_dist < TRACK_WIDTH):
-            return True  # Both front and rear are inside the track
-
-    return False 
+    return bool(track_corridor.contains([front_point, rear_point]).all())  # Both front and rear are inside the track
 
 
 
 def game_loop():
     font_size = 30
     font = pygame.font.Font(None, font_size)
-    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, num_trees
-
-    track_points = []
-    for i in range(6):
-        if i < 6 // 2:
-            track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        else:
-            track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-
-    for i in range(6 // 2):
-        track_points.append(track_points[i])
-
-    curve_points = catmull_rom_chain(track_points, NUM_POINTS)
-    outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, track_geometry, num_trees, track_corridor
 
-    start_index = 5  # Move a few points forward to avoid track boundary issues
-    playerX, playerY = (outer_points[start_index][0] + inner_points[start_index][0]) / 2, \
-                       (outer_points[start_index][1] + inner_points[start_index][1]) / 2
+    track = TRACK_CACHE.get(TRACK_SEED, TRACK_WIDTH, NUM_POINTS, (WIDTH, HEIGHT))
+    track_points, track_geometry = track.track_points, track.geometry
+    curve_points, outer_points, inner_points = track_geometry.centreline, track_geometry.outer, track_geometry.inner
+    track_corridor = TrackCorridor(track_geometry.resampled())  # Same corridor within half a pixel, far fewer segments
 
-    nextX, nextY = (outer_points[start_index + 1][0] + inner_points[start_index + 1][0]) / 2, \
-                   (outer_points[start_index + 1][1] + inner_points[start_index + 1][1]) / 2
-    angle = -math.degrees(math.atan2(nextY - playerY, nextX - playerX))  
+    playerX, playerY, angle = track.start_pose
 
     player_speed = 0
     acceleration = 0.005
@@ -298,7 +274,7 @@ def game_loop():
     steering_return_speed = 2
     distance_covered = 0
 
-    tree_positions = generate_tree_positions(10, outer_points, tree_size, min_distance=100)
+    tree_positions = generate_tree_positions(10, track_geometry, tree_size, min_distance=100)
 
     clock = pygame.time.Clock()
     running = True
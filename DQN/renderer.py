@@ -0,0 +1,42 @@
+import os
+import pygame
+
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+
+class PygameRenderer:
+    """
+    Draws a CarSimulation in a pygame window: the track background, the car sprite and its sensor rays.
+    Images are loaded from the images folder next to this file, whatever the working directory.
+    """
+    def __init__(self, simulation, caption="Track Invaders"):
+        if not pygame.get_init():
+            pygame.init()
+        self.simulation = simulation
+        self.screen = pygame.display.set_mode((simulation.WIDTH, simulation.HEIGHT))
+        pygame.display.set_caption(caption)
+
+        # Load the player image at the sprite size the simulation positions the car with
+        self.playerImg = pygame.transform.scale(pygame.image.load(os.path.join(IMAGE_DIR, 'racing-car.png')),
+                                                (simulation.new_width, simulation.new_height))
+
+    def draw(self):
+        """Draw the track and the car and flip the display"""
+        simulation = self.simulation
+        # Track image, rendered once and stored with the track
+        self.screen.blit(simulation.track.surface(), (0, 0))
+
+        rotated_car = pygame.transform.rotate(self.playerImg, simulation.angle)
+        car_rect = rotated_car.get_rect(center=(
+            simulation.playerX + simulation.new_width//2,
+            simulation.playerY + simulation.new_height//2
+        ))
+        self.screen.blit(rotated_car, car_rect.topleft)
+        pygame.display.flip()
+
+    def draw_rays(self, center_x, center_y, distances):
+        """Draw the sensor rays from the car centre to where they hit, distances in pixels"""
+        dir_x, dir_y = self.simulation.sensors.directions(self.simulation.angle)
+        for ray_dx, ray_dy, min_dist in zip(dir_x, dir_y, distances):
+            end_x = center_x + min_dist * ray_dx
+            end_y = center_y + min_dist * ray_dy
+            pygame.draw.line(self.screen, (255, 0, 0), (center_x, center_y), (end_x, end_y), 1)
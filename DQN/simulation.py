@@ -0,0 +1,321 @@
+import sys
+import os
+import numpy as np
+import math
+
+# trackkit, the track code shared by every game mode, is imported from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from trackkit import TrackCache, SpatialGrid, TrackCorridor, SensorLayout
+from trackkit.raycast import RayWorkspace, polyline_segments, cast_rays, cast_rays_indexed
+from config import *
+
+# Movement rules applied by step
+STEP_ACCELERATION = 0.005
+STEP_MAX_SPEED = 0.7
+STEP_FRICTION = 0.005
+STEP_REVERSE_SPEED = -0.3
+STEP_ROTATION_SPEED = 0.8
+OFF_TRACK_PENALTY = -50
+
+# Size of the car sprite, racing-car.png scaled to 48 pixels wide (it is square). playerX and playerY
+# are the top left corner of the sprite, as the renderer draws it
+SPRITE_WIDTH = 48
+SPRITE_HEIGHT = 48
+
+def default_sensors():
+    """8 rays from -90 to 90 degrees around the heading"""
+    return SensorLayout(np.linspace(-90, 90, 8), max_length=150)
+
+class SimulationState:
+    """
+    Everything that changes while a CarSimulation drives: the car pose, speed and episode counters, and
+    the track they refer to, shared rather than copied. Dynamics are deterministic and the track is the
+    only random draw of an episode, so this is all a rollout needs to be replayed or branched.
+    """
+    __slots__ = ('track', 'playerX', 'playerY', 'angle', 'speed', 'score', 'distance_covered', 'steps_taken',
+                 'current_checkpoint')
+
+    def __init__(self, track, playerX, playerY, angle, speed, score, distance_covered, steps_taken,
+                 current_checkpoint):
+        self.track = track
+        self.playerX = playerX
+        self.playerY = playerY
+        self.angle = angle
+        self.speed = speed
+        self.score = score
+        self.distance_covered = distance_covered
+        self.steps_taken = steps_taken
+        self.current_checkpoint = current_checkpoint
+
+    def copy(self):
+        """A new snapshot of the same state on the same track object"""
+        return SimulationState(self.track, self.playerX, self.playerY, self.angle, self.speed, self.score,
+                               self.distance_covered, self.steps_taken, self.current_checkpoint)
+
+    __copy__ = copy
+
+    def __eq__(self, other):
+        return isinstance(other, SimulationState) and all(getattr(self, name) == getattr(other, name)
+                                                          for name in self.__slots__)
+
+    def __repr__(self):
+        return (f"SimulationState(track seed {self.track.seed}, x={self.playerX:.2f}, y={self.playerY:.2f}, "
+                f"angle={self.angle:.2f}, speed={self.speed:.3f}, steps={self.steps_taken})")
+
+class CarSimulation:
+    """
+    The car on its track without any drawing: physics, track loading, sensing, collisions and reward.
+    Only NumPy is needed, pygame and the image files are left to GameEnvironment's renderer.
+    """
+    render_background = False
+
+    def __init__(self, sensors=None, track_seed=TRACK_SEED, track_cache=None, track=None):
+        """
+        :param sensors: SensorLayout, default_sensors() if None
+        :param track_seed, track_cache: Seed of the track and the TrackCache it is loaded from
+        :param track: CachedTrack to drive on instead, e.g. TrackLibrary.track(i); its seed replaces track_seed
+        """
+        self.WIDTH = WIDTH
+        self.HEIGHT = HEIGHT
+        # 8 rays from -90 to 90 degrees around the heading by default
+        self.sensors = sensors if sensors is not None else default_sensors()
+        # Tracks are loaded from the on-disk cache, a fixed seed replays the same track
+        self.track_seed = track_seed
+        self.track_cache = track_cache if track_cache is not None else TrackCache()
+        self.new_width = SPRITE_WIDTH
+        self.new_height = SPRITE_HEIGHT
+
+        # Corners of the car body relative to its centre, facing angle 0
+        self.car_corner_offsets = np.array([
+            [CAR_LENGTH / 2, CAR_WIDTH / 2],
+            [CAR_LENGTH / 2, -CAR_WIDTH / 2],
+            [-CAR_LENGTH / 2, -CAR_WIDTH / 2],
+            [-CAR_LENGTH / 2, CAR_WIDTH / 2]
+        ])
+        # Reused by every on-track check: the transposed rotation and the corners it gives
+        self.corner_rotation = np.empty((2, 2))
+        self.corners = np.empty((4, 2))
+
+        # Initialize track
+        if track is None:
+            self.initialize_track()
+        else:
+            if self.render_background and track.background is None:
+                raise ValueError("drawing the environment needs a track made with render=True")
+            self.track_seed = track.seed
+            self.use_track(track)
+        self.place_at_start()
+
+    def initialize_track(self):
+        """
+        Load the track from the track cache, generating it only on first use. The rendered background
+        is only decoded, or drawn with pygame, when render_background is set.
+        """
+        self.use_track(self.track_cache.get(self.track_seed, TRACK_WIDTH, NUM_CURVE_POINTS, (self.WIDTH, self.HEIGHT),
+                                            render=self.render_background))
+
+    def use_track(self, track):
+        """Drive on a CachedTrack, precomputing what sensing and collisions need from it"""
+        self.track = track
+        self.track_points = self.track.track_points
+        self.track_geometry = self.track.geometry
+        self.curve_points = self.track_geometry.centreline
+        self.outer_points = self.track_geometry.outer
+        self.inner_points = self.track_geometry.inner
+
+        # Sensors and collisions scan a resampled copy with far fewer segments, within SENSING_TOLERANCE
+        # pixels plus the rounding of the drawn boundaries (kept as sensing_geometry.resample_error)
+        self.sensing_geometry = self.track_geometry.resampled(SENSING_TOLERANCE)
+
+        # Precompute boundary segments for the raycaster, closing both boundaries
+        outer = self.sensing_geometry.outer
+        inner = self.sensing_geometry.inner
+        outer_starts, outer_vectors = polyline_segments(np.concatenate([outer, outer[:1]]))
+        inner_starts, inner_vectors = polyline_segments(np.concatenate([inner, inner[:1]]))
+        self.segment_starts = np.concatenate([outer_starts, inner_starts])
+        self.segment_vectors = np.concatenate([outer_vectors, inner_vectors])
+        # Only batches of cars are cast through the grid, whose default 32 px cells suit the resampled segments
+        self.segment_grid = SpatialGrid.from_segments(self.segment_starts, self.segment_vectors)
+        self.track_corridor = TrackCorridor(self.sensing_geometry)
+        self.ray_workspace = RayWorkspace(self.sensors.num_rays, len(self.segment_starts))
+
+    def place_at_start(self):
+        """Put the car at the beginning of the track and clear the episode counters"""
+        # Start at the beginning of the track
+        start_point = self.curve_points[0]
+        self.playerX = start_point[0] - self.new_width//2
+        self.playerY = start_point[1] - self.new_height//2
+        
+        # Calculate initial angle based on next track point
+        next_point = self.curve_points[1]
+        dx = next_point[0] - start_point[0]
+        dy = next_point[1] - start_point[1]
+        self.angle = math.degrees(math.atan2(-dy, dx))
+        
+        # Reset game state
+        self.speed = 0.0
+        self.score = 0
+        self.distance_covered = 0
+        self.steps_taken = 0
+        self.current_checkpoint = 0
+
+    def get_state(self):
+        """Snapshot of the car and episode, see SimulationState"""
+        return SimulationState(self.track, self.playerX, self.playerY, self.angle, self.speed, self.score,
+                               self.distance_covered, self.steps_taken, self.current_checkpoint)
+
+    def set_state(self, state):
+        """
+        Continue from a snapshot taken with get_state, of this simulation or another one. Only a snapshot
+        on a different track rebuilds the sensing data; observe or step to sense the restored car.
+        """
+        if state.track is not self.track:
+            self.track_seed = state.track.seed
+            self.use_track(state.track)
+        self.playerX = state.playerX
+        self.playerY = state.playerY
+        self.angle = state.angle
+        self.speed = state.speed
+        self.score = state.score
+        self.distance_covered = state.distance_covered
+        self.steps_taken = state.steps_taken
+        self.current_checkpoint = state.current_checkpoint
+
+    @property
+    def num_observations(self):
+        """Length of an observation: one distance per ray, then speed, sine and cosine of the angle"""
+        return self.sensors.num_rays + 3
+
+    def observe(self, out):
+        """
+        Write the observation step returns into a buffer without building intermediate lists.
+        :param out: Float array of shape (num_observations,), float32 buffers are filled in place
+        :return: out
+        """
+        rays = self.sensors.num_rays
+        dir_x, dir_y = self.sensors.directions(self.angle)
+        cast_rays(self.playerX + self.new_width//2, self.playerY + self.new_height//2, dir_x, dir_y,
+                  self.sensors.max_length, self.segment_starts, self.segment_vectors, out=out[:rays],
+                  workspace=self.ray_workspace)
+        out[:rays] /= self.sensors.max_length
+        radians = math.radians(self.angle)
+        out[rays:] = self.speed / STEP_MAX_SPEED, math.sin(radians), math.cos(radians)
+        return out
+
+    def cast_rays_batch(self, centers_x, centers_y, angles):
+        """
+        Distances to the track boundaries for many cars in one call.
+        :param centers_x, centers_y: Car centres, shape (N,)
+        :param angles: Car angles in degrees, shape (N,)
+        :return: (N, rays) array of distances in pixels, rays as in self.sensors
+        """
+        dir_x, dir_y = self.sensors.directions(angles)
+        if len(centers_x) == 1:
+            # The resampled boundaries are short enough that one car tests every segment faster than the grid
+            return cast_rays(centers_x[0], centers_y[0], dir_x[0], dir_y[0], self.sensors.max_length,
+                             self.segment_starts, self.segment_vectors)[None]
+        return cast_rays_indexed(np.asarray(centers_x, dtype=float)[:, None],
+                                 np.asarray(centers_y, dtype=float)[:, None],
+                                 dir_x, dir_y, self.sensors.max_length,
+                                 self.segment_starts, self.segment_vectors, self.segment_grid)
+
+    def get_car_corners(self, out=None):
+        """
+        Corners of the car's oriented bounding box, from its position and angle.
+        :param out: Optional (4, 2) float array the corners are written to
+        """
+        center_x = self.playerX + self.new_width//2
+        center_y = self.playerY + self.new_height//2
+        cos_a = math.cos(math.radians(-self.angle))
+        sin_a = math.sin(math.radians(-self.angle))
+        rotation_t = self.corner_rotation
+        rotation_t[0, 0] = rotation_t[1, 1] = cos_a
+        rotation_t[0, 1] = sin_a
+        rotation_t[1, 0] = -sin_a
+        corners = np.matmul(self.car_corner_offsets, rotation_t, out=out)
+        corners[:, 0] += center_x
+        corners[:, 1] += center_y
+        return corners
+
+    def is_car_on_track(self):
+        """Check all four corners of the car against the track corridor at once"""
+        return bool(self.track_corridor.contains(self.get_car_corners(out=self.corners)).all())
+
+    def advance(self, action, repeat=1):
+        """
+        Apply an action for repeat physics substeps, without drawing or sensing. The car is checked
+        against the track after every substep and stops at the first one that leaves it.
+        :return: reward for the score gained over all substeps, or the off-track penalty, and done
+        """
+        old_score = self.score
+        for _ in range(repeat):
+            self.move(action)
+            # Check if car is on track
+            done = not self.is_car_on_track()
+            if done:
+                break
+
+        # Calculate reward
+        reward = (self.score - old_score) * 10  # Reward for increasing score
+        if done:
+            reward = OFF_TRACK_PENALTY  # Penalty for going off track
+        return reward, done
+
+    def move(self, action):
+        """One physics substep: speed, angle and position for an action, then distance and score"""
+        # Movement parameters
+        acceleration = STEP_ACCELERATION
+        max_speed = STEP_MAX_SPEED
+        friction = STEP_FRICTION
+        reverse_speed = STEP_REVERSE_SPEED
+        rotation_speed = STEP_ROTATION_SPEED
+
+        # Apply action
+        is_accelerating = action == 2
+        is_braking = action == 3
+        is_turning_left = action == 0
+        is_turning_right = action == 1
+
+        # Update speed
+        if is_accelerating:
+            if self.speed < 0:
+                self.speed += friction
+            else:
+                self.speed += acceleration
+                if self.speed > max_speed:
+                    self.speed = max_speed
+        elif is_braking:
+            if self.speed > 0:
+                self.speed -= friction
+            else:
+                self.speed -= acceleration
+                if self.speed < reverse_speed:
+                    self.speed = reverse_speed
+        else:
+            if self.speed > 0:
+                self.speed -= friction
+            elif self.speed < 0:
+                self.speed += friction
+            if abs(self.speed) < friction:
+                self.speed = 0
+
+        # Update angle
+        if self.speed != 0:
+            direction = 1 if self.speed > 0 else -1
+            if is_turning_left:
+                self.angle += rotation_speed * direction
+            if is_turning_right:
+                self.angle -= rotation_speed * direction
+
+        # Update position
+        self.playerX += self.speed * math.cos(math.radians(-self.angle))
+        self.playerY += self.speed * math.sin(math.radians(-self.angle))
+        self.steps_taken += 1
+
+        # Update score
+        if self.speed > 0:
+            self.distance_covered += self.speed
+            self.score = int(self.distance_covered / 10)
+
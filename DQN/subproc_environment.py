@@ -0,0 +1,171 @@
+import multiprocessing
+from multiprocessing import connection, shared_memory
+import numpy as np
+from simulation import default_sensors
+from gym_environment import BufferedGameEnvironment
+from config import TRACK_SEED
+
+# One-byte commands sent to the workers, the data itself goes through shared memory
+RESET, STEP, CLOSE, READY = b'r', b's', b'c', b'.'
+
+def _attach(name, shape, dtype):
+    memory = shared_memory.SharedMemory(name=name)
+    return memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+def _worker(index, pipe, layout, env_kwargs):
+    """
+    Runs one BufferedGameEnvironment whose observation buffer is this worker's row of the shared
+    observations, so stepping writes the observation straight into shared memory.
+    """
+    memories, arrays = zip(*(_attach(*layout[key]) for key in ('actions', 'observations', 'final_observations',
+                                                               'rewards', 'dones')))
+    actions, observations, final_observations, rewards, dones = arrays
+    env = BufferedGameEnvironment(observation=observations[index], **env_kwargs)
+    try:
+        while True:
+            command = pipe.recv_bytes()
+            if command == STEP:
+                observation, reward, done, _, _ = env.step(int(actions[index]))
+                rewards[index] = reward
+                dones[index] = done
+                if done:
+                    final_observations[index] = observation
+                    env.reset()
+            elif command == RESET:
+                env.reset()
+                dones[index] = False
+            elif command == CLOSE:
+                break
+            pipe.send_bytes(READY)
+    finally:
+        del actions, observations, final_observations, rewards, dones, arrays
+        env.observation = None
+        for memory in memories:
+            memory.close()
+
+class SubprocVecEnvironment:
+    """
+    K GameEnvironments, each in its own process. Actions, observations, rewards and done flags live in
+    shared memory arrays and the pipes to the workers only carry one-byte commands, so nothing is pickled
+    per step. step runs every worker and waits for all of them; step_async and step_wait let the caller
+    collect whichever workers finish first and send them new actions while the others are still running.
+    Workers reset themselves when their car leaves the track, keeping the last observation in final_observations.
+    The returned arrays are views of the shared memory and change on the next step, copy them to keep them.
+    """
+    def __init__(self, num_workers, track_seeds=None, sensors=None, context='spawn'):
+        """
+        :param num_workers: Number of worker processes K
+        :param track_seeds: Track seed of each worker, all TRACK_SEED if None
+        :param sensors: SensorLayout used by every worker, the GameEnvironment default if None
+        :param context: multiprocessing start method, spawn keeps pygame state out of the workers
+        """
+        self.num_workers = num_workers
+        track_seeds = track_seeds if track_seeds is not None else [TRACK_SEED] * num_workers
+        sensors = sensors if sensors is not None else default_sensors()
+        num_observations = sensors.num_rays + 3
+        shapes = {
+            'actions': ((num_workers,), np.int64),
+            'observations': ((num_workers, num_observations), np.float32),
+            'final_observations': ((num_workers, num_observations), np.float32),
+            'rewards': ((num_workers,), np.float32),
+            'dones': ((num_workers,), np.bool_),
+        }
+        self._memories = {}
+        layout = {}
+        for key, (shape, dtype) in shapes.items():
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            memory = shared_memory.SharedMemory(create=True, size=max(1, size))
+            self._memories[key] = memory
+            setattr(self, key, np.ndarray(shape, dtype=dtype, buffer=memory.buf))
+            layout[key] = (memory.name, shape, dtype)
+        self.dones[:] = False
+
+        context = multiprocessing.get_context(context)
+        self.pipes = []
+        self.processes = []
+        for index, seed in enumerate(track_seeds):
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker, daemon=True,
+                                      args=(index, child, layout, {'track_seed': seed, 'sensors': sensors}))
+            process.start()
+            child.close()
+            self.pipes.append(parent)
+            self.processes.append(process)
+        self.pending = set()
+        self.closed = False
+
+    def _send(self, indices, command):
+        for index in indices:
+            self.pipes[index].send_bytes(command)
+            self.pending.add(index)
+
+    def _wait(self, min_ready=None):
+        """Wait until min_ready pending workers (all of them if None) have answered, return their indices."""
+        min_ready = len(self.pending) if min_ready is None else min(min_ready, len(self.pending))
+        ready = []
+        while len(ready) < min_ready:
+            for pipe in connection.wait([self.pipes[index] for index in self.pending]):
+                pipe.recv_bytes()
+                index = self.pipes.index(pipe)
+                self.pending.discard(index)
+                ready.append(index)
+        return np.array(sorted(ready), dtype=np.intp)
+
+    def reset(self):
+        """
+        Reset every worker.
+        :return: (K, observations) float32 observations
+        """
+        self._wait()
+        self._send(range(self.num_workers), RESET)
+        self._wait()
+        return self.observations
+
+    def step(self, actions):
+        """
+        Step every worker with its action and wait for all of them.
+        :param actions: (K,) integer actions
+        :return: observations (K, observations), rewards (K,), dones (K,)
+        """
+        self.step_async(actions)
+        self.step_wait()
+        return self.observations, self.rewards, self.dones
+
+    def step_async(self, actions, indices=None):
+        """
+        Start stepping the given workers, every worker if None, without waiting for them.
+        :param actions: One action per worker in indices
+        """
+        indices = np.arange(self.num_workers) if indices is None else np.asarray(indices)
+        if self.pending.intersection(indices.tolist()):
+            raise RuntimeError("a worker is still stepping, collect it with step_wait first")
+        self.actions[indices] = actions
+        self._send(indices.tolist(), STEP)
+
+    def step_wait(self, min_ready=None):
+        """
+        Wait for at least min_ready stepping workers, all of them if None.
+        :return: indices of the workers that finished, with their observations, rewards and dones
+        """
+        indices = self._wait(min_ready)
+        return indices, self.observations[indices], self.rewards[indices], self.dones[indices]
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._wait()
+        for pipe in self.pipes:
+            pipe.send_bytes(CLOSE)
+        for process in self.processes:
+            process.join()
+        for key, memory in self._memories.items():
+            setattr(self, key, None)
+            memory.close()
+            memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
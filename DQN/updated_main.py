@@ -5,8 +5,15 @@ import math
 import random
 import os
 import csv
+import numpy as np
 from pygame import mixer
-from track import draw_track, TRACK_WIDTH, catmull_rom_chain, generate_track
+
+# trackkit, the track code shared by every game mode, is imported from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from trackkit import TRACK_WIDTH, TrackCache, TrackMask, SensorLayout, CentrelineTracker
+from trackkit.render import TrackLayer
 from replay_buffer import ReplayBuffer, calculate_reward  # Import ReplayBuffer and calculate_reward
 from actions import Action  # Import the Action enum
 import torch
@@ -18,6 +25,8 @@ pygame.font.init()  # Explicitly initialize font module
 mixer.init()
 
 NUM_POINTS = 100
+TRACK_SEED = None  # Set to an integer to replay the same track, None draws a new one every game
+TRACK_CACHE = TrackCache()
 WIDTH, HEIGHT = 800, 600
 
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -200,7 +209,7 @@ def rules_menu():
         pygame.display.update()
 
 
-def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
+def generate_tree_positions(num_trees, track_geometry, tree_size, min_distance):
     tree_positions = []
     control_areas = [(WIDTH - 150, HEIGHT - 150, 100, 100),  # Steering wheel area
                      (0, HEIGHT - 100, 100, 100),  # Accelerator area
@@ -211,12 +220,7 @@ def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
         tree_y = random.randint(0, HEIGHT - tree_size[1])
 
         # Check if the tree is outside the track and controls
-        on_track_or_controls = False
-        for outer_point in outer_points:
-            distance = math.sqrt((tree_x - outer_point[0]) ** 2 + (tree_y - outer_point[1]) ** 2)
-            if distance < TRACK_WIDTH:
-                on_track_or_controls = True
-                break
+        on_track_or_controls = track_geometry.distance_to_outer((tree_x, tree_y)) < TRACK_WIDTH
         for area in control_areas:
             if area[0] <= tree_x <= area[0] + area[2] and area[1] <= tree_y <= area[1] + area[3]:
                 on_track_or_controls = True
@@ -237,37 +241,30 @@ def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
 def player(x, y, angle):
     rotated_image = pygame.transform.rotate(playerImg, angle)
     new_rect = rotated_image.get_rect(center=(x + new_width // 2, y + new_height // 2))
-    screen.blit(rotated_image, new_rect.topleft)
-
-def sub_ray_cast(x, y, angle):
-    max_length=150
-    length=1
-    xi=0
-    yi=0
-    while length<max_length:
-        xi=int(x-math.sin(math.radians(angle))*length)
-        yi=int(y-math.cos(math.radians(angle))*length)
-        try:
-            clr=screen.get_at((xi,yi))
-            if clr.r==0 and clr.g==170 and clr.b==0:
-                break
-        except IndexError:
-            break
-        length+=1
+    track_layer.blit(rotated_image, new_rect.topleft)
+
+# 8 rays every 45 degrees, pointing along (-sin, -cos) of angle + offset
+SENSORS = SensorLayout(np.arange(-7, 1) * 45, max_length=150, sign=-1, bias=-90)
+
+def sub_ray_cast(x, y, dx, dy, length):
+    xi=int(x+dx*length)
+    yi=int(y+dy*length)
     dist=int(math.sqrt((x-xi)**2 + (y-yi)**2))
     if xi < 0 or xi >= WIDTH or yi < 0 or yi >= HEIGHT:
         xi = max(0, min(WIDTH - 1, xi))
         yi = max(0, min(HEIGHT - 1, yi))
         dist=int(math.sqrt((x-xi)**2 + (y-yi)**2))
-    pygame.draw.line(screen, (255, 255, 255), (x,y), (xi,yi))       #comment to remove rays
+    track_layer.mark(pygame.draw.line(screen, (255, 255, 255), (x,y), (xi,yi)))       #comment to remove rays
     return dist
 
 def ray_cast(x, y, angle):
     xc=x+new_width//2
     yc=y+new_height//2
+    dx, dy = SENSORS.directions(angle)       # looked up, no trig per ray
+    lengths = track_mask.cast(xc, yc, dx, dy, SENSORS.max_length)       # all rays in one lookup
     ray_dist=[]
-    for deg in range(-7,1):
-        ray_dist.append(sub_ray_cast(xc, yc, angle+deg*45))
+    for ray_dx, ray_dy, length in zip(dx, dy, lengths.tolist()):
+        ray_dist.append(sub_ray_cast(xc, yc, ray_dx, ray_dy, length))
     return ray_dist
 
 def apply_input_imperfections(steering_angle, accelerating, braking, speed=0):
@@ -328,7 +325,7 @@ def handle_steering_wheel(steering_angle, speed, mode="manual"):
     
     # Apply offset for shake effect
     final_pos = (wheel_rect.topleft[0] + offset_x, wheel_rect.topleft[1] + offset_y)
-    screen.blit(rotated_wheel, final_pos)
+    return track_layer.blit(rotated_wheel, final_pos)       # dirty rect of this frame's wheel, restored next frame
 
 def draw_steering_wheel():
     handle_steering_wheel(steering_angle, player_speed, "manual")
@@ -338,17 +335,17 @@ def draw_pedals(accelerating, braking):
         scale_factor = random.uniform(0.85, 0.95)  # Random compression
         scaled_size = (int(pedal_size[0] * scale_factor), int(pedal_size[1] * scale_factor))
         scaled_accel = pygame.transform.scale(accelerator_img, scaled_size)
-        screen.blit(scaled_accel, accelerator_rect.topleft)
+        track_layer.blit(scaled_accel, accelerator_rect.topleft)
     else:
-        screen.blit(accelerator_img, accelerator_rect.topleft)
+        track_layer.blit(accelerator_img, accelerator_rect.topleft)
 
     if braking:
         scale_factor = random.uniform(0.85, 0.95)  # Random compression
         scaled_size = (int(pedal_size[0] * scale_factor), int(pedal_size[1] * scale_factor))
         scaled_brake = pygame.transform.scale(brake_img, scaled_size)
-        screen.blit(scaled_brake, brake_rect.topleft)
+        track_layer.blit(scaled_brake, brake_rect.topleft)
     else:
-        screen.blit(brake_img, brake_rect.topleft)
+        track_layer.blit(brake_img, brake_rect.topleft)
 
 def is_within_track(ray_dist):
     # Return False if any ray detects a collision (distance == 0)
@@ -356,30 +353,23 @@ def is_within_track(ray_dist):
         return False
     return True
 
-def calculate_target_angle(current_x, current_y, curve_points, speed=0):
-    # Find the closest point on the track with look-ahead based on speed
-    min_dist = float('inf')
-    closest_idx = 0
-    for i, point in enumerate(curve_points):
-        dist = math.sqrt((current_x - point[0])**2 + (current_y - point[1])**2)
-        if dist < min_dist:
-            min_dist = dist
-            closest_idx = i
+def calculate_target_angle(current_x, current_y, tracker, speed=0):
+    # Find the closest point on the track, searching only around the last one found
+    closest_idx, min_dist = tracker.update(current_x, current_y)
     
     # Dynamic look-ahead based on speed and current position
-    look_ahead = max(5, int(abs(speed) * 20))  # Higher speed = looking further ahead
-    target_points = []
-    weights = []
-    # Calculate multiple target points
-    for i in range(3):  # Use 3 points for smoother path
-        idx = (closest_idx + look_ahead * (i + 1)) % len(curve_points)
-        target_points.append(curve_points[idx])
-        weights.append(1.0 / (i + 1))  # Higher weight for closer points
+    look_ahead = max(5, int(abs(speed) * 20)) * tracker.spacing  # Higher speed = looking further ahead
+    offsets = look_ahead * np.arange(1, 4)
+    # Look less far into tight curves, at most half as far, so the targets do not cut across the inside
+    # of the bend. Curvature times distance is the angle the track turns by, in radians
+    turn = np.abs(tracker.curvature_ahead(closest_idx, offsets)).max() * offsets[-1]
+    offsets /= 1 + min(turn, 1.0)
+    # Calculate multiple target points along the centreline, 3 points for smoother path
+    target_points = tracker.ahead(closest_idx, offsets)
+    weights = 1.0 / np.arange(1, 4)  # Higher weight for closer points
     
     # Calculate weighted average target point
-    sum_weights = sum(weights)
-    target_x = sum(p[0] * w for p, w in zip(target_points, weights)) / sum_weights
-    target_y = sum(p[1] * w for p, w in zip(target_points, weights)) / sum_weights
+    target_x, target_y = weights @ target_points / weights.sum()
     
     # Add small random variations to make movement more natural
     target_x += random.uniform(-5, 5)
@@ -395,27 +385,16 @@ def calculate_target_angle(current_x, current_y, curve_points, speed=0):
 def game_loop():
     font_size = 30
     font = pygame.font.Font(None, font_size)
-    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, num_trees
-
-    track_points = []
-    for i in range(6):
-        if i < 6 // 2:
-            track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        else:
-            track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-    for i in range(6 // 2):
-        track_points.append(track_points[i])
-    
-    curve_points = catmull_rom_chain(track_points, NUM_POINTS)
-    outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, track_geometry, num_trees, track_mask, track_layer
 
-    start_index = 5  # Move a few points forward to avoid track boundary issues
-    playerX, playerY = (outer_points[start_index][0] + inner_points[start_index][0]) / 2, \
-                       (outer_points[start_index][1] + inner_points[start_index][1]) / 2
+    track = TRACK_CACHE.get(TRACK_SEED, TRACK_WIDTH, NUM_POINTS, (WIDTH, HEIGHT))
+    track_points, track_geometry = track.track_points, track.geometry
+    curve_points, outer_points, inner_points = track_geometry.centreline, track_geometry.outer, track_geometry.inner
+    track_mask = TrackMask(track.on_track, track.field)
+    centreline = CentrelineTracker(track_geometry)
 
-    angle = calculate_target_angle(playerX, playerY, curve_points)[0]
+    playerX, playerY, _ = track.start_pose
+    angle = calculate_target_angle(playerX, playerY, centreline)[0]
     playerX -= new_width//2
     playerY -= new_height//2
     player_speed = 0
@@ -429,7 +408,9 @@ def game_loop():
     steering_return_speed = 2
     distance_covered = 0
 
-    tree_positions = generate_tree_positions(10, outer_points, tree_size, min_distance=100)
+    tree_positions = generate_tree_positions(10, track_geometry, tree_size, min_distance=100)
+    # Track and trees are drawn once, under the car; each frame only redraws what moved
+    track_layer = TrackLayer(screen, track.surface(), [(tree_img, tree_pos) for tree_pos in tree_positions])
     clock = pygame.time.Clock()
     running = True
     game_over = False
@@ -444,7 +425,7 @@ def game_loop():
     replay_buffer = ReplayBuffer(max_size=10000, file_path_prefix="replay_buffer")
 
     while running:
-        screen.fill((0, 170, 0))
+        track_layer.begin()
         if engine_start_once:  # engine starts once
             engine_start_sound.play()
             engine_start_once = False
@@ -457,8 +438,6 @@ def game_loop():
                 engine_sound.play(-1)
 
         if not game_over:
-            draw_track(screen, outer_points, inner_points, curve_points, TRACK_WIDTH)
-
             keys = pygame.key.get_pressed()
             accelerating = keys[pygame.K_UP]
             braking = keys[pygame.K_DOWN]
@@ -518,10 +497,8 @@ def game_loop():
             playerX = max(0, min(WIDTH - new_width, playerX))
             playerY = max(0, min(HEIGHT - new_height, playerY))
             player(playerX, playerY, angle)
-            for tree_pos in tree_positions:
-                screen.blit(tree_img, tree_pos)
             score_text = font.render(f"Score: {int(distance_covered / 10)}", True, (255, 255, 255))
-            screen.blit(score_text, (WIDTH - 200, 15))
+            track_layer.blit(score_text, (WIDTH - 200, 15))
 
             handle_steering_wheel(steering_angle, player_speed, "manual")
             draw_pedals(accelerating, braking)
@@ -573,8 +550,8 @@ def game_loop():
                 return "Restart"
         fps = int(clock.get_fps())
         fps_text = font.render(f"FPS: {fps}", True, (255, 255, 255))
-        screen.blit(fps_text, (15, 15))
-        pygame.display.update()
+        track_layer.blit(fps_text, (15, 15))
+        track_layer.end()
         clock.tick()
     return "Exit"
 
@@ -587,24 +564,13 @@ def train_loop():
     if file.tell()==0:
         writer.writerow(["Dist1", "Dist2", "Dist3", "Dist4", "Dist5", "Dist6", "Dist7", "Choice", "Velocity"])
         file.flush()
-    t_track_points=[]
-    for i in range(6):
-        if i < 6 // 2:
-            t_track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        else:
-            t_track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-    for i in range(6 // 2):
-        t_track_points.append(t_track_points[i])
-    t_curve_points = catmull_rom_chain(t_track_points, NUM_POINTS)
-    t_outer_points, t_inner_points = generate_track(t_curve_points, TRACK_WIDTH)
-    start_index = 5  
-    t_playerX, t_playerY = (t_outer_points[start_index][0] + t_inner_points[start_index][0]) / 2, \
-                       (t_outer_points[start_index][1] + t_inner_points[start_index][1]) / 2
-    nextX, nextY = (t_outer_points[start_index + 1][0] + t_inner_points[start_index + 1][0]) / 2, \
-                   (t_outer_points[start_index + 1][1] + t_inner_points[start_index + 1][1]) / 2
-    t_angle = -math.degrees(math.atan2(nextY - t_playerY, nextX - t_playerX))
+    t_track = TRACK_CACHE.get(TRACK_SEED, TRACK_WIDTH, NUM_POINTS, (WIDTH, HEIGHT))
+    t_track_points, t_track_geometry = t_track.track_points, t_track.geometry
+    t_curve_points, t_outer_points, t_inner_points = t_track_geometry.centreline, t_track_geometry.outer, t_track_geometry.inner
+    global track_mask, track_layer
+    track_mask = TrackMask(t_track.on_track, t_track.field)
+    track_layer = TrackLayer(screen, t_track.surface())  # Track drawn once, each frame only redraws what moved
+    t_playerX, t_playerY, t_angle = t_track.start_pose
     t_playerX-=new_width//2
     t_playerY-=new_height//2
     max_speed = 0.7
@@ -618,7 +584,7 @@ def train_loop():
     game_over = False
     start_time = pygame.time.get_ticks()
     while running:
-        screen.fill((0,170,0))
+        track_layer.begin()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running=False
@@ -630,7 +596,6 @@ def train_loop():
         
         if not game_over:
             choice=[0,0,0,0]
-            draw_track(screen, t_outer_points, t_inner_points, t_curve_points, TRACK_WIDTH)
             keys=pygame.key.get_pressed()
             if keys[pygame.K_UP]:
                 choice[3]=1
@@ -699,7 +664,7 @@ def train_loop():
                 writer.writerow([ray_dist[0], ray_dist[1], ray_dist[2], ray_dist[3], ray_dist[4], ray_dist[5], ray_dist[6], fchoice, t_player_speed])
                 file.flush()
             score_text = font.render(f"Score: {int(t_distance_covered / 10)}", True, (255, 255, 255))
-            screen.blit(score_text, (WIDTH - 200, 15))
+            track_layer.blit(score_text, (WIDTH - 200, 15))
             handle_steering_wheel(t_angle, t_player_speed, "training")
         else:
             file.close()
@@ -716,37 +681,26 @@ def train_loop():
                 return "Restart"
         fps = int(clock.get_fps())
         fps_text = font.render(f"FPS: {fps}", True, (255, 255, 255))
-        screen.blit(fps_text, (15, 15))
-        pygame.display.update()
+        track_layer.blit(fps_text, (15, 15))
+        track_layer.end()
         clock.tick(60)
     file.close()
     return "Exit"
 
 def dqn_agent_mode():
     """DQN Agent with advanced decision making capabilities"""
-    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, num_trees
+    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, track_geometry, num_trees, track_mask, track_layer
 
 
-    track_points = []
-    for i in range(6):
-        if i < 6 // 2:
-            track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        else:
-            track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-    for i in range(6 // 2):
-        track_points.append(track_points[i])
+    track = TRACK_CACHE.get(TRACK_SEED, TRACK_WIDTH, NUM_POINTS, (WIDTH, HEIGHT))
+    track_points, track_geometry = track.track_points, track.geometry
+    curve_points, outer_points, inner_points = track_geometry.centreline, track_geometry.outer, track_geometry.inner
+    track_mask = TrackMask(track.on_track, track.field)
+    centreline = CentrelineTracker(track_geometry)
 
-    curve_points = catmull_rom_chain(track_points, NUM_POINTS)
-    outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
 
-
-    start_index = 5
-    playerX, playerY = (outer_points[start_index][0] + inner_points[start_index][0]) / 2, \
-                       (outer_points[start_index][1] + inner_points[start_index][1]) / 2
-
-    angle = calculate_target_angle(playerX, playerY, curve_points)[0]
+    playerX, playerY, _ = track.start_pose
+    angle = calculate_target_angle(playerX, playerY, centreline)[0]
     playerX -= new_width // 2
     playerY -= new_height // 2
     player_speed = 0
@@ -760,7 +714,9 @@ def dqn_agent_mode():
     steering_return_speed = 2
     distance_covered = 0  
 
-    tree_positions = generate_tree_positions(10, outer_points, tree_size, min_distance=100)
+    tree_positions = generate_tree_positions(10, track_geometry, tree_size, min_distance=100)
+    # Track and trees are drawn once, under the car; each frame only redraws what moved
+    track_layer = TrackLayer(screen, track.surface(), [(tree_img, tree_pos) for tree_pos in tree_positions])
     clock = pygame.time.Clock()
     running = True
     game_over = False
@@ -819,20 +775,18 @@ def dqn_agent_mode():
                 return (False, 0.0)
 
     while running:
-        screen.fill((0, 170, 0))
+        track_layer.begin()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
 
         if not game_over:
-            draw_track(screen, outer_points, inner_points, curve_points, TRACK_WIDTH)
-
             # Get current state
             ray_dist = ray_cast(playerX, playerY, angle)
             target_angle, track_dist = calculate_target_angle(
                 playerX + new_width//2, 
                 playerY + new_height//2, 
-                curve_points,
+                centreline,
                 player_speed
             )
 
@@ -872,12 +826,10 @@ def dqn_agent_mode():
                 game_over = True
 
             player(playerX, playerY, angle)
-            for tree_pos in tree_positions:
-                screen.blit(tree_img, tree_pos)
 
 
             score_text = font.render(f"Score: {int(distance_covered / 10)}", True, (255, 255, 255))
-            screen.blit(score_text, (WIDTH - 200, 15))
+            track_layer.blit(score_text, (WIDTH - 200, 15))
 
             handle_steering_wheel(angle, player_speed, "dqn")
             draw_pedals(True, False)
@@ -890,7 +842,7 @@ def dqn_agent_mode():
             target_angle, _ = calculate_target_angle(
                 playerX + new_width//2 + random.uniform(-2, 2),  # Add sensor noise
                 playerY + new_height//2 + random.uniform(-2, 2),
-                curve_points,
+                centreline,
                 player_speed * random.uniform(0.95, 1.05)  # Speed measurement noise
             )
             
@@ -933,7 +885,7 @@ def dqn_agent_mode():
                 running = False
                 return "Restart"
 
-        pygame.display.update()
+        track_layer.end()
         clock.tick(60)
 
     return "Exit"
@@ -0,0 +1,161 @@
+import numpy as np
+from simulation import (CarSimulation, STEP_ACCELERATION, STEP_MAX_SPEED, STEP_FRICTION, STEP_REVERSE_SPEED,
+                        STEP_ROTATION_SPEED, OFF_TRACK_PENALTY)
+from simulation import SimulationState
+from config import TRACK_SEED
+
+class VecGameEnvironment:
+    """
+    N cars driving the same track in lockstep. The state of every car is kept in NumPy arrays and
+    step applies the rules of GameEnvironment.step to all of them as masked array updates, senses
+    every car in one batched raycast and resets cars that left the track on their own.
+    """
+    def __init__(self, num_cars, sensors=None, track_seed=TRACK_SEED, track_cache=None, env=None, track=None):
+        """
+        :param num_cars: Number of cars stepped together
+        :param sensors, track_seed, track_cache, track: As for GameEnvironment
+        :param env: CarSimulation or GameEnvironment providing the track and sensing, a CarSimulation built
+                    from the other arguments if None
+        """
+        self.num_cars = num_cars
+        self.env = env if env is not None else CarSimulation(sensors, track_seed, track_cache, track)
+        self.sensors = self.env.sensors
+        self.num_observations = self.env.num_observations
+
+        # Car centres, angles in degrees and the episode counters, one entry per car
+        self.x = np.zeros(num_cars)
+        self.y = np.zeros(num_cars)
+        self.angle = np.zeros(num_cars)
+        self.speed = np.zeros(num_cars)
+        self.score = np.zeros(num_cars, dtype=int)
+        self.distance_covered = np.zeros(num_cars)
+        self.steps_taken = np.zeros(num_cars, dtype=int)
+        self.reset()
+
+    def start_pose(self):
+        """Centre and angle every car starts from, as GameEnvironment.reset places its car"""
+        (x, y), (next_x, next_y) = self.env.curve_points[0], self.env.curve_points[1]
+        return x, y, np.degrees(np.arctan2(-(next_y - y), next_x - x))
+
+    def reset(self):
+        """
+        Put every car back at the start.
+        :return: (N, observations) array
+        """
+        self.x[:], self.y[:], self.angle[:] = self.start_pose()
+        self.speed[:] = 0
+        self.score[:] = 0
+        self.distance_covered[:] = 0
+        self.steps_taken[:] = 0
+        # All cars start from the same pose, so the first observation is sensed once and reused on every reset
+        self.start_observation = self.observe()[0]
+        return np.tile(self.start_observation, (self.num_cars, 1))
+
+    def reset_cars(self, mask):
+        """Put the cars selected by the boolean mask back at the start"""
+        self.x[mask], self.y[mask], self.angle[mask] = self.start_pose()
+        self.speed[mask] = 0
+        self.score[mask] = 0
+        self.distance_covered[mask] = 0
+        self.steps_taken[mask] = 0
+
+    def get_state(self, car):
+        """SimulationState of one car, on the track of self.env"""
+        return SimulationState(self.env.track, float(self.x[car]) - self.env.new_width//2,
+                               float(self.y[car]) - self.env.new_height//2, float(self.angle[car]),
+                               float(self.speed[car]), int(self.score[car]), float(self.distance_covered[car]),
+                               int(self.steps_taken[car]), 0)
+
+    def set_state(self, state, cars=None):
+        """
+        Put the selected cars, all of them if None, in the state of a snapshot, e.g. to run many rollouts
+        branching from one state. The snapshot must be on the track of self.env.
+        :param cars: Index, boolean mask or slice of the cars
+        :return: (N, observations) array
+        """
+        if state.track is not self.env.track:
+            raise ValueError("the state is on another track than this environment")
+        cars = slice(None) if cars is None else cars
+        self.x[cars] = state.playerX + self.env.new_width//2
+        self.y[cars] = state.playerY + self.env.new_height//2
+        self.angle[cars] = state.angle
+        self.speed[cars] = state.speed
+        self.score[cars] = state.score
+        self.distance_covered[cars] = state.distance_covered
+        self.steps_taken[cars] = state.steps_taken
+        return self.observe()
+
+    def observe(self):
+        """Normalised ray distances, speed and heading of every car, shape (N, observations)"""
+        distances = self.env.cast_rays_batch(self.x, self.y, self.angle)
+        radians = np.radians(self.angle)
+        return np.column_stack([distances / self.sensors.max_length, self.speed / STEP_MAX_SPEED,
+                                np.sin(radians), np.cos(radians)])
+
+    def car_corners(self):
+        """Corners of every car's oriented bounding box, shape (N, 4, 2)"""
+        cos_a = np.cos(np.radians(-self.angle))[:, None]
+        sin_a = np.sin(np.radians(-self.angle))[:, None]
+        offsets = self.env.car_corner_offsets
+        return np.stack([offsets[:, 0] * cos_a - offsets[:, 1] * sin_a + self.x[:, None],
+                         offsets[:, 0] * sin_a + offsets[:, 1] * cos_a + self.y[:, None]], axis=-1)
+
+    def cars_on_track(self):
+        """Whether all four corners of each car are inside the track corridor, shape (N,)"""
+        inside = self.env.track_corridor.contains(self.car_corners().reshape(-1, 2))
+        return inside.reshape(self.num_cars, 4).all(axis=1)
+
+    def step(self, actions):
+        """
+        Take one action per car.
+        :param actions: (N,) integer actions, 0 left, 1 right, 2 accelerate, 3 brake as in GameEnvironment.step
+        :return: observations (N, observations), rewards (N,), dones (N,) and an info dict of per-car arrays.
+                 Cars that are done have already been reset, their observation is the start observation and
+                 info['final_observation'] holds what they saw when they left the track.
+        """
+        actions = np.asarray(actions)
+        accelerating = actions == 2
+        braking = actions == 3
+        coasting = ~(accelerating | braking)
+        speed = self.speed
+
+        # Update speed, each branch of GameEnvironment.step as a mask
+        new_speed = np.where(coasting & (speed > 0), speed - STEP_FRICTION,
+                             np.where(coasting & (speed < 0), speed + STEP_FRICTION, speed))
+        new_speed[coasting & (np.abs(new_speed) < STEP_FRICTION)] = 0
+        new_speed = np.where(accelerating, np.where(speed < 0, speed + STEP_FRICTION,
+                                                    np.minimum(speed + STEP_ACCELERATION, STEP_MAX_SPEED)), new_speed)
+        new_speed = np.where(braking, np.where(speed > 0, speed - STEP_FRICTION,
+                                               np.maximum(speed - STEP_ACCELERATION, STEP_REVERSE_SPEED)), new_speed)
+        self.speed = speed = new_speed
+
+        # Turning follows the direction of travel and needs the car to be moving
+        direction = np.sign(speed)
+        self.angle += STEP_ROTATION_SPEED * direction * ((actions == 0).astype(float) - (actions == 1))
+
+        # Update position
+        radians = np.radians(-self.angle)
+        self.x += speed * np.cos(radians)
+        self.y += speed * np.sin(radians)
+        self.steps_taken += 1
+
+        dones = ~self.cars_on_track()
+
+        old_score = self.score
+        forward = speed > 0
+        self.distance_covered[forward] += speed[forward]
+        self.score = np.where(forward, (self.distance_covered / 10).astype(int), old_score)
+        rewards = np.where(dones, OFF_TRACK_PENALTY, (self.score - old_score) * 10)
+
+        observations = self.observe()
+        info = {
+            'score': self.score.copy(),
+            'distance': self.distance_covered.copy(),
+            'speed': self.speed.copy(),
+            'steps': self.steps_taken.copy(),
+            'final_observation': observations[dones],
+        }
+        if dones.any():
+            self.reset_cars(dones)
+            observations[dones] = self.start_observation
+        return observations, rewards, dones, info
@@ -1,13 +1,23 @@
+import sys
+import os
 import pygame
 import math
 import random
 from pygame import mixer
-from track import draw_track, TRACK_WIDTH, catmull_rom_chain, generate_track
+
+# trackkit, the track code shared by every game mode, is imported from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from trackkit import TRACK_WIDTH, TrackCache, TrackCorridor
+from trackkit.render import TrackLayer
 
 pygame.init()
 mixer.init()
 
 NUM_POINTS = 100
+TRACK_SEED = None  # Set to an integer to replay the same track, None draws a new one every game
+TRACK_CACHE = TrackCache()
 WIDTH, HEIGHT = 800, 600
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Track Invaders")
@@ -47,16 +57,6 @@ def draw_text(text, font, color, surface, x, y):
     text_rect = text_obj.get_rect(center=(x, y))
     surface.blit(text_obj, text_rect)
 
-def angle_between(A, B, C):
-    BA_x, BA_y = A[0] - B[0], A[1] - B[1]
-    BC_x, BC_y = C[0] - B[0], C[1] - B[1]
-    dot_product = BA_x * BC_x + BA_y * BC_y
-    norm_BA = math.sqrt(BA_x**2 + BA_y**2)
-    norm_BC = math.sqrt(BC_x**2 + BC_y**2)
-    cos_theta = dot_product / (norm_BA * norm_BC)
-    theta = math.acos(max(-1, min(1, cos_theta))) 
-    return math.degrees(theta)
-
 def main_menu():
     global current_option
     menu_running = True
@@ -181,7 +181,7 @@ def rules_menu():
         pygame.display.update()
 
 
-def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
+def generate_tree_positions(num_trees, track_geometry, tree_size, min_distance):
     tree_positions = []
     control_areas = [(WIDTH - 150, HEIGHT - 150, 100, 100),  # Steering wheel area
                      (0, HEIGHT - 100, 100, 100),  # Accelerator area
@@ -192,12 +192,7 @@ def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
         tree_y = random.randint(0, HEIGHT - tree_size[1])
 
         # Check if the tree is outside the track and controls
-        on_track_or_controls = False
-        for outer_point in outer_points:
-            distance = math.sqrt((tree_x - outer_point[0]) ** 2 + (tree_y - outer_point[1]) ** 2)
-            if distance < TRACK_WIDTH:
-                on_track_or_controls = True
-                break
+        on_track_or_controls = track_geometry.distance_to_outer((tree_x, tree_y)) < TRACK_WIDTH
         for area in control_areas:
             if area[0] <= tree_x <= area[0] + area[2] and area[1] <= tree_y <= area[1] + area[3]:
                 on_track_or_controls = True
@@ -218,33 +213,30 @@ def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
 def player(x, y, angle):
     rotated_image = pygame.transform.rotate(playerImg, angle)
     new_rect = rotated_image.get_rect(center=(x + new_width // 2, y + new_height // 2))
-    screen.blit(rotated_image, new_rect.topleft)
+    track_layer.blit(rotated_image, new_rect.topleft)
 
 
 def draw_steering_wheel():
     rotated_wheel = pygame.transform.rotate(steering_wheel_img, -steering_angle)
     wheel_rect = rotated_wheel.get_rect(center=(WIDTH - 100, HEIGHT - 100))
-    screen.blit(rotated_wheel, wheel_rect.topleft)
+    track_layer.blit(rotated_wheel, wheel_rect.topleft)
 
 
 def draw_pedals(accelerating, braking):
     if accelerating:
         scaled_accel = pygame.transform.scale(accelerator_img, (pedal_size[0] - 10, pedal_size[1] - 10))
-        screen.blit(scaled_accel, accelerator_rect.topleft)
+        track_layer.blit(scaled_accel, accelerator_rect.topleft)
     else:
-        screen.blit(accelerator_img, accelerator_rect.topleft)
+        track_layer.blit(accelerator_img, accelerator_rect.topleft)
 
     if braking:
         scaled_brake = pygame.transform.scale(brake_img, (pedal_size[0] - 10, pedal_size[1] - 10))
-        screen.blit(scaled_brake, brake_rect.topleft)
+        track_layer.blit(scaled_brake, brake_rect.topleft)
     else:
-        screen.blit(brake_img, brake_rect.topleft)
+        track_layer.blit(brake_img, brake_rect.topleft)
 
 
 def is_within_track(car_rect, inner_points, outer_points):
-    def get_distance(point1, point2):
-        return math.sqrt((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2)
-
     car_length = car_rect.height // 2  
     angle_rad = math.radians(-angle)  
 
@@ -253,58 +245,21 @@ def is_within_track(car_rect, inner_points, outer_points):
     rear_point = (car_rect.centerx - car_length * math.cos(angle_rad),
                   car_rect.centery - car_length * math.sin(angle_rad))
 
-    for i in range(len(inner_points) - 1):
-        inner_front_dist = get_distance(front_point, inner_points[i])
-        outer_front_dist = get_distance(front_point, outer_points[i])
-        inner_rear_dist = get_distance(rear_point, inner_points[i])
-        outer_rear_dist = get_distance(rear_point, outer_points[i])
-
-        if (inner_front_dist < TRACK_WIDTH and outer_front_dist < TRACK_WIDTH) and \
-           (inner_rear_dist < TRACK_WIDTH and outer_rear_dist < TRACK_WIDTH):
-            return True  # Both front and rear are inside the track
-
-    return False 
+    return bool(track_corridor.contains([front_point, rear_point]).all())  # Both front and rear are inside the track
 
 
 
 def game_loop():
     font_size = 30
     font = pygame.font.Font(None, font_size)
-    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, num_trees
-
-    track_points = []
-    done=1
-    while(done==1):
-        for i in range(6):
-            if i < 6 // 2:
-                track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                     40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-            else:
-                track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                     50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        done=0
-        for i in range(6):
-            A=track_points[i%6]
-            B=track_points[(i+1)%6]
-            C=track_points[(i+2)%6]
-            if angle_between(A, B, C)<=90:
-                done=1
-                track_points=[]
-                break
-        
-    for i in range(6 // 2):
-        track_points.append(track_points[i])
+    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, track_geometry, num_trees, track_corridor, track_layer
 
-    curve_points = catmull_rom_chain(track_points, NUM_POINTS)
-    outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+    track = TRACK_CACHE.get(TRACK_SEED, TRACK_WIDTH, NUM_POINTS, (WIDTH, HEIGHT), min_corner_angle=90)
+    track_points, track_geometry = track.track_points, track.geometry
+    curve_points, outer_points, inner_points = track_geometry.centreline, track_geometry.outer, track_geometry.inner
+    track_corridor = TrackCorridor(track_geometry.resampled())  # Same corridor within half a pixel, far fewer segments
 
-    start_index = 5  # Move a few points forward to avoid track boundary issues
-    playerX, playerY = (outer_points[start_index][0] + inner_points[start_index][0]) / 2, \
-                       (outer_points[start_index][1] + inner_points[start_index][1]) / 2
-
-    nextX, nextY = (outer_points[start_index + 1][0] + inner_points[start_index + 1][0]) / 2, \
-                   (outer_points[start_index + 1][1] + inner_points[start_index + 1][1]) / 2
-    angle = -math.degrees(math.atan2(nextY - playerY, nextX - playerX))  
+    playerX, playerY, angle = track.start_pose
 
     player_speed = 0
     acceleration = 0.005
@@ -318,7 +273,9 @@ def game_loop():
     steering_return_speed = 2
     distance_covered = 0
 
-    tree_positions = generate_tree_positions(10, outer_points, tree_size, min_distance=100)
+    tree_positions = generate_tree_positions(10, track_geometry, tree_size, min_distance=100)
+    # Track and trees are drawn once, under the car; each frame only redraws what moved
+    track_layer = TrackLayer(screen, track.surface(), [(tree_img, tree_pos) for tree_pos in tree_positions])
 
     clock = pygame.time.Clock()
     running = True
@@ -332,7 +289,7 @@ def game_loop():
     engine_start_sound = mixer.Sound("sounds/engine_start.wav")
 
     while running:
-        screen.fill((0, 170, 0))
+        track_layer.begin()
         if engine_start_once:  # engine starts once
             engine_start_sound.play()
             engine_start_once = False
@@ -345,8 +302,6 @@ def game_loop():
                 engine_sound.play(-1)
 
         if not game_over:
-            draw_track(screen, outer_points, inner_points, curve_points, TRACK_WIDTH)
-
             keys = pygame.key.get_pressed()
             accelerating = keys[pygame.K_UP]
             braking = keys[pygame.K_DOWN]
@@ -414,11 +369,9 @@ def game_loop():
             playerY = max(0, min(HEIGHT - new_height, playerY))
 
             player(playerX, playerY, angle)
-            for tree_pos in tree_positions:
-                screen.blit(tree_img, tree_pos)
 
             score_text = font.render(f"Score: {int(distance_covered / 10)}", True, (255, 255, 255))
-            screen.blit(score_text, (WIDTH - 200, 15))
+            track_layer.blit(score_text, (WIDTH - 200, 15))
 
             draw_steering_wheel()
             draw_pedals(accelerating, braking)
@@ -438,9 +391,9 @@ def game_loop():
                 return "Restart"
         fps = int(clock.get_fps())
         fps_text = font.render(f"FPS: {fps}", True, (255, 255, 255))
-        screen.blit(fps_text, (15, 15))
+        track_layer.blit(fps_text, (15, 15))
 
-        pygame.display.update()
+        track_layer.end()
         clock.tick()
 
     pygame.quit()
@@ -4,8 +4,15 @@ import sys
 import os
 
 import neat
+import numpy as np
 import pygame
 
+# trackkit, the track code shared by every game mode, is imported from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from trackkit import TrackMask, SensorLayout
+
 # Constants
 WIDTH = 800
 HEIGHT = 600
@@ -17,6 +24,9 @@ BORDER_COLOR = (0,170,0) # Color To Crash on Hit
 
 current_generation = 0 # Generation counter
 
+# From -90 To 120 With Step-Size 45, Radar Angles Are 360 - (Angle + Degree)
+RADARS = SensorLayout(np.arange(-90, 120, 45), max_length=150, sign=-1, bias=360)
+
 class Car:
 
     def __init__(self, startx, starty):
@@ -34,6 +44,7 @@ class Car:
 
         self.center = [self.position[0] + CAR_SIZE_X / 2, self.position[1] + CAR_SIZE_Y / 2] # Calculate Center
 
+        self.sensors = RADARS # Radar Layout
         self.radars = [] # List For Sensors / Radars
         self.drawing_radars = [] # Radars To Be Drawn
 
@@ -54,48 +65,13 @@ class Car:
             pygame.draw.line(screen, (255, 255, 255), self.center, position, 1)
             pygame.draw.circle(screen, (255, 255, 255), position, 5)
 
-    def check_collision(self, game_map):
-        self.alive = True
-        for point in self.corners:
-            # If Any Corner Touches Border Color -> Crash
-            # Assumes Rectangle
-            if game_map.get_at((int(point[0]), int(point[1]))) == BORDER_COLOR:
-                self.alive = False
-                break
-
-    def check_radar(self, degree, game_map):
-        length = 1
-        max_length = 150  # Max radar length
-
-        while length < max_length:
-            x = int(self.center[0] + math.cos(math.radians(360 - (self.angle + degree))) * length)
-            y = int(self.center[1] + math.sin(math.radians(360 - (self.angle + degree))) * length)
-
-            try:
-                # If we hit the track boundary, stop
-                if game_map.get_at((x, y)) == BORDER_COLOR:
-                    break  
-            except IndexError:
-                # If we go out of bounds, use frame distance instead
-                break  
-
-            length += 1  
-
-        # Calculate distance to the track boundary (if detected)
-        track_dist = int(math.sqrt((x - self.center[0]) ** 2 + (y - self.center[1]) ** 2))
+    def check_collision(self, track_mask):
+        # If Any Corner Touches Border Color -> Crash
+        # Assumes Rectangle, All Four Corners Are Looked Up At Once
+        xs, ys = zip(*self.corners)
+        self.alive = bool(track_mask.contains(xs, ys).all())
 
-        # If an IndexError happened, calculate the frame boundary distance
-        if x < 0 or x >= WIDTH or y < 0 or y >= HEIGHT:
-            frame_x = max(0, min(WIDTH - 1, x))  # Ensure within width
-            frame_y = max(0, min(HEIGHT - 1, y))  # Ensure within height
-            frame_dist = int(math.sqrt((frame_x - self.center[0]) ** 2 + (frame_y - self.center[1]) ** 2))
-            dist = frame_dist  # Use frame distance if out of bounds
-        else:
-            dist = track_dist  # Use track distance otherwise
-
-        self.radars.append([(x, y), dist])
-
-    def update(self, game_map):
+    def update(self, track_mask):
         # Set The Speed To 20 For The First Time
         # Only When Having 4 Output Nodes With Speed Up and Down
         if not self.speed_set:
@@ -130,18 +106,14 @@ class Car:
         right_bottom = [self.center[0] + math.cos(math.radians(360 - (self.angle + 330))) * length, self.center[1] + math.sin(math.radians(360 - (self.angle + 330))) * length]
         self.corners = [left_top, right_top, left_bottom, right_bottom]
 
-        # Check Collisions And Clear Radars
-        self.check_collision(game_map)
-        self.radars.clear()
-
-        # From -90 To 120 With Step-Size 45 Check Radar
-        for d in range(-90, 120, 45):
-            self.check_radar(d, game_map)
+        # Check Collisions And Radars
+        self.check_collision(track_mask)
+        check_radars([self], track_mask, self.sensors)
 
     def get_data(self):
         # Get Distances To Border
         radars = self.radars
-        return_values = [0, 0, 0, 0, 0]
+        return_values = [0] * self.sensors.num_rays
         for i, radar in enumerate(radars):
             return_values[i] = int(radar[1] / 30)
 
@@ -166,6 +138,23 @@ class Car:
         return rotated_image
 
 
+def check_radars(cars, track_mask, sensors=RADARS):
+    # Cast All Radars Of All Cars In One Call
+    centers = np.array([car.center for car in cars], dtype=float)
+    center_x, center_y = centers[:, :1], centers[:, 1:]
+    dx, dy = sensors.directions([car.angle for car in cars])
+    lengths = track_mask.cast(center_x, center_y, dx, dy, sensors.max_length)
+    xs = (center_x + dx * lengths).astype(int)
+    ys = (center_y + dy * lengths).astype(int)
+
+    # Outside The Frame Use The Frame Distance Instead
+    frame_x = np.clip(xs, 0, WIDTH - 1)
+    frame_y = np.clip(ys, 0, HEIGHT - 1)
+    dists = np.sqrt((frame_x - center_x) ** 2 + (frame_y - center_y) ** 2).astype(int)
+
+    for car, car_xs, car_ys, car_dists in zip(cars, xs.tolist(), ys.tolist(), dists.tolist()):
+        car.radars = [[(x, y), dist] for x, y, dist in zip(car_xs, car_ys, car_dists)]
+
 def run_simulation(genomes, config):
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -177,18 +166,15 @@ def run_simulation(genomes, config):
     #game_map = pygame.transform.scale(game_map, (WIDTH, HEIGHT))
     screen.blit(game_map, (0, 0))  
     pygame.display.flip()
+    track_mask = TrackMask.from_surface(game_map, BORDER_COLOR)
     startx=0; starty=0
-    done=False
-    for i in range(800):
-        for j in range(600):
-            color=screen.get_at((i,j))
-            if color.r==255 and color.g==0 and color.b==255:
-                screen.set_at((i,j), (100,100,100))
-                done=True
-                startx=i; starty=j
-                break
-        if done:
-            break
+    # Find The Magenta Start Pixel Without Reading Pixels One By One
+    pixels = pygame.surfarray.pixels3d(screen)
+    start = np.argwhere((pixels[..., 0] == 255) & (pixels[..., 1] == 0) & (pixels[..., 2] == 255))
+    del pixels
+    if len(start):
+        startx, starty = (int(v) for v in start[0])
+        screen.set_at((startx, starty), (100,100,100))
     #print(startx, starty)
     clock = pygame.time.Clock()
     font = pygame.font.SysFont("Arial", 20)
@@ -228,7 +214,7 @@ def run_simulation(genomes, config):
                 car.speed += 0.5  
 
             # Update car and fitness
-            car.update(game_map)
+            car.update(track_mask)
             genome.fitness += car.get_reward()
             current_score = car.distance/10
 
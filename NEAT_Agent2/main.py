@@ -1,17 +1,28 @@
 from platform import machine
+import sys
 import pygame
 import math
 import random
 import agent
 import os
 import csv
+import numpy as np
 from pygame import mixer
-from track import draw_track, TRACK_WIDTH, catmull_rom_chain, generate_track
+
+# trackkit, the track code shared by every game mode, is imported from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from trackkit import (TRACK_WIDTH, catmull_rom_chain, random_track_points, TrackGeometry, TrackCache, TrackMask,
+                      SensorLayout)
+from trackkit.render import draw_track
 
 pygame.init()
 mixer.init()
 
 NUM_POINTS = 100
+TRACK_SEED = None  # Set to an integer to replay the same track, None draws a new one every game
+TRACK_CACHE = TrackCache()
 WIDTH, HEIGHT = 800, 600
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Track Invaders")
@@ -52,45 +63,13 @@ def draw_text(text, font, color, surface, x, y):
     text_rect = text_obj.get_rect(center=(x, y))
     surface.blit(text_obj, text_rect)
 
-def angle_between(A, B, C):
-    BA_x, BA_y = A[0] - B[0], A[1] - B[1]
-    BC_x, BC_y = C[0] - B[0], C[1] - B[1]
-    dot_product = BA_x * BC_x + BA_y * BC_y
-    norm_BA = math.sqrt(BA_x**2 + BA_y**2)
-    norm_BC = math.sqrt(BC_x**2 + BC_y**2)
-    cos_theta = dot_product / (norm_BA * norm_BC)
-    theta = math.acos(max(-1, min(1, cos_theta))) 
-    return math.degrees(theta)
-
 def save_track_image():
     screen.fill((0, 170, 0))  # Green background
 
-    # Generate track points similar to game loop
-    track_points = []
-    done=1
-    while(done==1):
-        for i in range(6):
-            if i < 6 // 2:
-                track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                     40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-            else:
-                track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                     50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        done=0
-        for i in range(6):
-            A=track_points[i%6]
-            B=track_points[(i+1)%6]
-            C=track_points[(i+2)%6]
-            if angle_between(A, B, C)<=90: # less sharper edges
-                done=1
-                track_points=[]
-                break
-        
-    for i in range(6 // 2):
-        track_points.append(track_points[i])
-    # Generate curve points and track
-    curve_points = catmull_rom_chain(track_points, NUM_POINTS)
-    outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+    # Draw a valid track, with no corner of 90 degrees or sharper
+    track_geometry = TrackGeometry(catmull_rom_chain(random_track_points(min_corner_angle=90), NUM_POINTS),
+                                   TRACK_WIDTH)
+    curve_points, outer_points, inner_points = track_geometry.centreline, track_geometry.outer, track_geometry.inner
 
     # Draw the track exactly like in the game
     draw_track(screen, outer_points, inner_points, curve_points, TRACK_WIDTH)
@@ -235,7 +214,7 @@ def rules_menu():
         pygame.display.update()
 
 
-def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
+def generate_tree_positions(num_trees, track_geometry, tree_size, min_distance):
     tree_positions = []
     control_areas = [(WIDTH - 150, HEIGHT - 150, 100, 100),  # Steering wheel area
                      (0, HEIGHT - 100, 100, 100),  # Accelerator area
@@ -246,12 +225,7 @@ def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
         tree_y = random.randint(0, HEIGHT - tree_size[1])
 
         # Check if the tree is outside the track and controls
-        on_track_or_controls = False
-        for outer_point in outer_points:
-            distance = math.sqrt((tree_x - outer_point[0]) ** 2 + (tree_y - outer_point[1]) ** 2)
-            if distance < TRACK_WIDTH:
-                on_track_or_controls = True
-                break
+        on_track_or_controls = track_geometry.distance_to_outer((tree_x, tree_y)) < TRACK_WIDTH
         for area in control_areas:
             if area[0] <= tree_x <= area[0] + area[2] and area[1] <= tree_y <= area[1] + area[3]:
                 on_track_or_controls = True
@@ -274,21 +248,12 @@ def player(x, y, angle):
     new_rect = rotated_image.get_rect(center=(x + new_width // 2, y + new_height // 2))
     screen.blit(rotated_image, new_rect.topleft)
 
-def sub_ray_cast(x, y, angle):
-    max_length=150
-    length=1
-    xi=0
-    yi=0
-    while length<max_length:
-        xi=int(x-math.sin(math.radians(angle))*length)
-        yi=int(y-math.cos(math.radians(angle))*length)
-        try:
-            clr=screen.get_at((xi,yi))
-            if clr.r==0 and clr.g==170 and clr.b==0:
-                break
-        except IndexError:
-            break
-        length+=1
+# 8 rays every 45 degrees, pointing along (-sin, -cos) of angle + offset
+SENSORS = SensorLayout(np.arange(-7, 1) * 45, max_length=150, sign=-1, bias=-90)
+
+def sub_ray_cast(x, y, dx, dy, length):
+    xi=int(x+dx*length)
+    yi=int(y+dy*length)
     dist=int(math.sqrt((x-xi)**2 + (y-yi)**2))
     if xi < 0 or xi >= WIDTH or yi < 0 or yi >= HEIGHT:
         xi = max(0, min(WIDTH - 1, xi))
@@ -300,9 +265,11 @@ def sub_ray_cast(x, y, angle):
 def ray_cast(x, y, angle):
     xc=x+new_width//2
     yc=y+new_height//2
+    dx, dy = SENSORS.directions(angle)       # looked up, no trig per ray
+    lengths = track_mask.cast(xc, yc, dx, dy, SENSORS.max_length)       # all rays in one lookup
     ray_dist=[]
-    for deg in range(-7,1):
-        ray_dist.append(sub_ray_cast(xc, yc, angle+deg*45))
+    for ray_dx, ray_dy, length in zip(dx, dy, lengths.tolist()):
+        ray_dist.append(sub_ray_cast(xc, yc, ray_dx, ray_dy, length))
     return ray_dist
 
 def draw_steering_wheel():
@@ -334,30 +301,14 @@ def is_within_track(ray_dist):
 def game_loop():
     font_size = 30
     font = pygame.font.Font(None, font_size)
-    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, num_trees
-
-    track_points = []
-    for i in range(6):
-        if i < 6 // 2:
-            track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        else:
-            track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-
-    for i in range(6 // 2):
-        track_points.append(track_points[i])
-
-    curve_points = catmull_rom_chain(track_points, NUM_POINTS)
-    outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, track_geometry, num_trees, track_mask
 
-    start_index = 5  # Move a few points forward to avoid track boundary issues
-    playerX, playerY = (outer_points[start_index][0] + inner_points[start_index][0]) / 2, \
-                       (outer_points[start_index][1] + inner_points[start_index][1]) / 2
+    track = TRACK_CACHE.get(TRACK_SEED, TRACK_WIDTH, NUM_POINTS, (WIDTH, HEIGHT))
+    track_points, track_geometry = track.track_points, track.geometry
+    curve_points, outer_points, inner_points = track_geometry.centreline, track_geometry.outer, track_geometry.inner
+    track_mask = TrackMask(track.on_track, track.field)
 
-    nextX, nextY = (outer_points[start_index + 1][0] + inner_points[start_index + 1][0]) / 2, \
-                   (outer_points[start_index + 1][1] + inner_points[start_index + 1][1]) / 2
-    angle = -math.degrees(math.atan2(nextY - playerY, nextX - playerX))
+    playerX, playerY, angle = track.start_pose
     playerX-=new_width//2
     playerY-=new_height//2
     player_speed = 0
@@ -372,7 +323,7 @@ def game_loop():
     steering_return_speed = 2
     distance_covered = 0
 
-    tree_positions = generate_tree_positions(10, outer_points, tree_size, min_distance=100)
+    tree_positions = generate_tree_positions(10, track_geometry, tree_size, min_distance=100)
 
     clock = pygame.time.Clock()
     running = True
@@ -390,8 +341,8 @@ def game_loop():
     
         # Generate new track points
         base_track_points = [(random.randint(100, 700), random.randint(100, 500)) for _ in range(6)]
-        curve_points = catmull_rom_chain(base_track_points, NUM_POINTS)
-        outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+        track_geometry = TrackGeometry(catmull_rom_chain(base_track_points, NUM_POINTS), TRACK_WIDTH)
+        curve_points, outer_points, inner_points = track_geometry.centreline, track_geometry.outer, track_geometry.inner
 
         # Draw the track on the screen
         draw_track(screen, outer_points, inner_points, curve_points, TRACK_WIDTH)
@@ -524,28 +475,13 @@ def train_loop():
     if file.tell()==0:
         writer.writerow(["Dist1", "Dist2", "Dist3", "Dist4", "Dist5", "Dist6", "Dist7", "Choice", "Velocity"])
         file.flush()
-    t_track_points=[]
-    for i in range(6):
-        if i < 6 // 2:
-            t_track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        else:
-            t_track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-
-    for i in range(6 // 2):
-        t_track_points.append(t_track_points[i])
-        
-    t_curve_points = catmull_rom_chain(t_track_points, NUM_POINTS)
-    t_outer_points, t_inner_points = generate_track(t_curve_points, TRACK_WIDTH)
+    t_track = TRACK_CACHE.get(TRACK_SEED, TRACK_WIDTH, NUM_POINTS, (WIDTH, HEIGHT))
+    t_track_points, t_track_geometry = t_track.track_points, t_track.geometry
+    t_curve_points, t_outer_points, t_inner_points = t_track_geometry.centreline, t_track_geometry.outer, t_track_geometry.inner
+    global track_mask
+    track_mask = TrackMask(t_track.on_track, t_track.field)
     
-    start_index = 5  
-    t_playerX, t_playerY = (t_outer_points[start_index][0] + t_inner_points[start_index][0]) / 2, \
-                       (t_outer_points[start_index][1] + t_inner_points[start_index][1]) / 2
-
-    nextX, nextY = (t_outer_points[start_index + 1][0] + t_inner_points[start_index + 1][0]) / 2, \
-                   (t_outer_points[start_index + 1][1] + t_inner_points[start_index + 1][1]) / 2
-    t_angle = -math.degrees(math.atan2(nextY - t_playerY, nextX - t_playerX))
+    t_playerX, t_playerY, t_angle = t_track.start_pose
     t_playerX-=new_width//2
     t_playerY-=new_height//2
 
@@ -1,11 +1,19 @@
 from platform import machine
+import sys
 import pygame
 import math
 import random
 import os
 import csv
 from pygame import mixer
-from track import draw_track, TRACK_WIDTH, catmull_rom_chain, generate_track
+
+# trackkit, the track code shared by every game mode, is imported from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from trackkit import (TRACK_WIDTH, catmull_rom_chain, random_track_points, TrackGeometry, TrackCache, TrackMask,
+                      SensorLayout)
+from trackkit.render import draw_track, TrackLayer
 import tensorflow as tf
 from tensorflow import keras
 import numpy as np
@@ -14,6 +22,8 @@ pygame.init()
 mixer.init()
 
 NUM_POINTS = 100
+TRACK_SEED = None  # Set to an integer to replay the same track, None draws a new one every game
+TRACK_CACHE = TrackCache()
 WIDTH, HEIGHT = 800, 600
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Track Invaders")
@@ -58,22 +68,9 @@ def draw_text(text, font, color, surface, x, y):
 def save_track_image():
     screen.fill((0, 170, 0))  # Green background
 
-    # Generate track points similar to game loop
-    track_points = []
-    for i in range(6):
-        if i < 6 // 2:
-            track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        else:
-            track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-
-    for i in range(6 // 2):
-        track_points.append(track_points[i])  # Close the loop
-
-    # Generate curve points and track
-    curve_points = catmull_rom_chain(track_points, NUM_POINTS)
-    outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+    # Generate track points like the game loop
+    track_geometry = TrackGeometry(catmull_rom_chain(random_track_points(), NUM_POINTS), TRACK_WIDTH)
+    curve_points, outer_points, inner_points = track_geometry.centreline, track_geometry.outer, track_geometry.inner
 
     # Draw the track exactly like in the game
     draw_track(screen, outer_points, inner_points, curve_points, TRACK_WIDTH)
@@ -221,7 +218,7 @@ def rules_menu():
         pygame.display.update()
 
 
-def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
+def generate_tree_positions(num_trees, track_geometry, tree_size, min_distance):
     tree_positions = []
     control_areas = [(WIDTH - 150, HEIGHT - 150, 100, 100),  # Steering wheel area
                      (0, HEIGHT - 100, 100, 100),  # Accelerator area
@@ -232,12 +229,7 @@ def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
         tree_y = random.randint(0, HEIGHT - tree_size[1])
 
         # Check if the tree is outside the track and controls
-        on_track_or_controls = False
-        for outer_point in outer_points:
-            distance = math.sqrt((tree_x - outer_point[0]) ** 2 + (tree_y - outer_point[1]) ** 2)
-            if distance < TRACK_WIDTH:
-                on_track_or_controls = True
-                break
+        on_track_or_controls = track_geometry.distance_to_outer((tree_x, tree_y)) < TRACK_WIDTH
         for area in control_areas:
             if area[0] <= tree_x <= area[0] + area[2] and area[1] <= tree_y <= area[1] + area[3]:
                 on_track_or_controls = True
@@ -258,57 +250,50 @@ def generate_tree_positions(num_trees, outer_points, tree_size, min_distance):
 def player(x, y, angle):
     rotated_image = pygame.transform.rotate(playerImg, angle)
     new_rect = rotated_image.get_rect(center=(x + new_width // 2, y + new_height // 2))
-    screen.blit(rotated_image, new_rect.topleft)
-
-def sub_ray_cast(x, y, angle):
-    max_length=150
-    length=1
-    xi=0
-    yi=0
-    while length<max_length:
-        xi=int(x-math.sin(math.radians(angle))*length)
-        yi=int(y-math.cos(math.radians(angle))*length)
-        try:
-            clr=screen.get_at((xi,yi))
-            if clr.r==0 and clr.g==170 and clr.b==0:
-                break
-        except IndexError:
-            break
-        length+=1
+    track_layer.blit(rotated_image, new_rect.topleft)
+
+# 8 rays every 45 degrees, pointing along (-sin, -cos) of angle + offset
+SENSORS = SensorLayout(np.arange(-7, 1) * 45, max_length=150, sign=-1, bias=-90)
+
+def sub_ray_cast(x, y, dx, dy, length):
+    xi=int(x+dx*length)
+    yi=int(y+dy*length)
     dist=int(math.sqrt((x-xi)**2 + (y-yi)**2))
     if xi < 0 or xi >= WIDTH or yi < 0 or yi >= HEIGHT:
         xi = max(0, min(WIDTH - 1, xi))
         yi = max(0, min(HEIGHT - 1, yi))
         dist=int(math.sqrt((x-xi)**2 + (y-yi)**2))
-    pygame.draw.line(screen, (255, 255, 255), (x,y), (xi,yi))       #comment to remove rays
+    track_layer.mark(pygame.draw.line(screen, (255, 255, 255), (x,y), (xi,yi)))       #comment to remove rays
     return dist
 
 def ray_cast(x, y, angle):
     xc=x+new_width//2
     yc=y+new_height//2
+    dx, dy = SENSORS.directions(angle)       # looked up, no trig per ray
+    lengths = track_mask.cast(xc, yc, dx, dy, SENSORS.max_length)       # all rays in one lookup
     ray_dist=[]
-    for deg in range(-7,1):
-        ray_dist.append(sub_ray_cast(xc, yc, angle+deg*45))
+    for ray_dx, ray_dy, length in zip(dx, dy, lengths.tolist()):
+        ray_dist.append(sub_ray_cast(xc, yc, ray_dx, ray_dy, length))
     return ray_dist
 
 def draw_steering_wheel():
     rotated_wheel = pygame.transform.rotate(steering_wheel_img, -steering_angle)
     wheel_rect = rotated_wheel.get_rect(center=(WIDTH - 100, HEIGHT - 100))
-    screen.blit(rotated_wheel, wheel_rect.topleft)
+    track_layer.blit(rotated_wheel, wheel_rect.topleft)
 
 
 def draw_pedals(accelerating, braking):
     if accelerating:
         scaled_accel = pygame.transform.scale(accelerator_img, (pedal_size[0] - 10, pedal_size[1] - 10))
-        screen.blit(scaled_accel, accelerator_rect.topleft)
+        track_layer.blit(scaled_accel, accelerator_rect.topleft)
     else:
-        screen.blit(accelerator_img, accelerator_rect.topleft)
+        track_layer.blit(accelerator_img, accelerator_rect.topleft)
 
     if braking:
         scaled_brake = pygame.transform.scale(brake_img, (pedal_size[0] - 10, pedal_size[1] - 10))
-        screen.blit(scaled_brake, brake_rect.topleft)
+        track_layer.blit(scaled_brake, brake_rect.topleft)
     else:
-        screen.blit(brake_img, brake_rect.topleft)
+        track_layer.blit(brake_img, brake_rect.topleft)
 
 
 def is_within_track(ray_dist):
@@ -320,30 +305,15 @@ def is_within_track(ray_dist):
 def agent_game_loop():
     font_size = 30
     font = pygame.font.Font(None, font_size)
-    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, num_trees
-
-    track_points = []
-    for i in range(6):
-        if i < 6 // 2:
-            track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        else:
-            track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-
-    for i in range(6 // 2):
-        track_points.append(track_points[i])
+    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, track_geometry, num_trees, track_mask, track_layer
 
-    curve_points = catmull_rom_chain(track_points, NUM_POINTS)
-    outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+    track = TRACK_CACHE.get(TRACK_SEED, TRACK_WIDTH, NUM_POINTS, (WIDTH, HEIGHT))
+    track_points, track_geometry = track.track_points, track.geometry
+    curve_points, outer_points, inner_points = track_geometry.centreline, track_geometry.outer, track_geometry.inner
+    track_mask = TrackMask(track.on_track, track.field)
+    track_layer = TrackLayer(screen, track.surface())  # Track drawn once, each frame only redraws what moved
 
-    start_index = 5  # Move a few points forward to avoid track boundary issues
-    playerX, playerY = (outer_points[start_index][0] + inner_points[start_index][0]) / 2, \
-                       (outer_points[start_index][1] + inner_points[start_index][1]) / 2
-
-    nextX, nextY = (outer_points[start_index + 1][0] + inner_points[start_index + 1][0]) / 2, \
-                   (outer_points[start_index + 1][1] + inner_points[start_index + 1][1]) / 2
-    angle = -math.degrees(math.atan2(nextY - playerY, nextX - playerX))
+    playerX, playerY, angle = track.start_pose
     playerX-=new_width//2
     playerY-=new_height//2
     player_speed = 0.7
@@ -372,7 +342,7 @@ def agent_game_loop():
     agentmodel=keras.models.load_model("agentmodel.keras")
 
     while running:
-        screen.fill((0, 170, 0))
+        track_layer.begin()
         if engine_start_once:  # engine starts once
             engine_start_sound.play()
             engine_start_once = False
@@ -385,7 +355,6 @@ def agent_game_loop():
                 engine_sound.play(-1)
 
         if not game_over:
-            draw_track(screen, outer_points, inner_points, curve_points, TRACK_WIDTH)
             ray_dist=ray_cast(playerX,playerY,angle)[:7]
            
             ray_dist=np.asarray(ray_dist).astype("float32")
@@ -465,7 +434,7 @@ def agent_game_loop():
 
             player(playerX, playerY, angle)
             score_text = font.render(f"Score: {int(distance_covered / 10)}", True, (255, 255, 255))
-            screen.blit(score_text, (WIDTH - 200, 15))
+            track_layer.blit(score_text, (WIDTH - 200, 15))
 
         else:
             engine_sound.stop()  # engine sound stops
@@ -482,9 +451,9 @@ def agent_game_loop():
                 return "Restart"
         fps = int(clock.get_fps())
         fps_text = font.render(f"FPS: {fps}", True, (255, 255, 255))
-        screen.blit(fps_text, (15, 15))
+        track_layer.blit(fps_text, (15, 15))
 
-        pygame.display.update()
+        track_layer.end()
         clock.tick()
 
     pygame.quit()
@@ -492,30 +461,14 @@ def agent_game_loop():
 def game_loop():
     font_size = 30
     font = pygame.font.Font(None, font_size)
-    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, num_trees
-
-    track_points = []
-    for i in range(6):
-        if i < 6 // 2:
-            track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        else:
-            track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
+    global playerX, playerY, angle, player_speed, steering_angle, distance_covered, track_points, curve_points, outer_points, inner_points, track_geometry, num_trees, track_mask, track_layer
 
-    for i in range(6 // 2):
-        track_points.append(track_points[i])
+    track = TRACK_CACHE.get(TRACK_SEED, TRACK_WIDTH, NUM_POINTS, (WIDTH, HEIGHT))
+    track_points, track_geometry = track.track_points, track.geometry
+    curve_points, outer_points, inner_points = track_geometry.centreline, track_geometry.outer, track_geometry.inner
+    track_mask = TrackMask(track.on_track, track.field)
 
-    curve_points = catmull_rom_chain(track_points, NUM_POINTS)
-    outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
-
-    start_index = 5  # Move a few points forward to avoid track boundary issues
-    playerX, playerY = (outer_points[start_index][0] + inner_points[start_index][0]) / 2, \
-                       (outer_points[start_index][1] + inner_points[start_index][1]) / 2
-
-    nextX, nextY = (outer_points[start_index + 1][0] + inner_points[start_index + 1][0]) / 2, \
-                   (outer_points[start_index + 1][1] + inner_points[start_index + 1][1]) / 2
-    angle = -math.degrees(math.atan2(nextY - playerY, nextX - playerX))
+    playerX, playerY, angle = track.start_pose
     playerX-=new_width//2
     playerY-=new_height//2
     player_speed = 0
@@ -530,7 +483,9 @@ def game_loop():
     steering_return_speed = 2
     distance_covered = 0
 
-    tree_positions = generate_tree_positions(10, outer_points, tree_size, min_distance=100)
+    tree_positions = generate_tree_positions(10, track_geometry, tree_size, min_distance=100)
+    # Track and trees are drawn once, under the car; each frame only redraws what moved
+    track_layer = TrackLayer(screen, track.surface(), [(tree_img, tree_pos) for tree_pos in tree_positions])
 
     clock = pygame.time.Clock()
     running = True
@@ -548,8 +503,8 @@ def game_loop():
     
         # Generate new track points
         base_track_points = [(random.randint(100, 700), random.randint(100, 500)) for _ in range(6)]
-        curve_points = catmull_rom_chain(base_track_points, NUM_POINTS)
-        outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+        track_geometry = TrackGeometry(catmull_rom_chain(base_track_points, NUM_POINTS), TRACK_WIDTH)
+        curve_points, outer_points, inner_points = track_geometry.centreline, track_geometry.outer, track_geometry.inner
 
         # Draw the track on the screen
         draw_track(screen, outer_points, inner_points, curve_points, TRACK_WIDTH)
@@ -559,7 +514,7 @@ def game_loop():
 
 
     while running:
-        screen.fill((0, 170, 0))
+        track_layer.begin()
         if engine_start_once:  # engine starts once
             engine_start_sound.play()
             engine_start_once = False
@@ -572,8 +527,6 @@ def game_loop():
                 engine_sound.play(-1)
 
         if not game_over:
-            draw_track(screen, outer_points, inner_points, curve_points, TRACK_WIDTH)
-
             keys = pygame.key.get_pressed()
             accelerating = keys[pygame.K_UP]
             braking = keys[pygame.K_DOWN]
@@ -643,10 +596,8 @@ def game_loop():
             playerY = max(0, min(HEIGHT - new_height, playerY))
 
             player(playerX, playerY, angle)
-            for tree_pos in tree_positions:
-                screen.blit(tree_img, tree_pos)
             score_text = font.render(f"Score: {int(distance_covered / 10)}", True, (255, 255, 255))
-            screen.blit(score_text, (WIDTH - 200, 15))
+            track_layer.blit(score_text, (WIDTH - 200, 15))
 
             draw_steering_wheel()
             draw_pedals(accelerating, braking)
@@ -666,9 +617,9 @@ def game_loop():
                 return "Restart"
         fps = int(clock.get_fps())
         fps_text = font.render(f"FPS: {fps}", True, (255, 255, 255))
-        screen.blit(fps_text, (15, 15))
+        track_layer.blit(fps_text, (15, 15))
 
-        pygame.display.update()
+        track_layer.end()
         clock.tick()
 
     pygame.quit()
@@ -682,28 +633,14 @@ def train_loop():
     if file.tell()==0:
         writer.writerow(["Dist1", "Dist2", "Dist3", "Dist4", "Dist5", "Dist6", "Dist7", "Choice", "Velocity"])
         file.flush()
-    t_track_points=[]
-    for i in range(6):
-        if i < 6 // 2:
-            t_track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
-                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-        else:
-            t_track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
-                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
-
-    for i in range(6 // 2):
-        t_track_points.append(t_track_points[i])
-        
-    t_curve_points = catmull_rom_chain(t_track_points, NUM_POINTS)
-    t_outer_points, t_inner_points = generate_track(t_curve_points, TRACK_WIDTH)
+    t_track = TRACK_CACHE.get(TRACK_SEED, TRACK_WIDTH, NUM_POINTS, (WIDTH, HEIGHT))
+    t_track_points, t_track_geometry = t_track.track_points, t_track.geometry
+    t_curve_points, t_outer_points, t_inner_points = t_track_geometry.centreline, t_track_geometry.outer, t_track_geometry.inner
+    global track_mask, track_layer
+    track_mask = TrackMask(t_track.on_track, t_track.field)
+    track_layer = TrackLayer(screen, t_track.surface())  # Track drawn once, each frame only redraws what moved
     
-    start_index = 5  
-    t_playerX, t_playerY = (t_outer_points[start_index][0] + t_inner_points[start_index][0]) / 2, \
-                       (t_outer_points[start_index][1] + t_inner_points[start_index][1]) / 2
-
-    nextX, nextY = (t_outer_points[start_index + 1][0] + t_inner_points[start_index + 1][0]) / 2, \
-                   (t_outer_points[start_index + 1][1] + t_inner_points[start_index + 1][1]) / 2
-    t_angle = -math.degrees(math.atan2(nextY - t_playerY, nextX - t_playerX))
+    t_playerX, t_playerY, t_angle = t_track.start_pose
     t_playerX-=new_width//2
     t_playerY-=new_height//2
 
@@ -720,7 +657,7 @@ def train_loop():
     start_time = pygame.time.get_ticks()
 
     while running:
-        screen.fill((0,170,0))
+        track_layer.begin()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running=False
@@ -734,7 +671,6 @@ def train_loop():
         
         if not game_over:
             choice=[0,0,0,0]
-            draw_track(screen, t_outer_points, t_inner_points, t_curve_points, TRACK_WIDTH)
             keys=pygame.key.get_pressed()
             if keys[pygame.K_UP]:
                 choice[3]=1
@@ -812,7 +748,7 @@ def train_loop():
                 file.flush()
 
             score_text = font.render(f"Score: {int(t_distance_covered / 10)}", True, (255, 255, 255))
-            screen.blit(score_text, (WIDTH - 200, 15))
+            track_layer.blit(score_text, (WIDTH - 200, 15))
         else:
             #print(os.getcwd())
             file.close()
@@ -829,9 +765,9 @@ def train_loop():
                 return "Restart"
         fps = int(clock.get_fps())
         fps_text = font.render(f"FPS: {fps}", True, (255, 255, 255))
-        screen.blit(fps_text, (15, 15))
+        track_layer.blit(fps_text, (15, 15))
 
-        pygame.display.update()
+        track_layer.end()
         clock.tick(60)
     print(os.getcwd())
     file.close()
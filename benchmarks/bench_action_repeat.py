@@ -0,0 +1,68 @@
+"""
+Action repeat: a simple driver that steers towards the side with more room and otherwise accelerates
+drives the headless environment on one track for each repeat factor. Reported per setting are physics
+steps per second (every substep counts), decisions per second and the decisions it takes per lap of the
+centreline, along with how often the coarser control leaves the track.
+"""
+import time
+
+import numpy as np
+
+from common import use_mode, report, seed_everything
+
+use_mode("DQN")
+
+from gym_environment import BufferedGameEnvironment  # noqa: E402
+
+STEER_MARGIN = 0.3
+CRUISE_SPEED = 0.8
+
+
+def driver(observation, rays):
+    """
+    Turn towards the side whose rays see more room once moving, otherwise accelerate up to cruising
+    speed. Crude, it leaves the track every few hundred pixels, but it covers ground at every repeat.
+    """
+    half = rays // 2
+    room = observation[half:rays].sum() - observation[:half].sum()  # Positive offsets look left
+    speed = observation[rays]
+    if abs(room) > STEER_MARGIN and speed > 0.2 or speed >= CRUISE_SPEED:
+        return 0 if room > 0 else 1
+    return 2
+
+
+def drive(env, repeat, seconds=2.0):
+    rays = env.env.sensors.num_rays
+    lap_length = np.linalg.norm(np.diff(env.env.curve_points, axis=0, append=env.env.curve_points[:1]), axis=1).sum()
+    observation, _ = env.reset()
+    decisions = substeps = crashes = 0
+    distance = 0.0
+    begin = time.perf_counter()
+    while time.perf_counter() - begin < seconds:
+        before = env.env.steps_taken
+        observation, _, done, _, info = env.step(driver(observation, rays), repeat)
+        decisions += 1
+        substeps += env.env.steps_taken - before
+        if done:
+            crashes += 1
+            distance += info['distance']
+            observation, _ = env.reset()
+    elapsed = time.perf_counter() - begin
+    distance += env.env.distance_covered
+    return substeps / elapsed, decisions / elapsed, decisions / (distance / lap_length), crashes, distance / lap_length
+
+
+def main():
+    seed_everything(0)
+    env = BufferedGameEnvironment(track_seed=0)
+    baseline = None
+    for repeat in (1, 2, 4, 8, 16):
+        steps, decisions, per_lap, crashes, laps = drive(env, repeat)
+        report(f"repeat {repeat:>2}, physics steps", steps, baseline)
+        baseline = baseline or steps
+        print(f"{'':<10}{decisions:>10.0f} decisions/s, {per_lap:>7.0f} decisions per lap, "
+              f"{laps:.1f} laps driven, {crashes} off track")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Sensing many cars in one call against one call per car, for the mask radars and the segment raycaster.
+One car casts its segment rays against every segment, batches go through the segment grid.
+"""
+import math
+from types import SimpleNamespace
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+import pygame  # noqa: E402
+from agent import check_radars, RADARS, WIDTH, HEIGHT  # noqa: E402
+from game_environment import GameEnvironment  # noqa: E402
+from trackkit import TrackMask  # noqa: E402
+from trackkit.render import render_track  # noqa: E402
+from config import TRACK_WIDTH  # noqa: E402
+
+
+def single_radar(car, degree, track_mask):
+    """The per-radar Car.check_radar this replaces."""
+    dx = math.cos(math.radians(360 - (car.angle + degree)))
+    dy = math.sin(math.radians(360 - (car.angle + degree)))
+    length = int(track_mask.cast(car.center[0], car.center[1], [dx], [dy], 150)[0])
+    x = int(car.center[0] + dx * length)
+    y = int(car.center[1] + dy * length)
+    frame_x = max(0, min(WIDTH - 1, x))
+    frame_y = max(0, min(HEIGHT - 1, y))
+    return [(x, y), int(math.sqrt((frame_x - car.center[0]) ** 2 + (frame_y - car.center[1]) ** 2))]
+
+
+def random_cars(env, count):
+    centres = np.asarray(env.curve_points)[np.random.randint(len(env.curve_points), size=count)]
+    centres = centres + np.random.uniform(-30, 30, centres.shape)
+    return [SimpleNamespace(center=list(c), angle=float(a), radars=[])
+            for c, a in zip(centres, np.random.randint(0, 360, count))]  # NEAT cars turn in whole degrees
+
+
+def main():
+    seed_everything(0)
+    env = GameEnvironment(headless=True)
+    track_mask = TrackMask.from_surface(render_track(env.outer_points, env.inner_points, env.curve_points,
+                                                     TRACK_WIDTH, (WIDTH, HEIGHT)))
+
+    cars = random_cars(env, 300)
+    check_radars(cars, track_mask)
+    assert all(car.radars == [single_radar(car, d, track_mask) for d in RADARS.offsets] for car in cars)
+    print(f"batched radars match the per-radar march for {len(cars)} cars")
+
+    centres = np.array([car.center for car in cars])
+    angles = np.array([car.angle for car in cars])
+    batched = env.cast_rays_batch(centres[:, 0], centres[:, 1], angles)
+    single = np.array([env.cast_rays_batch([x], [y], [a])[0] for (x, y), a in zip(centres, angles)])
+    print(f"batched raycast max difference to one call per car: {np.abs(batched - single).max():.2e}")
+
+    for count in (1, 10, 100, 300):
+        group = cars[:count]
+        one_by_one = per_second(lambda: [check_radars([car], track_mask) for car in group])
+        report(f"{count:>3} cars, mask radars, per car", one_by_one)
+        report(f"{count:>3} cars, mask radars, batched", per_second(lambda: check_radars(group, track_mask)),
+               one_by_one)
+
+        x, y, a = centres[:count, 0], centres[:count, 1], angles[:count]
+        one_by_one = per_second(lambda: [env.cast_rays_batch([x[i]], [y[i]], [a[i]]) for i in range(count)])
+        report(f"{count:>3} cars, segment rays, per car", one_by_one)
+        report(f"{count:>3} cars, segment rays, batched", per_second(lambda: env.cast_rays_batch(x, y, a)),
+               one_by_one)
+
+
+if __name__ == "__main__":
+    pygame.init()
+    main()
@@ -0,0 +1,85 @@
+"""
+Per-step overhead of GameEnvironment.step, which builds a list, a float64 array and an info dict every
+step, against BufferedGameEnvironment.step filling one float32 buffer and one info dict in place.
+Both are checked to produce the same episode first. Sensing and the on-track check cost the same in
+both, so the observation and info building is also timed on its own, and the ray cast with and without
+the simulation's RayWorkspace. Rates are the best of 5 repeats.
+"""
+import math
+import timeit
+
+import numpy as np
+
+from common import use_mode, report, seed_everything
+
+use_mode("DQN")
+
+from game_environment import GameEnvironment  # noqa: E402
+from gym_environment import BufferedGameEnvironment  # noqa: E402
+from trackkit.raycast import cast_rays  # noqa: E402
+
+ACTION_PROBABILITIES = [0.15, 0.15, 0.6, 0.1]
+
+
+def best_rate(func, number=5000, repeat=5):
+    return number / min(timeit.repeat(func, number=number, repeat=repeat))
+
+
+def main():
+    seed_everything(0)
+    env = GameEnvironment(headless=True, track_seed=0)
+    buffered = BufferedGameEnvironment(GameEnvironment(headless=True, track_seed=0))
+
+    actions = np.random.choice(4, size=3000, p=ACTION_PROBABILITIES)
+    state = env.reset()
+    observation, _ = buffered.reset()
+    worst = np.abs(state[0] - observation).max()
+    for steps, action in enumerate(actions, 1):
+        state, reward, done, info = env.step(action)
+        observation, buffered_reward, terminated, _, buffered_info = buffered.step(action)
+        worst = max(worst, np.abs(state[0] - observation).max())
+        assert reward == buffered_reward and done == terminated and info == buffered_info
+        if done:
+            break
+    print(f"{steps} steps match GameEnvironment.step, float32 observations differ by at most {worst:.1e}")
+
+    def legacy_observation():
+        """What GameEnvironment.step does after moving the car."""
+        ray_distances = env.get_ray_distances()
+        state = np.array([*ray_distances, env.speed / 0.7, math.sin(math.radians(env.angle)),
+                          math.cos(math.radians(env.angle))])
+        info = {'score': env.score, 'distance': env.distance_covered, 'speed': env.speed, 'steps': env.steps_taken}
+        return state.reshape(1, -1), info
+
+    def buffered_observation():
+        return buffered.env.observe(buffered.observation), buffered._update_info()
+
+    def legacy():
+        if env.step(np.random.randint(4))[2]:
+            env.reset()
+
+    def in_place():
+        if buffered.step(np.random.randint(4))[2]:
+            buffered.reset()
+
+    env.reset()
+    buffered.reset()
+    legacy_rate = best_rate(legacy_observation)
+    report("observation + info, list and new array", legacy_rate)
+    report("observation + info, in place", best_rate(buffered_observation), legacy_rate)
+    sim = buffered.env
+    dir_x, dir_y = sim.sensors.directions(sim.angle)
+    distances = np.empty(sim.sensors.num_rays)
+    legacy_rate = best_rate(lambda: cast_rays(sim.playerX, sim.playerY, dir_x, dir_y, sim.sensors.max_length,
+                                              sim.segment_starts, sim.segment_vectors, out=distances))
+    report("cast_rays, new temporaries", legacy_rate)
+    report("cast_rays, RayWorkspace", best_rate(
+        lambda: cast_rays(sim.playerX, sim.playerY, dir_x, dir_y, sim.sensors.max_length, sim.segment_starts,
+                          sim.segment_vectors, out=distances, workspace=sim.ray_workspace)), legacy_rate)
+    legacy_rate = best_rate(legacy)
+    report("GameEnvironment.step", legacy_rate)
+    report("BufferedGameEnvironment.step", best_rate(in_place), legacy_rate)
+
+
+if __name__ == "__main__":
+    main()
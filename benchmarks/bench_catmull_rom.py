@@ -0,0 +1,53 @@
+"""The batched catmull_rom_chain against the per-segment generator it replaces, across points per segment."""
+import random
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from trackkit import catmull_rom_chain  # noqa: E402
+from trackkit.geometry import catmull_rom_spline, num_segments, QUADRUPLE_SIZE  # noqa: E402
+from config import NUM_CURVE_POINTS  # noqa: E402
+
+
+def legacy_chain(points, num_points):
+    """The original chain: one catmull_rom_spline call per quadruple, flattened into a list of rows."""
+    point_quadruples = (
+        (points[idx_segment_start + d] for d in range(QUADRUPLE_SIZE))
+        for idx_segment_start in range(num_segments(points))
+    )
+    all_splines = (catmull_rom_spline(*pq, num_points) for pq in point_quadruples)
+    return [elem for lst in all_splines for elem in lst]
+
+
+def random_track_points():
+    track_points = []
+    for i in range(6):
+        if i < 3:
+            track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
+                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
+        else:
+            track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
+                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
+    return track_points + track_points[:3]
+
+
+def main():
+    seed_everything(0)
+    tracks = [random_track_points() for _ in range(100)]
+    for track_points in tracks:
+        difference = np.abs(catmull_rom_chain(track_points, 100) - np.array(legacy_chain(track_points, 100)))
+        assert difference.max() < 1e-9, difference.max()
+    print(f"batched chain matches the per-segment chain on {len(tracks)} tracks")
+
+    for num_points in sorted({20, NUM_CURVE_POINTS, 100, 1000, 5000}):
+        legacy = per_second(lambda: [legacy_chain(p, num_points) for p in tracks[:10]]) * 10
+        report(f"tracks, legacy, {num_points} points per segment", legacy)
+        report(f"tracks, batched, {num_points} points per segment",
+               per_second(lambda: [catmull_rom_chain(p, num_points) for p in tracks[:10]]) * 10, legacy)
+
+
+if __name__ == "__main__":
+    main()
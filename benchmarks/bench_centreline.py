@@ -0,0 +1,66 @@
+"""CentrelineTracker against the full closest-point scan calculate_target_angle used to do every call."""
+import math
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from trackkit import (catmull_rom_chain, random_track_points, TrackGeometry, TRACK_WIDTH,  # noqa: E402
+                      CentrelineTracker)
+
+
+def legacy_closest(current_x, current_y, curve_points):
+    """The original scan over every centreline point."""
+    min_dist = float('inf')
+    closest_idx = 0
+    for i, point in enumerate(curve_points):
+        dist = math.sqrt((current_x - point[0])**2 + (current_y - point[1])**2)
+        if dist < min_dist:
+            min_dist = dist
+            closest_idx = i
+    return closest_idx, min_dist
+
+
+def drive(geometry, laps=2):
+    """Noisy car positions along the centreline, about one pixel apart like a driving car."""
+    tracker = CentrelineTracker(geometry)
+    arc_length = np.arange(0, tracker.length * laps, 1.0)
+    positions = tracker.point_at(arc_length) + np.random.uniform(-10, 10, (len(arc_length), 2))
+    return [tuple(p) for p in positions]
+
+
+def main():
+    seed_everything(0)
+    for num_points in (100, 1000):
+        curve_points = catmull_rom_chain(random_track_points(), num_points)
+        geometry = TrackGeometry(curve_points, TRACK_WIDTH)
+        positions = drive(geometry)
+        tracker = CentrelineTracker(geometry)
+        mismatches = 0
+        for x, y in positions:
+            _, distance = tracker.update(x, y)
+            mismatches += not math.isclose(distance, legacy_closest(x, y, curve_points)[1])
+        # A teleport back to the start must fall back to the full search
+        x, y = curve_points[0]
+        assert tracker.update(x, y)[1] == legacy_closest(x, y, curve_points)[1]
+        # Where they differ the position is closer to the other leg of a hairpin, the tracker stays on its own
+        print(f"{num_points} points per spline: closest distance differs from the full scan "
+              f"on {mismatches}/{len(positions)} positions")
+
+        sample = positions[:200]
+        legacy = per_second(lambda: [legacy_closest(x, y, curve_points) for x, y in sample]) * len(sample)
+        report(f"legacy scan, {num_points} points per spline", legacy)
+        tracker.reset()
+        report(f"tracker, {num_points} points per spline",
+               per_second(lambda: [tracker.update(x, y) for x, y in sample]) * len(sample), legacy)
+        offsets = 5 * tracker.spacing * np.arange(1, 4)
+        report(f"look-ahead targets, {num_points} points per spline",
+               per_second(lambda: tracker.ahead(tracker.index, offsets)))
+        report(f"curvature ahead, {num_points} points per spline",
+               per_second(lambda: tracker.curvature_ahead(tracker.index, offsets)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Cold start of a fresh Python process: building the NumPy-only CarSimulation against a windowed
+GameEnvironment, which imports pygame, starts SDL, loads the sprite and decodes the track background,
+as every headless environment used to. Also the start-up of a SubprocVecEnvironment's workers.
+The track is taken from a warm track cache in every case.
+"""
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from common import use_mode, DQN_DIR
+
+use_mode("DQN")
+
+CASES = {
+    "python + numpy": "import numpy",
+    "CarSimulation": "from simulation import CarSimulation\n"
+                     "CarSimulation(track_seed=0)\n"
+                     "assert 'pygame' not in sys.modules",
+    "GameEnvironment, headless": "from game_environment import GameEnvironment\n"
+                                 "GameEnvironment(headless=True, track_seed=0)\n"
+                                 "assert 'pygame' not in sys.modules",
+    "GameEnvironment, window (pygame)": "from game_environment import GameEnvironment\n"
+                                        "GameEnvironment(headless=False, track_seed=0)",
+    "SubprocVecEnvironment, 4 workers": "from subproc_environment import SubprocVecEnvironment\n"
+                                        "pool = SubprocVecEnvironment(4, track_seeds=[0] * 4)\n"
+                                        "pool.reset()\n"
+                                        "pool.close()",
+}
+
+
+def cold_start(code, repeat=5):
+    """Median wall time of a new interpreter running code from the DQN folder."""
+    script = f"import sys\nsys.path.insert(0, {DQN_DIR!r})\n{code}"
+    times = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script], check=True, capture_output=True)
+        times.append(time.perf_counter() - begin)
+    return np.median(times)
+
+
+def main():
+    cold_start(CASES["GameEnvironment, window (pygame)"], repeat=1)  # Fill the track cache
+    seconds = {name: cold_start(code) for name, code in CASES.items()}
+    window = seconds["GameEnvironment, window (pygame)"]
+    for name, value in seconds.items():
+        line = f"{name:<40} {value * 1000:>9.0f} ms"
+        if name in ("CarSimulation", "GameEnvironment, headless"):
+            line += f"   x{window / value:.1f} faster than the window"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
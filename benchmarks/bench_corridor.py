@@ -0,0 +1,103 @@
+"""
+TrackCorridor against the legacy is_within_track loop over every boundary point, plus an agreement check.
+The legacy loop accepts a point when it is closer than the track width to both boundary points of one
+centreline point, which reaches past the drawn edge on the outside of tight corners. Where the two
+disagree, the rendered track decides which one is right.
+"""
+import math
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("Main_Game")
+
+import pygame  # noqa: E402
+from trackkit import (catmull_rom_chain, generate_track, random_track_points, TrackGeometry,  # noqa: E402
+                      TrackCorridor)
+from trackkit.render import render_track  # noqa: E402
+
+TRACK_WIDTH = 90
+CAR_LENGTH = 24  # car_rect.height // 2 for the 48 px wide car sprite
+EDGE_BAND = 6  # Positions this close to the edge depend on how the outline is drawn, they are not compared
+GRASS = (0, 170, 0)
+
+
+def random_track(num_points=100):
+    return catmull_rom_chain(random_track_points(), num_points)
+
+
+def car_ends(x, y, angle):
+    angle_rad = math.radians(-angle)
+    return ((x + CAR_LENGTH * math.cos(angle_rad), y + CAR_LENGTH * math.sin(angle_rad)),
+            (x - CAR_LENGTH * math.cos(angle_rad), y - CAR_LENGTH * math.sin(angle_rad)))
+
+
+def drive(curve_points, step):
+    """Car ends along a lap of the centreline, heading along the track like a driving car."""
+    points = np.asarray(curve_points)[::step]
+    heading = np.diff(points, axis=0, append=points[:1])
+    angles = -np.degrees(np.arctan2(heading[:, 1], heading[:, 0]))
+    return [car_ends(x, y, a) for (x, y), a in zip(points, angles)]
+
+
+def legacy_within_track(front_point, rear_point, inner_points, outer_points):
+    """The original is_within_track loop from Main_Game/main.py."""
+    def get_distance(point1, point2):
+        return math.sqrt((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2)
+
+    for i in range(len(inner_points) - 1):
+        if (get_distance(front_point, inner_points[i]) < TRACK_WIDTH and
+                get_distance(front_point, outer_points[i]) < TRACK_WIDTH) and \
+           (get_distance(rear_point, inner_points[i]) < TRACK_WIDTH and
+                get_distance(rear_point, outer_points[i]) < TRACK_WIDTH):
+            return True
+    return False
+
+
+def main():
+    seed_everything(0)
+    pygame.init()
+    agree = compared = legacy_on_grass = 0
+    for _ in range(20):
+        curve_points = random_track()
+        outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+        corridor = TrackCorridor(TrackGeometry(curve_points, TRACK_WIDTH))
+        surface = render_track(outer_points, inner_points, curve_points, TRACK_WIDTH)
+        for _ in range(200):
+            x, y = curve_points[np.random.randint(len(curve_points))]
+            point = (x + np.random.uniform(-70, 70), y + np.random.uniform(-70, 70))
+            _, offset = corridor.locate(point)
+            if abs(abs(offset[0]) - corridor.half_width) < EDGE_BAND or \
+                    not (0 <= point[0] < surface.get_width() and 0 <= point[1] < surface.get_height()):
+                continue
+            compared += 1
+            inside = bool(corridor.contains(point)[0])
+            on_track = surface.get_at((int(point[0]), int(point[1])))[:3] != GRASS
+            assert inside == on_track, f"corridor disagrees with the rendered track at {point}"
+            if inside == legacy_within_track(point, point, inner_points, outer_points):
+                agree += 1
+            else:
+                # The corridor matches the rendered track, so the legacy check is the one that is wrong,
+                # and it only ever errs by accepting grass
+                assert not on_track, f"legacy check rejects the track at {point}"
+                legacy_on_grass += 1
+    print(f"corridor matches the rendered track on all {compared} positions "
+          f"(positions within {EDGE_BAND} px of the edge skipped)")
+    print(f"agreement with the legacy check: {agree}/{compared}, "
+          f"the other {legacy_on_grass} are grass the legacy check accepts")
+
+    # The legacy loop slows down with the number of centreline points, the corridor barely does
+    for num_points in (100, 1000):
+        curve_points = random_track(num_points)
+        outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+        corridor = TrackCorridor(TrackGeometry(curve_points, TRACK_WIDTH))
+        lap = drive(curve_points, num_points // 50)
+        legacy = per_second(lambda: [legacy_within_track(f, r, inner_points, outer_points) for f, r in lap])
+        report(f"checks, legacy, {num_points} points per spline", legacy * len(lap))
+        report(f"checks, corridor, {num_points} points per spline",
+               per_second(lambda: [corridor.contains(ends) for ends in lap]) * len(lap), legacy * len(lap))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Per-step cost of the headless GameEnvironment and of its on-track check."""
+import time
+
+import numpy as np
+import pygame
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from game_environment import GameEnvironment  # noqa: E402
+
+
+def rotated_rect(env, sprite):
+    """What step used to do before every on-track check: rotate the sprite to get a rectangle."""
+    rotated_car = pygame.transform.rotate(sprite, env.angle)
+    return rotated_car.get_rect(center=(env.playerX + env.new_width // 2, env.playerY + env.new_height // 2))
+
+
+def main():
+    seed_everything(0)
+    env = GameEnvironment(headless=True)
+
+    sprite = pygame.transform.scale(pygame.image.load('images/racing-car.png'), (env.new_width, env.new_height))
+    report("sprite rotation + rect (old step path)", per_second(lambda: rotated_rect(env, sprite)))
+    report("oriented box corners", per_second(env.get_car_corners))
+    report("is_car_on_track", per_second(env.is_car_on_track))
+
+    # Whole episodes with random actions, timing every step
+    timings = []
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < 2.0:
+        env.reset()
+        done = False
+        while not done and env.steps_taken < 2000:
+            action = np.random.choice(4, p=[0.15, 0.15, 0.6, 0.1])
+            begin = time.perf_counter()
+            _, _, done, _ = env.step(action)
+            timings.append(time.perf_counter() - begin)
+            steps += 1
+    timings = np.array(timings) * 1e6
+    print(f"{steps} steps: mean {timings.mean():.1f} us, median {np.median(timings):.1f} us, "
+          f"99th percentile {np.percentile(timings, 99):.1f} us")
+    report("env.step", 1e6 / timings.mean())
+
+
+if __name__ == "__main__":
+    main()
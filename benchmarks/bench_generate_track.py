@@ -0,0 +1,90 @@
+"""The vectorised generate_track against the per-point loop it replaces, and the cost of building a whole track."""
+import random
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from trackkit import catmull_rom_chain, generate_track, TrackGeometry  # noqa: E402
+from config import TRACK_WIDTH  # noqa: E402
+
+
+def legacy_generate_track(curve_points, track_width):
+    """The original loop: numpy arrays and two norms per point, tuples appended one by one."""
+    outer_points = []
+    inner_points = []
+    for i in range(len(curve_points)):
+        p1 = np.array(curve_points[i])
+        p2 = np.array(curve_points[(i + 1) % len(curve_points)])
+        tangent = p2 - p1
+        if np.linalg.norm(tangent) == 0:
+            continue
+        tangent = tangent / np.linalg.norm(tangent)
+        normal = np.array([-tangent[1], tangent[0]])
+        inner_points.append(tuple(p1 + normal * track_width // 2))
+        outer_points.append(tuple(p1 - normal * track_width // 2))
+    return outer_points, inner_points
+
+
+def random_track_points():
+    track_points = []
+    for i in range(6):
+        if i < 3:
+            track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
+                                 40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
+        else:
+            track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
+                                 50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
+    return track_points + track_points[:3]
+
+
+def joint_error(curve_points, boundary, track_width):
+    """
+    How far each boundary point is from track_width / 2 off the lines of the two centreline
+    segments that meet at its centreline point, in pixels.
+    """
+    points = np.asarray(curve_points, dtype=float)
+    tangents = np.roll(points, -1, axis=0) - points
+    keep = np.hypot(*tangents.T) != 0
+    points = points[keep]
+    tangents = tangents[keep] / np.hypot(*tangents[keep].T)[:, None]
+    normals = np.column_stack([-tangents[:, 1], tangents[:, 0]])
+    offsets = boundary - points
+    distances = np.abs([np.einsum('ij,ij->i', offsets, normals),
+                        np.einsum('ij,ij->i', offsets, np.roll(normals, 1, axis=0))])
+    return np.abs(distances - track_width / 2).max(axis=0)
+
+
+def main():
+    seed_everything(0)
+    tracks = [random_track_points() for _ in range(100)]
+    for track_points in tracks:
+        curve_points = catmull_rom_chain(track_points, 100)
+        outer, inner = generate_track(curve_points, TRACK_WIDTH)
+        legacy_outer, legacy_inner = legacy_generate_track(curve_points, TRACK_WIDTH)
+        assert np.array_equal(outer, legacy_outer) and np.array_equal(inner, legacy_inner)
+    print(f"vectorised boundaries equal the per-point loop on {len(tracks)} tracks")
+
+    # Miter joints keep the boundary track_width / 2 from both segments at a joint, up to the limit
+    curve_points = catmull_rom_chain(tracks[0], 100)
+    for miter_limit in (None, 2.0):
+        outer, inner = generate_track(curve_points, TRACK_WIDTH, miter_limit)
+        error = np.concatenate([joint_error(curve_points, outer, TRACK_WIDTH),
+                                joint_error(curve_points, inner, TRACK_WIDTH)])
+        print(f"miter_limit={miter_limit}: offset from both segments at a joint differs from track_width / 2 "
+              f"by median {np.median(error):.2f} px, max {error.max():.2f} px")
+
+    for num_points in (100, 1000, 5000):
+        curve_points = catmull_rom_chain(tracks[0], num_points)
+        legacy = per_second(lambda: legacy_generate_track(curve_points, TRACK_WIDTH))
+        report(f"boundaries, legacy, {num_points} points per segment", legacy)
+        report(f"boundaries, vectorised, {num_points} points per segment",
+               per_second(lambda: generate_track(curve_points, TRACK_WIDTH)), legacy)
+        report(f"whole TrackGeometry, {num_points} points per segment",
+               per_second(lambda: TrackGeometry(catmull_rom_chain(tracks[0], num_points), TRACK_WIDTH)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Curvature-adaptive resampling of the centreline: how many points each tolerance keeps, the measured
+error against the full-resolution track, and what the smaller geometry saves the raycaster and the
+corridor check at 100 and 1000 spline points per segment.
+"""
+import random
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from trackkit import (catmull_rom_chain, random_track_points, TrackGeometry, SpatialGrid, TrackCorridor,  # noqa: E402
+                      SensorLayout)
+from trackkit.raycast import polyline_segments, cast_rays, cast_rays_indexed  # noqa: E402
+from config import TRACK_WIDTH  # noqa: E402
+
+SENSORS = SensorLayout(np.linspace(-90, 90, 8), max_length=150)
+
+
+def track(seed, num_points):
+    return TrackGeometry(catmull_rom_chain(random_track_points(random.Random(seed), 90), num_points), TRACK_WIDTH)
+
+
+def raycasters(geometry):
+    """
+    Rays against both closed boundaries, as GameEnvironment builds them: through the segment grid,
+    and against every segment for one car.
+    """
+    starts, vectors = zip(*(polyline_segments(np.concatenate([b, b[:1]])) for b in (geometry.outer, geometry.inner)))
+    starts, vectors = np.concatenate(starts), np.concatenate(vectors)
+    grid = SpatialGrid.from_segments(starts, vectors)
+    return (lambda x, y, a: cast_rays_indexed(x[:, None], y[:, None], *SENSORS.directions(a), SENSORS.max_length,
+                                              starts, vectors, grid),
+            lambda x, y, a: cast_rays(x, y, *SENSORS.directions(a), SENSORS.max_length, starts, vectors))
+
+
+def random_poses(geometry, count):
+    centres = geometry.centreline[np.random.randint(len(geometry.centreline), size=count)]
+    centres = centres + np.random.uniform(-30, 30, centres.shape)
+    return centres[:, 0], centres[:, 1], np.random.uniform(-180, 180, count)
+
+
+def main():
+    seed_everything(0)
+    tracks = [track(seed, 100) for seed in range(20)]
+    for tolerance in (0.25, 0.5, 1.0, 2.0):
+        resampled = [geometry.resampled(tolerance) for geometry in tracks]
+        sizes = [len(geometry.centreline) for geometry in resampled]
+        errors = [geometry.resample_error for geometry in resampled]
+        print(f"tolerance {tolerance:>4} px: {np.mean(sizes):5.1f} points instead of {len(tracks[0].centreline)}, "
+              f"error mean {np.mean(errors):.2f} px, max {np.max(errors):.2f} px")
+    print("(the error includes up to ~1.4 px from the whole-pixel rounding of the drawn boundaries)")
+
+    for num_points in (100, 1000):
+        geometry = track(0, num_points)
+        coarse = geometry.resampled(0.5)
+        x, y, a = random_poses(geometry, 300)
+        (dense_rays, dense_scan), (coarse_rays, coarse_scan) = raycasters(geometry), raycasters(coarse)
+        differences = np.abs(dense_rays(x, y, a) - coarse_rays(x, y, a))
+        grazing = differences > 2 * coarse.resample_error
+        print(f"\n{num_points} points per spline segment: {len(geometry.centreline)} -> {len(coarse.centreline)} "
+              f"points, rays differ by at most {differences[~grazing].max():.2f} px "
+              f"({grazing.sum()} of {differences.size} graze a corner)")
+        label = f"{num_points} points"
+        dense = per_second(lambda: dense_rays(x[:1], y[:1], a[:1]))
+        report(f"{label}, raycast, full track", dense)
+        report(f"{label}, raycast, resampled", per_second(lambda: coarse_rays(x[:1], y[:1], a[:1])), dense)
+        dense = per_second(lambda: dense_scan(x[0], y[0], a[0]))
+        report(f"{label}, all segments, full track", dense)
+        report(f"{label}, all segments, resampled", per_second(lambda: coarse_scan(x[0], y[0], a[0])), dense)
+
+        dense_corridor, coarse_corridor = TrackCorridor(geometry), TrackCorridor(coarse)
+        points = np.column_stack([x, y])
+        agree = (dense_corridor.contains(points) == coarse_corridor.contains(points)).mean()
+        print(f"corridor on-track flags agree on {agree:.1%} of the poses")
+        dense = per_second(lambda: [dense_corridor.contains(p) for p in points[:50]]) * 50
+        report(f"{label}, corridor, full track", dense)
+        report(f"{label}, corridor, resampled",
+               per_second(lambda: [coarse_corridor.contains(p) for p in points[:50]]) * 50, dense)
+        report(f"{label}, resampling itself", per_second(lambda: geometry.resampled(0.5)))
+
+
+if __name__ == "__main__":
+    main()
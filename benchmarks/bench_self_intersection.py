@@ -0,0 +1,86 @@
+"""
+Self-intersection checks of generated track boundaries: the grid-hashed segment_crossings against
+testing every pair of edges, plus an agreement check and how many boundaries need the loop repair, and
+the same on repaired boundaries, where each removed loop leaves many points on one crossing point.
+"""
+import random
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from trackkit import (catmull_rom_chain, generate_track, random_track_points, remove_boundary_loops,  # noqa: E402
+                      segment_crossings, TrackGeometry)
+from config import TRACK_WIDTH  # noqa: E402
+
+
+def brute_force_crossings(points):
+    """Test all pairs of edges, O(n^2) in memory and time."""
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    starts = points
+    ends = np.roll(points, -1, axis=0)
+    i, j = np.triu_indices(n, k=2)
+    keep = j - i < n - 1  # The last edge and the first one share point 0
+    i, j = i[keep], j[keep]
+
+    def side(p, q, r):
+        return np.sign((q[:, 0] - p[:, 0]) * (r[:, 1] - p[:, 1]) - (q[:, 1] - p[:, 1]) * (r[:, 0] - p[:, 0]))
+
+    a, b, c, d = starts[i], ends[i], starts[j], ends[j]
+    crossing = (side(a, b, c) * side(a, b, d) < 0) & (side(c, d, a) * side(c, d, b) < 0)
+    return np.column_stack([i[crossing], j[crossing]])
+
+
+def boundaries(seed, num_points):
+    curve_points = catmull_rom_chain(random_track_points(random.Random(seed), 90), num_points)
+    return generate_track(curve_points, TRACK_WIDTH)
+
+
+def main():
+    seed_everything(0)
+    checked = folded = 0
+    for seed in range(40):
+        for boundary in boundaries(seed, 100):
+            grid = segment_crossings(boundary)
+            assert np.array_equal(grid, brute_force_crossings(boundary)), f"crossings differ for seed {seed}"
+            repaired = remove_boundary_loops(boundary, 2 * TRACK_WIDTH)
+            assert np.array_equal(segment_crossings(repaired), brute_force_crossings(repaired)), \
+                f"crossings differ for repaired seed {seed}"
+            checked += 1
+            folded += len(grid) > 0
+    print(f"grid crossings match the all-pairs test on {checked} boundaries before and after the repair, "
+          f"{folded} of them fold over themselves before the repair")
+    simple = sum(TrackGeometry(catmull_rom_chain(random_track_points(random.Random(seed), 90), 100),
+                               TRACK_WIDTH).is_simple() for seed in range(40))
+    print(f"{simple}/40 tracks have simple boundaries after the repair, any others are redrawn")
+
+    # Boundaries of thousands of points, where the all-pairs test runs out of steam
+    for num_points in (100, 500, 2000):
+        outer, _ = boundaries(0, num_points)
+        label = f"{len(outer)} boundary points"
+        if len(outer) <= 4000:
+            brute = per_second(lambda: brute_force_crossings(outer))
+            report(f"{label}, all pairs", brute)
+        else:
+            brute = None
+        report(f"{label}, grid", per_second(lambda: segment_crossings(outer)), brute)
+
+    # Seed 3 folds its inner boundary; the repair collapses hundreds of points onto each crossing
+    for num_points in (1000, 5000):
+        _, inner = boundaries(3, num_points)
+        repaired = remove_boundary_loops(inner, 2 * TRACK_WIDTH)
+        collapsed = int((np.hypot(*(np.roll(repaired, -1, axis=0) - repaired).T) == 0).sum())
+        print(f"seed 3, {num_points} points per segment: {collapsed} of {len(inner)} inner boundary points "
+              f"collapsed by the repair")
+        label = f"seed 3 x{num_points}"
+        report(f"{label}, loop repair", per_second(lambda: remove_boundary_loops(inner, 2 * TRACK_WIDTH)))
+        report(f"{label}, crossings after repair", per_second(lambda: segment_crossings(repaired)))
+        curve_points = catmull_rom_chain(random_track_points(random.Random(3), 90), num_points)
+        report(f"{label}, whole TrackGeometry", per_second(lambda: TrackGeometry(curve_points, TRACK_WIDTH)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Direction lookups from a SensorLayout against per-ray trig, and sensing cost as the ray count changes."""
+import math
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from game_environment import GameEnvironment  # noqa: E402
+from trackkit import SensorLayout, TrackMask  # noqa: E402
+from trackkit.render import render_track  # noqa: E402
+from config import TRACK_WIDTH, WIDTH, HEIGHT  # noqa: E402
+
+
+def trig_directions(angle, offsets):
+    """What every sensing call used to do: radians, sin and cos for each ray."""
+    return ([-math.sin(math.radians(angle + offset)) for offset in offsets],
+            [-math.cos(math.radians(angle + offset)) for offset in offsets])
+
+
+def main():
+    seed_everything(0)
+    env = GameEnvironment(headless=True)
+    track_mask = TrackMask.from_surface(render_track(env.outer_points, env.inner_points, env.curve_points,
+                                                     TRACK_WIDTH, (WIDTH, HEIGHT)))
+    x, y = env.curve_points[50]
+    headings = np.random.uniform(0, 360, 100)
+
+    for num_rays in (4, 8, 16, 32):
+        offsets = np.arange(num_rays) * (360 / num_rays)
+        layout = SensorLayout(offsets, max_length=150, sign=-1, bias=-90)
+        dx, dy = layout.directions(headings[0])
+        assert np.allclose(dx, trig_directions(round(headings[0], 1), offsets)[0])
+
+        trig = per_second(lambda: [trig_directions(h, offsets) for h in headings]) * len(headings)
+        report(f"{num_rays:>2} rays, directions by trig", trig)
+        report(f"{num_rays:>2} rays, directions from table",
+               per_second(lambda: [layout.directions(h) for h in headings]) * len(headings), trig)
+        report(f"{num_rays:>2} rays, mask sensing", per_second(
+            lambda: [track_mask.cast(x, y, *layout.directions(h), layout.max_length) for h in headings])
+            * len(headings))
+        env.sensors = SensorLayout(offsets, max_length=150)
+        report(f"{num_rays:>2} rays, segment sensing", per_second(
+            lambda: [env.cast_rays_batch([x], [y], [h]) for h in headings]) * len(headings))
+
+
+if __name__ == "__main__":
+    main()
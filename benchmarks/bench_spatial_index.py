@@ -0,0 +1,55 @@
+"""
+Sensing a batch of cars through the boundary SpatialGrid against testing every segment for each car,
+on the resampled boundaries GameEnvironment casts against and on the full-resolution ones, for the
+track as generated and with 10x more curve points. Resampling keeps the boundaries of both at about
+the same number of segments, so one car's sensing cost does not grow with the curve points either way.
+"""
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from game_environment import GameEnvironment  # noqa: E402
+from trackkit import SpatialGrid, TrackGeometry, catmull_rom_chain  # noqa: E402
+from trackkit.raycast import polyline_segments, cast_rays, cast_rays_indexed  # noqa: E402
+from config import NUM_CURVE_POINTS, SENSING_TOLERANCE  # noqa: E402
+
+
+def boundary_segments(geometry):
+    starts, vectors = zip(*(polyline_segments(np.concatenate([b, b[:1]])) for b in (geometry.outer, geometry.inner)))
+    return np.concatenate(starts), np.concatenate(vectors)
+
+
+def main():
+    seed_everything(0)
+    env = GameEnvironment(headless=True, track_seed=0)
+    sensors = env.sensors
+    dense = TrackGeometry(catmull_rom_chain(env.track_points, 10 * NUM_CURVE_POINTS), env.track_geometry.track_width)
+    for name, geometry in (("resampled", env.sensing_geometry), ("full resolution", env.track_geometry),
+                           ("10x curve points, resampled", dense.resampled(SENSING_TOLERANCE)),
+                           ("10x curve points, full resolution", dense)):
+        starts, vectors = boundary_segments(geometry)
+        grid = SpatialGrid.from_segments(starts, vectors)
+        print(f"\n{name} boundaries, {len(starts)} segments")
+        for count in (1, 10, 100):
+            centres = env.curve_points[np.random.randint(len(env.curve_points), size=count)]
+            x, y = (centres + np.random.uniform(-30, 30, centres.shape)).T
+            dir_x, dir_y = sensors.directions(np.random.uniform(-180, 180, count))
+
+            def scan():
+                return np.array([cast_rays(x[i], y[i], dir_x[i], dir_y[i], sensors.max_length, starts, vectors)
+                                 for i in range(count)])
+
+            def indexed():
+                return cast_rays_indexed(x[:, None], y[:, None], dir_x, dir_y, sensors.max_length,
+                                         starts, vectors, grid)
+
+            assert np.allclose(scan(), indexed())
+            baseline = per_second(scan)
+            report(f"{count:>3} cars, all segments per car", baseline)
+            report(f"{count:>3} cars, grid, one call", per_second(indexed), baseline)
+
+
+if __name__ == "__main__":
+    main()
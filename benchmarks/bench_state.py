@@ -0,0 +1,76 @@
+"""
+Snapshots of the environment state: get_state, copy and set_state against reset and against building a
+new environment, a check that a restored snapshot replays the same rollout, and 1000 rollouts of 100
+steps branching from one mid-episode state, one after another in a single environment and all at once
+in a VecGameEnvironment.
+"""
+import copy
+import time
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from game_environment import GameEnvironment  # noqa: E402
+from vec_environment import VecGameEnvironment  # noqa: E402
+
+ACTION_PROBABILITIES = [0.15, 0.15, 0.6, 0.1]
+ROLLOUTS = 1000
+HORIZON = 100
+
+
+def rollout(env, actions):
+    """Every action of the row, starting over after leaving the track as VecGameEnvironment does."""
+    rewards = []
+    for action in actions:
+        state, reward, done, _ = env.step(action)
+        rewards.append(reward)
+        if done:
+            env.reset()
+    return state, rewards
+
+
+def main():
+    seed_everything(0)
+    env = GameEnvironment(headless=True, track_seed=0)
+    for _ in range(150):
+        env.step(2)
+    snapshot = env.get_state()
+    print(snapshot)
+
+    actions = np.random.choice(4, size=(ROLLOUTS, HORIZON), p=ACTION_PROBABILITIES)
+    first = rollout(env, actions[0])
+    env.set_state(snapshot)
+    again = rollout(env, actions[0])
+    assert np.array_equal(first[0], again[0]) and first[1] == again[1], "restored state diverged"
+    env.set_state(snapshot)
+    assert env.get_state() == snapshot
+    print("a restored snapshot replays the same rollout")
+
+    baseline = per_second(env.reset)
+    report("env.reset", baseline)
+    report("get_state", per_second(env.get_state), baseline)
+    report("copy(state)", per_second(lambda: copy.copy(snapshot)), baseline)
+    report("set_state", per_second(lambda: env.set_state(snapshot)), baseline)
+    report("new headless GameEnvironment", per_second(lambda: GameEnvironment(headless=True, track_seed=0)), baseline)
+
+    begin = time.perf_counter()
+    for row in actions:
+        env.set_state(snapshot)
+        rollout(env, row)
+    sequential = ROLLOUTS / (time.perf_counter() - begin)
+    report(f"branched rollouts of {HORIZON} steps, one env", sequential)
+
+    vec = VecGameEnvironment(ROLLOUTS, env=env)
+    begin = time.perf_counter()
+    vec.set_state(snapshot)
+    for column in actions.T:
+        vec.step(column)
+    report(f"branched rollouts of {HORIZON} steps, vectorised", ROLLOUTS / (time.perf_counter() - begin), sequential)
+    assert vec.get_state(0).track is snapshot.track
+
+
+if __name__ == "__main__":
+    main()
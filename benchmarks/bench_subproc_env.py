@@ -0,0 +1,58 @@
+"""
+Aggregate steps per second of SubprocVecEnvironment with 1, 2, 4, ... worker processes up to twice the
+number of cores, stepping all workers in lockstep and collecting only the first half to finish, against
+one BufferedGameEnvironment in this process. Scaling flattens once the workers outnumber the cores.
+"""
+import os
+import time
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from gym_environment import BufferedGameEnvironment  # noqa: E402
+from subproc_environment import SubprocVecEnvironment  # noqa: E402
+
+ACTION_PROBABILITIES = [0.15, 0.15, 0.6, 0.1]
+
+
+def main():
+    seed_everything(0)
+    cores = os.cpu_count()
+    print(f"{cores} cores")
+    env = BufferedGameEnvironment(track_seed=0)
+    env.reset()
+
+    def single_step():
+        if env.step(np.random.choice(4, p=ACTION_PROBABILITIES))[2]:
+            env.reset()
+
+    single = per_second(single_step, 1.0)
+    report("in process", single)
+
+    num_workers = 1
+    while num_workers <= max(2, 2 * cores):
+        with SubprocVecEnvironment(num_workers, track_seeds=range(num_workers)) as pool:
+            pool.reset()
+            actions = np.random.choice(4, size=(64, num_workers), p=ACTION_PROBABILITIES)
+            step = iter(range(10 ** 9))
+            rate = per_second(lambda: pool.step(actions[next(step) % 64]), 1.0) * num_workers
+            report(f"{num_workers} workers, sync", rate, single)
+
+            # Keep every worker busy, handing new actions to whichever half finishes first
+            first = max(1, num_workers // 2)
+            pool.step_async(actions[0])
+            collected = 0
+            begin = time.perf_counter()
+            while time.perf_counter() - begin < 1.0:
+                indices = pool.step_wait(first)[0]
+                pool.step_async(actions[next(step) % 64, indices], indices)
+                collected += len(indices)
+            report(f"{num_workers} workers, first {first} ready", collected / (time.perf_counter() - begin), single)
+        num_workers *= 2
+
+
+if __name__ == "__main__":
+    main()
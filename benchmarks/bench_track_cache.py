@@ -0,0 +1,35 @@
+"""Building a track from its seed against loading it from the on-disk track cache."""
+import os
+import tempfile
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from trackkit import CachedTrack, TrackCache  # noqa: E402
+from config import TRACK_WIDTH, NUM_CURVE_POINTS, WIDTH, HEIGHT  # noqa: E402
+
+
+def main():
+    seed_everything(0)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TrackCache(directory)
+        built = cache.get(7, TRACK_WIDTH, NUM_CURVE_POINTS, (WIDTH, HEIGHT))
+        loaded = cache.get(7, TRACK_WIDTH, NUM_CURVE_POINTS, (WIDTH, HEIGHT))
+        assert loaded.track_points == built.track_points and loaded.start_pose == built.start_pose
+        assert np.array_equal(loaded.background, built.background) and np.array_equal(loaded.on_track, built.on_track)
+        assert all(np.array_equal(a, b) for a, b in zip(loaded.geometry.arrays().values(),
+                                                       built.geometry.arrays().values()))
+        size = os.path.getsize(cache.path(7, TRACK_WIDTH, NUM_CURVE_POINTS, (WIDTH, HEIGHT)))
+        print(f"loaded track equals the built one, bundle is {size / 1024:.0f} KiB")
+
+        build = per_second(lambda: CachedTrack.build(7, TRACK_WIDTH, NUM_CURVE_POINTS, (WIDTH, HEIGHT)))
+        report("generate + render track", build)
+        report("load from track cache",
+               per_second(lambda: cache.get(7, TRACK_WIDTH, NUM_CURVE_POINTS, (WIDTH, HEIGHT))), build)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Ray marching on the TrackMask, one ray per call and all rays in one call, with and without jumps over the
+SignedDistanceField, against the per-pixel Surface.get_at march.
+"""
+import math
+import time
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+import pygame  # noqa: E402
+from trackkit import (catmull_rom_chain, generate_track, random_track_points, SignedDistanceField,  # noqa: E402
+                      TrackMask)
+from trackkit.render import render_track  # noqa: E402
+
+WIDTH, HEIGHT = 800, 600
+TRACK_WIDTH = 90
+GRASS = (0, 170, 0)
+
+
+def random_track():
+    return catmull_rom_chain(random_track_points(), 100)
+
+
+def pixel_march(surface, x, y, angle, max_length=150):
+    """The sub_ray_cast loop: one get_at call per pixel until the grass colour is hit."""
+    length = 1
+    while length < max_length:
+        xi = int(x - math.sin(math.radians(angle)) * length)
+        yi = int(y - math.cos(math.radians(angle)) * length)
+        try:
+            if surface.get_at((xi, yi))[:3] == GRASS:
+                break
+        except IndexError:
+            break
+        length += 1
+    return length
+
+
+def mask_march(mask, x, y, angle, max_length=150):
+    return int(mask.cast(x, y, [-math.sin(math.radians(angle))], [-math.cos(math.radians(angle))], max_length)[0])
+
+
+def mask_cast(mask, rays, max_length=150):
+    x, y, angle = np.array(rays).T
+    return mask.cast(x, y, -np.sin(np.radians(angle)), -np.cos(np.radians(angle)), max_length)
+
+
+def main():
+    seed_everything(0)
+    pygame.init()
+    curve_points = random_track()
+    outer_points, inner_points = generate_track(curve_points, TRACK_WIDTH)
+    surface = render_track(outer_points, inner_points, curve_points, TRACK_WIDTH, (WIDTH, HEIGHT))
+
+    start = time.perf_counter()
+    mask = TrackMask.from_surface(surface)
+    print(f"mask and field build: {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    SignedDistanceField.from_mask(mask.on_track)
+    print(f"field build alone: {(time.perf_counter() - start) * 1000:.1f} ms")
+    plain = TrackMask(mask.on_track)
+
+    rays = []
+    while len(rays) < 500:
+        x, y = curve_points[np.random.randint(len(curve_points))]
+        x, y = x + np.random.uniform(-30, 30), y + np.random.uniform(-30, 30)
+        if surface.get_at((int(x), int(y)))[:3] != GRASS:
+            rays.append((x, y, np.random.uniform(0, 360)))
+    expected = np.array([pixel_march(surface, *ray) for ray in rays])
+    assert all(mask_march(mask, *ray) == length for ray, length in zip(rays, expected))
+    assert np.array_equal(mask_cast(mask, rays), expected) and np.array_equal(mask_cast(plain, rays), expected)
+    print(f"mask march, with and without the field, matches the pixel march on all {len(rays)} rays")
+
+    pixel = per_second(lambda: [pixel_march(surface, *ray) for ray in rays[:50]])
+    report("50 rays, Surface.get_at march", pixel)
+    report("50 rays, mask, one call per ray", per_second(lambda: [mask_march(mask, *ray) for ray in rays[:50]]), pixel)
+    report("50 rays, mask, one call", per_second(lambda: mask_cast(plain, rays[:50])), pixel)
+    report("50 rays, mask and field, one call", per_second(lambda: mask_cast(mask, rays[:50])), pixel)
+    masked = per_second(lambda: mask_cast(plain, rays))
+    report("500 rays, mask, one call", masked)
+    report("500 rays, mask and field, one call", per_second(lambda: mask_cast(mask, rays)), masked)
+
+
+if __name__ == "__main__":
+    main()
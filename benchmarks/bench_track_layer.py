@@ -0,0 +1,82 @@
+"""
+Frame cost of the Main_Game loop drawing: redrawing the track, trees and car every frame and updating the
+whole window, against TrackLayer restoring and updating only the rectangles that changed. The frames of
+both are compared pixel for pixel while the car drives a lap.
+"""
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("Main_Game")
+
+import pygame  # noqa: E402
+from trackkit import track_width, CachedTrack  # noqa: E402
+from trackkit.render import draw_track, TrackLayer  # noqa: E402
+
+WIDTH, HEIGHT = 800, 600
+TRACK_WIDTH = track_width(0)
+
+
+def main():
+    seed_everything(0)
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    reference = pygame.Surface((WIDTH, HEIGHT))
+    font = pygame.font.Font(None, 30)
+    car = pygame.transform.scale(pygame.image.load('images/racing-car.png'), (48, 24))
+    tree = pygame.transform.scale(pygame.image.load('images/grass.png'), (50, 50))
+
+    track = CachedTrack.build(0, TRACK_WIDTH, 100, (WIDTH, HEIGHT), min_corner_angle=90)
+    geometry = track.geometry
+    trees = [(int(x), int(y)) for x, y in np.random.randint(0, [WIDTH - 50, HEIGHT - 50], (10, 2))]
+    centres = geometry.centreline[::4]
+    headings = np.diff(centres, axis=0, append=centres[:1])
+    angles = -np.degrees(np.arctan2(headings[:, 1], headings[:, 0]))
+
+    def hud(surface, frame, blit):
+        blit(font.render(f"Score: {frame}", True, (255, 255, 255)), (WIDTH - 200, 15))
+        blit(font.render(f"FPS: {60 + frame % 7}", True, (255, 255, 255)), (15, 15))
+
+    def full_frame(surface, frame):
+        """The frame as the game loop used to draw it, every part from scratch."""
+        surface.fill((0, 170, 0))
+        draw_track(surface, geometry.outer, geometry.inner, geometry.centreline, TRACK_WIDTH)
+        for position in trees:
+            surface.blit(tree, position)
+        (x, y), angle = centres[frame % len(centres)], angles[frame % len(centres)]
+        rotated = pygame.transform.rotate(car, angle)
+        surface.blit(rotated, rotated.get_rect(center=(x, y)))
+        hud(surface, frame, surface.blit)
+
+    layer = TrackLayer(screen, track.surface(), [(tree, position) for position in trees])
+
+    def layer_frame(frame):
+        layer.begin()
+        (x, y), angle = centres[frame % len(centres)], angles[frame % len(centres)]
+        rotated = pygame.transform.rotate(car, angle)
+        layer.blit(rotated, rotated.get_rect(center=(x, y)))
+        hud(screen, frame, layer.blit)
+        layer.end()
+
+    for frame in range(len(centres)):
+        layer_frame(frame)
+        full_frame(reference, frame)
+        assert np.array_equal(pygame.surfarray.array3d(screen), pygame.surfarray.array3d(reference)), \
+            f"frame {frame} differs from a full redraw"
+    print(f"{len(centres)} dirty-rect frames match full redraws pixel for pixel")
+
+    frame = iter(range(10 ** 9))
+
+    def legacy():
+        full_frame(screen, next(frame))
+        pygame.display.update()
+
+    legacy_rate = per_second(legacy, 1.0)
+    report("full redraw + full update", legacy_rate)
+    report("TrackLayer dirty rects", per_second(lambda: layer_frame(next(frame)), 1.0), legacy_rate)
+    print(f"last frame updated {len(layer.last_frame)} rectangles, "
+          f"{sum(r.width * r.height for r in layer.last_frame) / (WIDTH * HEIGHT):.1%} of the window")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Valid control points from the batched generator against the rejection loop of NEAT's save_track_image,
+and building a whole track library in one process against a process pool.
+"""
+import math
+import os
+import random
+
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from trackkit import corner_angles, TrackLibrary  # noqa: E402
+from trackkit.library import random_track_points_batch, valid_control_points  # noqa: E402
+from config import TRACK_WIDTH, NUM_CURVE_POINTS  # noqa: E402
+
+
+def angle_between(A, B, C):
+    BA_x, BA_y = A[0] - B[0], A[1] - B[1]
+    BC_x, BC_y = C[0] - B[0], C[1] - B[1]
+    cos_theta = (BA_x * BC_x + BA_y * BC_y) / (math.sqrt(BA_x ** 2 + BA_y ** 2) * math.sqrt(BC_x ** 2 + BC_y ** 2))
+    return math.degrees(math.acos(max(-1, min(1, cos_theta))))
+
+
+def legacy_track_points():
+    """The rejection loop from save_track_image: draw six points, retry while any corner is 90 degrees or sharper."""
+    while True:
+        track_points = []
+        for i in range(6):
+            if i < 3:
+                track_points.append((random.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
+                                     40 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
+            else:
+                track_points.append((random.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
+                                     50 + random.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
+        if all(angle_between(track_points[i % 6], track_points[(i + 1) % 6], track_points[(i + 2) % 6]) > 90
+               for i in range(6)):
+            return track_points
+
+
+def main():
+    seed_everything(0)
+    rng = np.random.default_rng(0)
+    candidates = random_track_points_batch(rng, 20000)
+    valid = valid_control_points(candidates, simple=False)
+    legacy = np.array([all(angle_between(p[i % 6], p[(i + 1) % 6], p[(i + 2) % 6]) > 90 for i in range(6))
+                       for p in candidates])
+    assert np.array_equal(valid, legacy)
+    assert np.allclose(corner_angles(candidates[:100]),
+                       [[angle_between(p[i], p[(i + 1) % 6], p[(i + 2) % 6]) for i in range(6)] for p in candidates[:100]])
+    simple = valid_control_points(candidates)
+    print(f"batched angle check matches angle_between on {len(candidates)} candidates, "
+          f"{valid.mean():.1%} pass it, {simple.mean():.1%} also have no crossing edges")
+
+    tracks = 100
+    legacy_rate = per_second(lambda: [legacy_track_points() for _ in range(tracks)]) * tracks
+    report("valid control points, rejection loop", legacy_rate)
+    batch = 4096
+    report("valid control points, batched", per_second(
+        lambda: valid_control_points(random_track_points_batch(rng, batch))) * batch * simple.mean(), legacy_rate)
+
+    count = 2000
+    serial = per_second(lambda: TrackLibrary.generate(count, 0, TRACK_WIDTH, NUM_CURVE_POINTS, workers=1),
+                        min_time=0.1) * count
+    report(f"library of {count} tracks, one process", serial)
+    report(f"library of {count} tracks, {os.cpu_count()} worker processes", per_second(
+        lambda: TrackLibrary.generate(count, 0, TRACK_WIDTH, NUM_CURVE_POINTS), min_time=0.1) * count, serial)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Environment steps per second of VecGameEnvironment at several car counts against stepping the single-car
+GameEnvironment, after checking that every car of the vectorised environment follows the same trajectory,
+rewards and done flags as the single-car one given the same actions.
+"""
+import numpy as np
+
+from common import use_mode, per_second, report, seed_everything
+
+use_mode("DQN")
+
+from game_environment import GameEnvironment  # noqa: E402
+from vec_environment import VecGameEnvironment  # noqa: E402
+
+ACTION_PROBABILITIES = [0.15, 0.15, 0.6, 0.1]
+
+
+def check_against_single(env, num_cars=16, steps=3000):
+    """Replay each vectorised car's actions through the single-car environment until its first reset."""
+    vec = VecGameEnvironment(num_cars, env=env)
+    actions = np.random.choice(4, size=(steps, num_cars), p=ACTION_PROBABILITIES)
+    observations, rewards, dones = [vec.reset()], [], []
+    for row in actions:
+        observation, reward, done, info = vec.step(row)
+        observation = observation.copy()
+        observation[done] = info['final_observation']
+        observations.append(observation)
+        rewards.append(reward)
+        dones.append(done)
+    observations, rewards, dones = np.array(observations), np.array(rewards), np.array(dones)
+
+    worst = 0.0
+    compared = 0
+    for car in range(num_cars):
+        state = env.reset()
+        assert np.allclose(state[0], observations[0, car])
+        for t in range(steps):
+            state, reward, done, _ = env.step(actions[t, car])
+            worst = max(worst, np.abs(state[0] - observations[t + 1, car]).max())
+            assert reward == rewards[t, car] and done == dones[t, car], f"car {car} differs at step {t}"
+            compared += 1
+            if done:
+                break
+    print(f"{compared} steps of {num_cars} cars match GameEnvironment.step, "
+          f"observations differ by at most {worst:.2e}")
+
+
+def main():
+    seed_everything(0)
+    env = GameEnvironment(headless=True, track_seed=0)
+    check_against_single(env)
+
+    def single_step():
+        if env.step(np.random.choice(4, p=ACTION_PROBABILITIES))[2]:
+            env.reset()
+
+    env.reset()
+    single = per_second(single_step, 1.0)
+    report("GameEnvironment.step", single)
+    for num_cars in (1, 16, 64, 256, 1024):
+        vec = VecGameEnvironment(num_cars, env=env)
+        actions = np.random.choice(4, size=(64, num_cars), p=ACTION_PROBABILITIES)
+        step = iter(range(10 ** 9))
+        rate = per_second(lambda: vec.step(actions[next(step) % 64]), 1.0) * num_cars
+        report(f"VecGameEnvironment, {num_cars} cars", rate, single)
+
+
+if __name__ == "__main__":
+    main()
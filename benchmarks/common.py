@@ -0,0 +1,49 @@
+"""Shared helpers for the benchmark scripts in this folder."""
+import os
+import sys
+import time
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DQN_DIR = os.path.join(ROOT, "DQN")
+
+
+def use_mode(folder):
+    """
+    Make a game folder and trackkit importable, and switch into the folder so relative asset paths resolve.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    path = os.path.join(ROOT, folder)
+    for entry in (ROOT, path):
+        if entry not in sys.path:
+            sys.path.insert(0, entry)
+    os.chdir(path)
+
+
+def per_second(func, min_time=0.5):
+    """Call func repeatedly for at least min_time seconds and return calls per second."""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def report(name, rate, baseline=None):
+    line = f"{name:<40} {rate:>12.1f} /s"
+    if baseline:
+        line += f"   x{rate / baseline:.1f}"
+    print(line)
+
+
+def seed_everything(seed=0):
+    random.seed(seed)
+    try:
+        import numpy as np
+        np.random.seed(seed)
+    except ImportError:
+        pass
@@ -0,0 +1,344 @@
+"""
+Throughput suite for the hot paths of every game mode, run as one command and stored as JSON with the
+machine it ran on, so later runs can be compared against it:
+
+    python suite.py --out baseline.json
+    python suite.py --compare baseline.json                        # run again and flag regressions
+    python suite.py --compare baseline.json --current new.json     # compare two stored runs
+
+Each case runs in its own process from its game folder, since the folders share module names such as
+main and agent. Cases whose imports are missing here (torch, tensorflow, ...) are reported as skipped;
+the ones that need the DQN game module also have a case covering the same path through trackkit alone.
+A case regresses when its median rate falls more than --threshold below the baseline's.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from importlib import metadata
+
+from common import ROOT, use_mode, seed_everything
+
+REPEATS = 5
+ACTION_PROBABILITIES = [0.15, 0.15, 0.6, 0.1]
+PACKAGES = ("numpy", "pygame", "neat-python", "torch", "tensorflow")
+
+
+def track_geometry(seed=0):
+    """Geometry of a fixed track, without rendering it."""
+    from trackkit import track_width, CachedTrack
+    width = track_width(seed)
+    return CachedTrack.build(seed, width, 100, render=False).geometry, width
+
+
+def catmull_rom_chain_case():
+    from trackkit import catmull_rom_chain, random_track_points
+    points = random_track_points(random.Random(0), 90)
+    return lambda: catmull_rom_chain(points, 100)
+
+
+def generate_track_case():
+    from trackkit import catmull_rom_chain, generate_track, random_track_points
+    curve_points = catmull_rom_chain(random_track_points(random.Random(0), 90), 100)
+    return lambda: generate_track(curve_points, 90)
+
+
+def draw_track_case():
+    import pygame
+    from trackkit.render import draw_track
+    geometry, width = track_geometry()
+    surface = pygame.Surface((800, 600))
+    return lambda: draw_track(surface, geometry.outer, geometry.inner, geometry.centreline, width)
+
+
+def env_step_case():
+    import numpy as np
+    from game_environment import GameEnvironment
+    env = GameEnvironment(headless=True, track_seed=0)
+    actions = iter(np.random.choice(4, size=10 ** 7, p=ACTION_PROBABILITIES).tolist())
+
+    def step():
+        if env.step(next(actions))[2]:
+            env.reset()
+    return step
+
+
+def vec_env_step_case():
+    import numpy as np
+    from vec_environment import VecGameEnvironment
+    env = VecGameEnvironment(64, track_seed=0)
+    actions = np.random.choice(4, size=(64, 64), p=ACTION_PROBABILITIES)
+    step = iter(range(10 ** 9))
+    return lambda: env.step(actions[next(step) % 64])
+
+
+def get_ray_distances_case():
+    from game_environment import GameEnvironment
+    env = GameEnvironment(headless=True, track_seed=0)
+    for _ in range(100):
+        env.step(2)
+    return env.get_ray_distances
+
+
+def rendered_track(seed=0):
+    """A fixed track with its background and on-track mask."""
+    from trackkit import track_width, CachedTrack
+    return CachedTrack.build(seed, track_width(seed), 100)
+
+
+def ray_cast_case(main):
+    """ray_cast of a game loop: the eight mask rays and the lines drawn for them, from one pose on the track."""
+    from trackkit import TrackMask
+    track = rendered_track()
+    main.track_mask = TrackMask(track.on_track, track.field)
+    x, y = track.geometry.centreline[50]
+    return lambda: main.ray_cast(x - main.new_width // 2, y - main.new_height // 2, 30.0)
+
+
+def neat_ray_cast_case():
+    import main
+    return ray_cast_case(main)
+
+
+def dqn_ray_cast_case():
+    import pygame
+    import updated_main
+    from trackkit.render import TrackLayer
+    background = pygame.Surface((updated_main.WIDTH, updated_main.HEIGHT))
+    updated_main.track_layer = TrackLayer(updated_main.screen, background)
+    return ray_cast_case(updated_main)
+
+
+def track_mask_cast_case():
+    """The mask march under every ray_cast, with the game loops' eight rays, without pygame or a game module."""
+    import numpy as np
+    from trackkit import SensorLayout, TrackMask
+    track = rendered_track()
+    track_mask = TrackMask(track.on_track, track.field)
+    sensors = SensorLayout(np.arange(-7, 1) * 45, max_length=150, sign=-1, bias=-90)
+    x, y = track.geometry.centreline[50]
+    dx, dy = sensors.directions(30.0)
+    return lambda: track_mask.cast(x, y, dx, dy, sensors.max_length)
+
+
+def check_radars_case():
+    from types import SimpleNamespace
+    from agent import check_radars
+    from trackkit import TrackMask
+    from trackkit.render import render_track
+    geometry, width = track_geometry()
+    track_mask = TrackMask.from_surface(render_track(geometry.outer, geometry.inner, geometry.centreline, width))
+    x, y = geometry.centreline[50]
+    car = SimpleNamespace(center=[float(x), float(y)], angle=30, radars=[])
+    return lambda: check_radars([car], track_mask)
+
+
+def is_within_track_case():
+    import pygame
+    import main
+    from trackkit import TrackCorridor
+    geometry, _ = track_geometry()
+    main.track_corridor = TrackCorridor(geometry.resampled())
+    main.angle = 30.0
+    car_rect = pygame.Rect(0, 0, main.new_width, main.new_height)
+    car_rect.center = tuple(int(v) for v in geometry.centreline[50])
+    return lambda: main.is_within_track(car_rect, geometry.inner, geometry.outer)
+
+
+def calculate_target_angle_case():
+    import updated_main
+    from trackkit import CentrelineTracker
+    geometry, _ = track_geometry()
+    tracker = CentrelineTracker(geometry)
+    points = geometry.centreline.tolist()
+    step = iter(range(10 ** 9))
+    return lambda: updated_main.calculate_target_angle(*points[next(step) % len(points)], tracker, speed=0.5)
+
+
+def centreline_target_case():
+    """The centreline lookups of calculate_target_angle, without the DQN game module."""
+    import numpy as np
+    from trackkit import CentrelineTracker
+    geometry, _ = track_geometry()
+    tracker = CentrelineTracker(geometry)
+    points = geometry.centreline.tolist()
+    offsets = 5 * tracker.spacing * np.arange(1, 4)
+    step = iter(range(10 ** 9))
+
+    def lookup():
+        index, _ = tracker.update(*points[next(step) % len(points)])
+        turn = np.abs(tracker.curvature_ahead(index, offsets)).max() * offsets[-1]
+        return tracker.ahead(index, offsets / (1 + min(turn, 1.0)))
+    return lookup
+
+
+# Name: (game folder the case runs from, setup returning the function to time)
+CASES = {
+    "catmull_rom_chain": ("DQN", catmull_rom_chain_case),
+    "generate_track": ("DQN", generate_track_case),
+    "draw_track": ("Main_Game", draw_track_case),
+    "GameEnvironment.step": ("DQN", env_step_case),
+    "VecGameEnvironment.step, 64 cars": ("DQN", vec_env_step_case),
+    "get_ray_distances": ("DQN", get_ray_distances_case),
+    "ray_cast, NEAT_Agent2": ("NEAT_Agent2", neat_ray_cast_case),
+    "ray_cast, DQN": ("DQN", dqn_ray_cast_case),
+    "TrackMask.cast, 8 rays": ("DQN", track_mask_cast_case),
+    "check_radars, one car": ("NEAT_Agent2", check_radars_case),
+    "is_within_track": ("Main_Game", is_within_track_case),
+    "calculate_target_angle": ("DQN", calculate_target_angle_case),
+    "CentrelineTracker lookups": ("DQN", centreline_target_case),
+}
+
+
+def run_case(name, result_file):
+    """Time one case in this process and write its result as JSON to result_file."""
+    folder, setup = CASES[name]
+    use_mode(folder)
+    seed_everything(0)
+    try:
+        func = setup()
+    except ImportError as error:
+        result = {"skipped": str(error)}
+    else:
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        rates = [number / seconds for seconds in timer.repeat(REPEATS, number)]
+        result = {"median": statistics.median(rates), "best": max(rates), "number": number, "rates": rates}
+    result["folder"] = folder
+    with open(result_file, "w") as file:
+        json.dump(result, file)
+
+
+def run_suite(names):
+    results = {}
+    environment = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    for name in names:
+        handle, result_file = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        try:
+            process = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-case", name,
+                                      "--result-file", result_file], capture_output=True, text=True, env=environment)
+            if process.returncode == 0:
+                with open(result_file) as file:
+                    result = json.load(file)
+            else:
+                lines = process.stderr.strip().splitlines()
+                result = {"error": lines[-1] if lines else f"exit code {process.returncode}"}
+        finally:
+            os.remove(result_file)
+        results[name] = result
+        print(format_result(name, result), flush=True)
+    return results
+
+
+def format_result(name, result):
+    if "median" in result:
+        return f"{name:<40} {result['median']:>12.1f} /s"
+    if "skipped" in result:
+        return f"{name:<40} {'skipped':>12}   {result['skipped']}"
+    return f"{name:<40} {'error':>12}   {result['error']}"
+
+
+def machine_metadata():
+    packages = {}
+    for package in PACKAGES:
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "node": platform.node(),
+        "packages": packages,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print every case against the baseline and return the names of the ones that regressed."""
+    for key in ("machine", "processor", "cpu_count", "python", "platform"):
+        if baseline["metadata"].get(key) != current["metadata"].get(key):
+            print(f"warning: the baseline ran on another {key} ({baseline['metadata'].get(key)} "
+                  f"against {current['metadata'].get(key)}), differences may not be regressions")
+    print(f"{'case':<40} {'baseline':>12} {'current':>12}  change")
+    regressions = []
+    for name in dict.fromkeys([*baseline["results"], *current["results"]]):
+        before = baseline["results"].get(name, {}).get("median")
+        after = current["results"].get(name, {}).get("median")
+        if before is None or after is None:
+            before, after = (f"{rate:.1f}" if rate is not None else "-" for rate in (before, after))
+            print(f"{name:<40} {before:>12} {after:>12}  not compared")
+            continue
+        ratio = after / before
+        flag = ""
+        if ratio < 1 - threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio > 1 + threshold:
+            flag = "  faster"
+        print(f"{name:<40} {before:>12.1f} {after:>12.1f}  {ratio - 1:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="suite_results.json", help="where to write this run's results")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to flag regressions against")
+    parser.add_argument("--current", help="compare this results file instead of running the suite")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="fraction the median rate may drop before it counts as a regression, "
+                             "runs on one machine vary by around 10%%")
+    parser.add_argument("--only", nargs="+", metavar="TEXT", help="run the cases whose name contains any TEXT")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        run_case(args.run_case, args.result_file)
+        return
+    if args.list:
+        for name, (folder, _) in CASES.items():
+            print(f"{name:<40} {folder}")
+        return
+
+    if args.current:
+        with open(args.current) as file:
+            current = json.load(file)
+    else:
+        names = [name for name in CASES if not args.only or any(text in name for text in args.only)]
+        current = {"metadata": machine_metadata(), "results": run_suite(names)}
+        with open(args.out, "w") as file:
+            json.dump(current, file, indent=2)
+        print(f"results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
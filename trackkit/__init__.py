@@ -0,0 +1,15 @@
+"""
+Track generation, geometry and sensing shared by every game mode. Everything here needs only
+NumPy; drawing lives in trackkit.render, which imports pygame, and is left out of this namespace.
+The game modes import it directly, each entry point puts the repository root on sys.path first.
+"""
+from .settings import TRACK_WIDTH, TRACK_WIDTH_RANGE, track_width
+from .geometry import (GENERATOR_VERSION, START_INDEX, TrackGeometry, catmull_rom_chain, corner_angles,
+                       generate_track, random_track_points, remove_boundary_loops, resample_centreline,
+                       segment_crossings)
+from .cache import CachedTrack, TrackCache
+from .library import TrackLibrary
+from .field import SignedDistanceField, TrackMask
+from .sensors import SensorLayout
+from .corridor import CentrelineTracker, TrackCorridor
+from .spatial_index import SpatialGrid
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import random
+import tempfile
+
+import numpy as np
+
+from .field import SignedDistanceField
+from .geometry import GENERATOR_VERSION, TrackGeometry, catmull_rom_chain, random_track_points
+
+# At the repository root whichever folder a game is started from
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'track_cache')
+GRASS_COLOR = (0, 170, 0)
+
+
+class CachedTrack:
+    """
+    Everything an episode needs from a generated track: its control points, the
+    TrackGeometry arrays, the rendered background, the on-track mask (indexed [x, y]
+    like pygame.surfarray) with its SignedDistanceField and the start pose. Tracks
+    built or loaded without rendering have no background, mask or field.
+    """
+
+    def __init__(self, seed, track_points, geometry, background, on_track, start_pose, field=None):
+        self.seed = seed
+        self.track_points = track_points
+        self.geometry = geometry
+        self.background = background
+        self.on_track = on_track
+        self.start_pose = start_pose
+        self.field = field
+        self._surface = None
+
+    @classmethod
+    def build(cls, seed, track_width, num_points, size=(800, 600), min_corner_angle=None, render=True):
+        """
+        Generate the track for a seed from scratch, see random_track_points for min_corner_angle.
+        Control points are drawn from the seed until their boundaries do not cross themselves.
+        With render False only the geometry is made and pygame is not imported.
+        """
+        rng = random.Random(seed)
+        while True:
+            track_points = random_track_points(rng, min_corner_angle)
+            geometry = TrackGeometry(catmull_rom_chain(track_points, num_points), track_width)
+            if geometry.is_simple():
+                break
+        return cls.from_geometry(seed, track_points, geometry, size, render)
+
+    @classmethod
+    def from_geometry(cls, seed, track_points, geometry, size=(800, 600), render=True):
+        """
+        A track for control points and a TrackGeometry made elsewhere, e.g. a TrackLibrary entry.
+        The background, mask and field are drawn here unless render is False.
+        """
+        if not render:
+            return cls(seed, track_points, geometry, None, None, geometry.start_pose())
+
+        import pygame
+        from .render import render_track
+
+        surface = render_track(geometry.outer, geometry.inner, geometry.centreline, geometry.track_width, size,
+                               GRASS_COLOR)
+        background = pygame.surfarray.array3d(surface)
+        on_track = np.any(background != GRASS_COLOR, axis=2)
+        return cls(seed, track_points, geometry, background, on_track, geometry.start_pose(),
+                   SignedDistanceField.from_mask(on_track))
+
+    def surface(self):
+        """The rendered background as a pygame Surface, made on first use."""
+        if self._surface is None:
+            import pygame
+
+            self._surface = pygame.surfarray.make_surface(self.background)
+        return self._surface
+
+
+class TrackCache:
+    """
+    Tracks stored on disk under a hash of everything that determines them: the
+    seed, track width, points per spline segment, frame size, corner angle limit
+    and GENERATOR_VERSION.
+    A seed that was played before loads from one compressed .npz bundle instead of
+    being generated and rendered again. Tracks drawn from a random seed are never
+    asked for again, so they are built without being stored.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+
+    @staticmethod
+    def key(seed, track_width, num_points, size=(800, 600), min_corner_angle=None):
+        params = {'seed': seed, 'track_width': track_width, 'num_points': num_points,
+                  'size': list(size), 'min_corner_angle': min_corner_angle, 'version': GENERATOR_VERSION}
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+    def path(self, seed, track_width, num_points, size=(800, 600), min_corner_angle=None):
+        return os.path.join(self.directory, self.key(seed, track_width, num_points, size, min_corner_angle) + '.npz')
+
+    def get(self, seed, track_width, num_points, size=(800, 600), min_corner_angle=None, render=True):
+        """
+        The track for a seed, loaded from the cache or built and stored there.
+        :param seed: Integer seed, or None to build a track for a seed drawn from the random module
+                     without touching the cache
+        :param min_corner_angle: As for random_track_points
+        :param render: False skips the background, neither decoding it nor drawing it. Bundles stored
+                       without one are rendered and stored again when a background is asked for.
+        :return: CachedTrack
+        """
+        if seed is None:
+            return CachedTrack.build(random.randrange(2 ** 32), track_width, num_points, size, min_corner_angle, render)
+        path = self.path(seed, track_width, num_points, size, min_corner_angle)
+        if os.path.exists(path):
+            try:
+                return self.load(path, track_width, render)
+            except (OSError, ValueError, KeyError):
+                pass  # Unreadable bundle, e.g. from an interrupted write, or one without a background: build it again
+        track = CachedTrack.build(seed, track_width, num_points, size, min_corner_angle, render)
+        self.save(path, track)
+        return track
+
+    @staticmethod
+    def load(path, track_width, render=True):
+        with np.load(path) as data:
+            geometry = TrackGeometry.from_arrays(track_width, data)
+            if not render:
+                return CachedTrack(int(data['seed']), [tuple(p) for p in data['track_points'].tolist()], geometry,
+                                   None, None, tuple(data['start_pose'].tolist()))
+            background = data['background']
+            on_track = np.unpackbits(data['on_track'], count=background.shape[0] * background.shape[1])
+            field = SignedDistanceField(data['field'], int(data['field_block_size']))
+            return CachedTrack(int(data['seed']), [tuple(p) for p in data['track_points'].tolist()], geometry,
+                               background, on_track.reshape(background.shape[:2]).astype(bool),
+                               tuple(data['start_pose'].tolist()), field)
+
+    def save(self, path, track):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a half-written bundle behind
+        handle, temporary = tempfile.mkstemp(suffix='.npz', dir=self.directory)
+        images = {}
+        if track.background is not None:
+            images = {'background': track.background, 'on_track': np.packbits(track.on_track),
+                      'field': track.field.values, 'field_block_size': track.field.block_size}
+        with os.fdopen(handle, 'wb') as file:
+            np.savez_compressed(file, seed=track.seed, track_points=np.array(track.track_points),
+                                start_pose=np.array(track.start_pose), **images, **track.geometry.arrays())
+        os.replace(temporary, path)
@@ -0,0 +1,159 @@
+import math
+
+import numpy as np
+
+
+class TrackCorridor:
+    """
+    The track as a corridor of half width track_width / 2 around its centreline.
+    Points are projected onto the nearest centreline segment and their lateral
+    offset is compared with the half width. The segment found last is cached,
+    so while the car drives along the track only a few segments around it are
+    tested and the lookup is amortised O(1).
+    """
+
+    def __init__(self, geometry, window=None):
+        """
+        :param geometry: TrackGeometry of the track
+        :param window: Number of segments searched on each side of the cached one,
+                       by default as many as cover one track width of centreline
+        """
+        # catmull_rom_chain repeats the joint between spline segments, skip those empty segments
+        moving = geometry.segment_lengths > 0
+        self.starts = geometry.centreline[moving]
+        self.vectors = geometry.segment_vectors[moving]
+        self.lengths_sq = geometry.segment_lengths[moving] ** 2
+        self.half_width = geometry.track_width / 2
+        if window is None:
+            window = int(np.ceil(geometry.track_width / np.median(geometry.segment_lengths[moving])))
+        self.window = np.arange(-window, window + 1)
+        self.last = 0
+
+    def _project(self, points, segments):
+        """
+        Signed lateral offsets of points from the given segments.
+        :param points: (N, 2) array
+        :param segments: (N, K) or (K,) segment indices to test for each point
+        :return: (N, K) offsets, positive to the left of the driving direction
+        """
+        px = points[:, 0:1] - self.starts[segments, 0]
+        py = points[:, 1:2] - self.starts[segments, 1]
+        vx = self.vectors[segments, 0]
+        vy = self.vectors[segments, 1]
+        t = np.clip((px * vx + py * vy) / self.lengths_sq[segments], 0.0, 1.0)
+        # Beyond the ends of a segment the distance to its end point is used
+        distance = np.hypot(px - t * vx, py - t * vy)
+        return np.where(vx * py - vy * px < 0, -distance, distance)
+
+    def locate(self, points):
+        """
+        Nearest centreline segment and signed lateral offset for each point.
+        The window of segments around the cached one is searched first and moved
+        along the track while the nearest segment sits at its edge. Points that are
+        not inside the corridor there fall back to a search over all segments.
+        :param points: (N, 2) array or a single (x, y) point
+        :return: (segment index, offset) arrays of shape (N,)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        rows = np.arange(len(points))
+        last = self.last
+        for _ in range(len(self.starts) // len(self.window) + 1):
+            segments = (last + self.window) % len(self.starts)
+            offsets = self._project(points, segments)
+            best = np.abs(offsets).argmin(axis=1)
+            # Follow the first point, which the cache is kept for
+            if 0 < best[0] < len(self.window) - 1:
+                break
+            last = int(segments[best[0]])
+        index = segments[best]
+        offset = offsets[rows, best]
+
+        missed = np.abs(offset) > self.half_width
+        if missed.any():
+            # Another part of the track may still be close, so only a full search can tell
+            all_offsets = self._project(points[missed], np.arange(len(self.starts)))
+            nearest = np.abs(all_offsets).argmin(axis=1)
+            index[missed] = nearest
+            offset[missed] = all_offsets[np.arange(len(nearest)), nearest]
+
+        self.last = int(index[0])
+        return index, offset
+
+    def contains(self, points):
+        """On-track flags for an (N, 2) array of points."""
+        _, offset = self.locate(points)
+        return np.abs(offset) <= self.half_width
+
+
+class CentrelineTracker:
+    """
+    Follows a car along the centreline. The index of the closest centreline point
+    is remembered between updates, so each update only searches a small window
+    around it; the whole centreline is searched only after a reset or when the
+    car jumps further than the window reaches. Arc length and curvature come
+    precomputed with the TrackGeometry, so look-ahead targets cost the same at
+    any track resolution.
+    """
+
+    def __init__(self, geometry, reach=50.0):
+        """
+        :param geometry: TrackGeometry of the track
+        :param reach: Arc length in pixels searched on each side of the last match,
+                      moves further than this between updates count as a jump
+        """
+        self.points = geometry.centreline
+        self.arc_length = geometry.arc_length
+        self.length = geometry.length
+        self.curvature = geometry.curvature
+        self.spacing = self.length / (len(self.points) - 1)  # Mean arc length between points
+        self.reach = reach
+        window = int(math.ceil(reach / self.spacing))
+        self.window = np.arange(-window, window + 1)
+
+        self.reset()
+
+    def reset(self):
+        """Forget the last match, the next update searches the whole centreline."""
+        self.index = None
+        self.last_position = None
+
+    def update(self, x, y):
+        """
+        Closest centreline point to (x, y).
+        :return: (index, distance)
+        """
+        jumped = self.last_position is None or \
+            math.hypot(x - self.last_position[0], y - self.last_position[1]) > self.reach
+        self.last_position = (x, y)
+        if jumped:
+            distances = np.hypot(self.points[:, 0] - x, self.points[:, 1] - y)
+            self.index = int(distances.argmin())
+            return self.index, float(distances[self.index])
+
+        # Move the window along while the closest point sits at its edge
+        index = self.index
+        for _ in range(len(self.points) // len(self.window) + 1):
+            candidates = (index + self.window) % len(self.points)
+            distances = np.hypot(self.points[candidates, 0] - x, self.points[candidates, 1] - y)
+            best = int(distances.argmin())
+            index = int(candidates[best])
+            if 0 < best < len(self.window) - 1:
+                break
+        self.index = index
+        return index, float(distances[best])
+
+    def point_at(self, arc_length):
+        """Centreline points at the given arc lengths, wrapping around the closed track."""
+        arc_length = np.asarray(arc_length, dtype=float) % self.length
+        i = np.clip(np.searchsorted(self.arc_length, arc_length, side='right') - 1, 0, len(self.points) - 2)
+        t = (arc_length - self.arc_length[i]) / (self.arc_length[i + 1] - self.arc_length[i])
+        return self.points[i] + t[..., None] * (self.points[i + 1] - self.points[i])
+
+    def ahead(self, index, distances):
+        """Centreline points the given arc-length distances ahead of point index."""
+        return self.point_at(self.arc_length[index] + np.asarray(distances, dtype=float))
+
+    def curvature_ahead(self, index, distances):
+        """Signed curvature (radians per pixel) the given distances ahead of point index."""
+        arc_length = (self.arc_length[index] + np.asarray(distances, dtype=float)) % self.length
+        return np.interp(arc_length, self.arc_length, self.curvature)
@@ -0,0 +1,158 @@
+import math
+
+import numpy as np
+
+
+def _block_distance(inside, frame_is_edge, limit):
+    """
+    Euclidean distance in blocks from every block to the nearest block that is not inside, up to limit.
+    One pass down the columns, then the exact minimum over the rows within limit blocks.
+    """
+    columns, rows = inside.shape
+    index = np.arange(rows)
+    far = rows + limit
+    previous = np.maximum.accumulate(np.where(inside, -1 if frame_is_edge else -far, index), axis=1)
+    following = np.minimum.accumulate(np.where(inside, rows if frame_is_edge else rows + far, index)[:, ::-1],
+                                      axis=1)[:, ::-1]
+    column_sq = np.minimum(np.minimum(index - previous, following - index), limit).astype(float) ** 2
+    distance_sq = np.full(inside.shape, float(limit) ** 2)
+    if frame_is_edge:
+        x = np.arange(columns)
+        distance_sq = np.minimum(distance_sq, (np.minimum(x + 1, columns - x)[:, None].astype(float)) ** 2)
+    for shift in range(-limit, limit + 1):
+        low, high = max(0, -shift), min(columns, columns - shift)
+        np.minimum(distance_sq[low:high], shift ** 2 + column_sq[low + shift:high + shift], out=distance_sq[low:high])
+    return np.sqrt(distance_sq)
+
+
+class SignedDistanceField:
+    """
+    Signed distance to the track edge, positive on the track and negative on the grass, on blocks
+    of block_size pixels. Built from the on-track mask, so it agrees with the drawn track. Every
+    value is a lower bound for each pixel of its block, so a ray can jump over the free distance
+    and still stop at the same pixel a pixel-by-pixel march would. Blocks the edge runs through
+    hold 0, for those the mask has to be asked.
+    """
+
+    def __init__(self, values, block_size):
+        """
+        :param values: (columns, rows) float32 array of signed distances in pixels, one per block
+        :param block_size: Side length of a block in pixels
+        """
+        self.values = np.asarray(values, dtype=np.float32)
+        self.block_size = int(block_size)
+        self.columns, self.rows = self.values.shape
+
+    @classmethod
+    def from_mask(cls, on_track, block_size=4, limit=48):
+        """
+        :param on_track: (width, height) boolean mask indexed [x, y]; outside it counts as off the track
+        :param limit: Distances are only resolved up to limit blocks, further ones are stored as limit blocks
+        """
+        width, height = on_track.shape
+        columns, rows = -(-width // block_size), -(-height // block_size)
+        padded = np.zeros((columns * block_size, rows * block_size), dtype=bool)
+        padded[:width, :height] = on_track
+        in_frame = np.zeros(padded.shape, dtype=bool)
+        in_frame[:width, :height] = True
+        track = padded.reshape(columns, block_size, rows, block_size).all(axis=(1, 3))
+        grass = (in_frame & ~padded).reshape(columns, block_size, rows, block_size).all(axis=(1, 3))
+        # Two pixels of blocks b and b' are at least block_size * |b - b'| minus a block diagonal apart
+        diagonal = (block_size - 1) * math.sqrt(2)
+        clearance = np.maximum(block_size * _block_distance(track, True, limit) - diagonal, 0)
+        depth = np.maximum(block_size * _block_distance(grass, False, limit) - diagonal, 0)
+        return cls(np.where(track, clearance, -depth), block_size)
+
+    def sample(self, xs, ys):
+        """Signed distance at arrays of pixel coordinates, 0 outside the frame."""
+        xs = np.asarray(xs).astype(np.intp) // self.block_size
+        ys = np.asarray(ys).astype(np.intp) // self.block_size
+        inside = (xs.view(np.uintp) < self.columns) & (ys.view(np.uintp) < self.rows)
+        return self.values[xs * inside, ys * inside] * inside
+
+    def free_steps(self, xs, ys):
+        """
+        Whole pixel steps a ray may take from each point without passing an off-track pixel. Points
+        and samples are truncated to pixels, which moves each by under a pixel per axis, hence the
+        2 * sqrt(2) kept back from the distance.
+        """
+        return np.maximum(self.sample(xs, ys) - 2 * math.sqrt(2), 0).astype(np.intp)
+
+
+class TrackMask:
+    """
+    Boolean occupancy grid of a rendered track, indexed [x, y] like
+    pygame.surfarray: True on the track, False on the grass colour.
+    Built once per map; sensors then sample many pixels per NumPy call
+    instead of calling Surface.get_at pixel by pixel, and with a
+    SignedDistanceField skip the free stretch of each ray.
+    """
+
+    def __init__(self, on_track, field=None):
+        """
+        :param on_track: (width, height) boolean array
+        :param field: SignedDistanceField of the same mask, e.g. CachedTrack.field, None to march every pixel
+        """
+        self.on_track = np.asarray(on_track, dtype=bool)
+        self.width, self.height = self.on_track.shape
+        self.flat = np.ascontiguousarray(self.on_track).ravel()
+        self.field = field
+
+    @classmethod
+    def from_surface(cls, surface, border_color=(0, 170, 0)):
+        import pygame
+
+        # pixels3d is a view on the surface memory, so no per-pixel calls or copies
+        pixels = pygame.surfarray.pixels3d(surface)
+        grass = (pixels[..., 0] == border_color[0]) & \
+                (pixels[..., 1] == border_color[1]) & \
+                (pixels[..., 2] == border_color[2])
+        del pixels  # Unlock the surface
+        return cls(~grass, SignedDistanceField.from_mask(~grass))
+
+    def contains(self, xs, ys):
+        """On-track flags for arrays of pixel coordinates; anything outside the frame is off the track."""
+        xs = np.asarray(xs).astype(np.intp)
+        ys = np.asarray(ys).astype(np.intp)
+        # Negative coordinates wrap around to huge unsigned values, so one compare per axis
+        inside = (xs.view(np.uintp) < self.width) & (ys.view(np.uintp) < self.height)
+        # Flat index computed in place, pixels outside the frame read index 0 and are masked out
+        xs *= self.height
+        xs += ys
+        xs *= inside
+        return self.flat[xs] & inside
+
+    def cast(self, xs, ys, dxs, dys, max_length, chunk=32, jumps=2):
+        """
+        March many rays in one call, e.g. every radar of a whole population of cars.
+        With a field each ray first jumps over the free distance around it, jumps times;
+        then steps are tested a chunk at a time and rays that already hit drop out.
+        :param xs, ys: Ray origins, broadcast against the directions (e.g. shape (N, 1) for N cars)
+        :param dxs, dys: Unit ray directions, e.g. shape (N, rays)
+        :return: First length in [1, max_length) that is off the track for each ray, or max_length if none is,
+                 same shape as dxs
+        """
+        dxs = np.asarray(dxs, dtype=float)
+        shape = dxs.shape
+        xs = np.broadcast_to(xs, shape).ravel()
+        ys = np.broadcast_to(ys, shape).ravel()
+        dxs = dxs.ravel()
+        dys = np.asarray(dys, dtype=float).ravel()
+        starts = np.ones(dxs.size, dtype=np.intp)
+        if self.field is not None:
+            for _ in range(jumps):
+                starts += self.field.free_steps(xs + dxs * starts, ys + dys * starts)
+        result = np.full(dxs.size, max_length)
+        pending = np.flatnonzero(starts < max_length)
+        starts = starts[pending]
+        steps = np.arange(chunk)
+        while len(pending):
+            lengths = starts[:, None] + steps
+            on_track = self.contains(xs[pending, None] + dxs[pending, None] * lengths,
+                                     ys[pending, None] + dys[pending, None] * lengths) & (lengths < max_length)
+            first = on_track.argmin(axis=1)  # First off-track step or the end of the ray, 0 if neither
+            hit = ~on_track[np.arange(len(pending)), first]
+            result[pending[hit]] = lengths[hit, first[hit]]
+            pending = pending[~hit]
+            starts = starts[~hit] + chunk
+        return result.reshape(shape)
@@ -0,0 +1,418 @@
+import math
+import random
+
+import numpy as np
+
+QUADRUPLE_SIZE = 4
+START_INDEX = 5  # Boundary point cars start at, a few points in to avoid track boundary issues
+GENERATOR_VERSION = 3  # Bump whenever a change here changes the track a seed produces, it invalidates cached tracks
+
+def num_segments(point_chain: tuple) -> int:
+    # There is 1 segment per 4 points, so we must subtract 3 from the number of points
+    return len(point_chain) - (QUADRUPLE_SIZE - 1)
+
+def corner_angles(points) -> np.ndarray:
+    """
+    Interior angle in degrees at every corner of a closed polygon, the corner at point i + 1
+    lying between points i and i + 2.
+    :param points: (N, 2) points, or (..., N, 2) for a batch of polygons
+    """
+    points = np.asarray(points, dtype=float)
+    B = np.roll(points, -1, axis=-2)
+    BA = points - B
+    BC = np.roll(points, -2, axis=-2) - B
+    cos_theta = np.sum(BA * BC, axis=-1) / (np.linalg.norm(BA, axis=-1) * np.linalg.norm(BC, axis=-1))
+    return np.degrees(np.arccos(np.clip(cos_theta, -1, 1)))
+
+def random_track_points(rng=random, min_corner_angle=None):
+    """
+    The six random control points every game mode builds its track from, closed by repeating the first three.
+    :param rng: Source of randomness, e.g. random.Random(seed) for a reproducible track
+    :param min_corner_angle: If given, points are drawn again until every corner of the six is wider than this
+    :return: List of 9 (x, y) points for catmull_rom_chain
+    """
+    while True:
+        track_points = []
+        for i in range(6):
+            if i < 6 // 2:
+                track_points.append((rng.randint(40 + (i % 3) * 240, 40 + ((i % 3) + 1) * 240),
+                                     40 + rng.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
+            else:
+                track_points.append((rng.randint(40 + (2 - (i % 3)) * 240, 40 + (3 - (i % 3)) * 240),
+                                     50 + rng.randint((i // 3) * 250, ((i // 3) + 1) * 250)))
+        if min_corner_angle is None or corner_angles(track_points).min() > min_corner_angle:
+            break
+
+    for i in range(6 // 2):
+        track_points.append(track_points[i])
+    return track_points
+
+def catmull_rom_spline(P0: tuple, P1: tuple, P2: tuple, P3: tuple, num_points: int, alpha: float = 0.5):
+    """
+    Compute the points in the spline segment
+    :param P0, P1, P2, and P3: The (x,y) point pairs that define the Catmull-Rom spline
+    :param num_points: The number of points to include in the resulting curve segment
+    :param alpha: 0.5 for the centripetal spline, 0.0 for the uniform spline, 1.0 for the chordal spline.
+    :return: The points
+    """
+    def tj(ti: float, pi: tuple, pj: tuple) -> float:
+        xi, yi = pi
+        xj, yj = pj
+        dx, dy = xj - xi, yj - yi
+        l = (dx ** 2 + dy ** 2) ** 0.5
+        return ti + l ** alpha
+
+    t0: float = 0.0
+    t1: float = tj(t0, P0, P1)
+    t2: float = tj(t1, P1, P2)
+    t3: float = tj(t2, P2, P3)
+    t = np.linspace(t1, t2, num_points).reshape(num_points, 1)
+
+    A1 = (t1 - t) / (t1 - t0) * P0 + (t - t0) / (t1 - t0) * P1
+    A2 = (t2 - t) / (t2 - t1) * P1 + (t - t1) / (t2 - t1) * P2
+    A3 = (t3 - t) / (t3 - t2) * P2 + (t - t2) / (t3 - t2) * P3
+    B1 = (t2 - t) / (t2 - t0) * A1 + (t - t0) / (t2 - t0) * A2
+    B2 = (t3 - t) / (t3 - t1) * A2 + (t - t1) / (t3 - t1) * A3
+    points = (t2 - t) / (t2 - t1) * B1 + (t - t1) / (t2 - t1) * B2
+    return points
+
+def catmull_rom_chain(points: tuple, num_points: int, alpha: float = 0.5) -> np.ndarray:
+    """
+    Calculate Catmull-Rom for a sequence of initial points and return the combined curve.
+    All segments are evaluated at once, broadcasting over an (S, 4, 2) tensor of their control points.
+    :param points: Base points from which the quadruples for the algorithm are taken
+    :param num_points: The number of points to include in each curve segment
+    :param alpha: As for catmull_rom_spline
+    :return: The chain of all points (points of all segments) as an (S * num_points, 2) float array
+    """
+    points = np.asarray(points, dtype=float)
+    # Quadruple i is points[i:i + 4]
+    quadruples = points[np.arange(num_segments(points))[:, None] + np.arange(QUADRUPLE_SIZE)]
+
+    # Knots of every segment, shaped (S, 1) to broadcast over its curve points
+    steps = np.diff(quadruples, axis=1)
+    knots = np.cumsum(((steps[..., 0] ** 2 + steps[..., 1] ** 2) ** 0.5) ** alpha, axis=1)
+    t1, t2, t3 = (knots[:, d, None] for d in range(QUADRUPLE_SIZE - 1))
+    t = np.linspace(t1[:, 0], t2[:, 0], num_points, axis=1)  # (S, num_points), t0 = 0
+
+    # The recursion of catmull_rom_spline, with each level a blend of the control points:
+    # the four blend weights are worked out on scalars and applied to the points at the end
+    a10, a11 = (t1 - t) / t1, t / t1  # A1 = a10 P0 + a11 P1
+    a21, a22 = (t2 - t) / (t2 - t1), (t - t1) / (t2 - t1)  # A2 = a21 P1 + a22 P2
+    a32, a33 = (t3 - t) / (t3 - t2), (t - t2) / (t3 - t2)  # A3 = a32 P2 + a33 P3
+    b11, b12 = (t2 - t) / t2, t / t2  # B1 = b11 A1 + b12 A2
+    b22, b23 = (t3 - t) / (t3 - t1), (t - t1) / (t3 - t1)  # B2 = b22 A2 + b23 A3
+    c1, c2 = a21, a22  # points = c1 B1 + c2 B2, the same blend as A2
+    weights = np.stack([c1 * b11 * a10,
+                        c1 * (b11 * a11 + b12 * a21) + c2 * b22 * a21,
+                        c1 * b12 * a22 + c2 * (b22 * a22 + b23 * a32),
+                        c2 * b23 * a33], axis=2)  # (S, num_points, 4)
+    chain = weights @ quadruples
+    # Every segment runs from P1 to P2, set its ends exactly so the joints repeat without rounding noise
+    chain[:, 0] = quadruples[:, 1]
+    chain[:, -1] = quadruples[:, 2]
+    return chain.reshape(-1, 2)
+
+def perpendicular(v):
+    return np.array([-v[1], v[0]])
+
+def generate_track(curve_points, track_width, miter_limit=None):
+    """
+    Offset the centreline to both sides to get the track boundaries, all points in one array operation.
+    Each point is offset along the normal of the segment to the next point; points where that segment
+    has no length (the repeated joints of catmull_rom_chain) are skipped.
+    :param curve_points: Centreline points, the last one connects back to the first
+    :param track_width: Full width of the track in pixels
+    :param miter_limit: None to offset along the segment normal, rounded down to whole pixels as the
+                        boundaries always have been. Otherwise offset along the bisector of the two
+                        segments meeting at each point, lengthened so the boundary stays track_width / 2
+                        from both, but to at most miter_limit times that at sharp corners
+    :return: (outer_points, inner_points) float arrays of shape (N, 2)
+    """
+    points = np.asarray(curve_points, dtype=float).reshape(-1, 2)
+
+    # Direction (tangent vector) from each point to the next, wrapping around for the closed shape
+    tangents = np.roll(points, -1, axis=0) - points
+    lengths = np.sqrt(tangents[:, 0] * tangents[:, 0] + tangents[:, 1] * tangents[:, 1])
+    keep = lengths != 0
+    points = points[keep]
+    tangents = tangents[keep] / lengths[keep, None]  # Normalize
+
+    # Get the perpendicular (normal vector)
+    normals = np.column_stack([-tangents[:, 1], tangents[:, 0]])
+
+    if miter_limit is None:
+        offsets = normals * track_width // 2
+    else:
+        bisectors = normals + np.roll(normals, 1, axis=0)
+        norms = np.sqrt(np.einsum('ij,ij->i', bisectors, bisectors))
+        # A full reversal has no bisector, fall back to the segment normal there
+        straight = norms < 1e-9
+        bisectors[straight] = normals[straight]
+        norms[straight] = 1.0
+        bisectors /= norms[:, None]
+        cos_half = np.einsum('ij,ij->i', bisectors, normals)
+        scale = 1.0 / np.maximum(cos_half, 1.0 / miter_limit)
+        offsets = bisectors * (scale * track_width / 2)[:, None]
+
+    # Offset points to create track width
+    return points - offsets, points + offsets
+
+def segment_crossings(points, cell_size=None) -> np.ndarray:
+    """
+    Pairs of edges of a closed polyline that cross each other. Edges are hashed into a uniform grid
+    of cells about one edge long and only edges sharing a cell are tested, so with a bounded number
+    of edges per cell finding them costs a sort, O(n log n), instead of testing all O(n^2) pairs.
+    Edges that meet at a shared point are not counted as crossing, and zero-length edges, such as
+    the points remove_boundary_loops collapses onto one crossing, never cross anything.
+    :param points: (N, 2) vertices, edge i runs from point i to point i + 1 and the last one back to point 0
+    :param cell_size: Grid cell side, by default the median edge length
+    :return: (K, 2) integer array of crossing edge pairs (i, j) with i < j
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(points)
+    starts = points
+    ends = np.roll(points, -1, axis=0)
+    index = np.flatnonzero(np.any(starts != ends, axis=1))
+    if not len(index):
+        return np.empty((0, 2), dtype=np.int64)
+    low = np.minimum(starts[index], ends[index])
+    high = np.maximum(starts[index], ends[index])
+    if cell_size is None:
+        cell_size = float(np.median(np.hypot(*(high - low).T)))
+    # Keep the grid within 2^20 cells per axis so flat cell numbers fit an int64
+    origin = low.min(axis=0)
+    cell_size = max(cell_size, float((high.max(axis=0) - origin).max()) / 2 ** 20, 1e-9)
+    first = ((low - origin) // cell_size).astype(np.int64)
+    last = ((high - origin) // cell_size).astype(np.int64)
+    rows = int(last[:, 1].max()) + 1
+
+    # List every edge in each cell its bounding box touches, long edges over several cells
+    spans = last - first + 1
+    counts = spans[:, 0] * spans[:, 1]
+    owner = np.repeat(np.arange(len(index)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cells = (first[owner, 0] + offset % spans[owner, 0]) * rows + first[owner, 1] + offset // spans[owner, 0]
+    order = np.argsort(cells, kind='stable')
+    edges = index[owner[order]]
+    cells = cells[order]
+
+    # Candidate pairs: entries d places apart in the sorted list that share a cell,
+    # d only runs up to the fullest cell
+    candidates = []
+    for d in range(1, len(cells)):
+        same = cells[:-d] == cells[d:]
+        if not same.any():
+            break
+        candidates.append(np.sort(np.column_stack([edges[:-d][same], edges[d:][same]]), axis=1))
+    if not candidates:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.unique(np.concatenate(candidates), axis=0)
+    gap = pairs[:, 1] - pairs[:, 0]
+    pairs = pairs[(gap > 1) & (gap < n - 1)]  # Neighbouring edges share a point
+
+    def side(p, q, r):
+        return np.sign((q[:, 0] - p[:, 0]) * (r[:, 1] - p[:, 1]) - (q[:, 1] - p[:, 1]) * (r[:, 0] - p[:, 0]))
+
+    a, b = starts[pairs[:, 0]], ends[pairs[:, 0]]
+    c, d = starts[pairs[:, 1]], ends[pairs[:, 1]]
+    crossing = (side(a, b, c) * side(a, b, d) < 0) & (side(c, d, a) * side(c, d, b) < 0)
+    return pairs[crossing]
+
+def remove_boundary_loops(points, max_loop_length, max_passes=10) -> np.ndarray:
+    """
+    Offsetting a bend tighter than half the track width folds the boundary over itself into a small loop.
+    Cut such loops off: the points between two crossing edges all move onto their crossing point, so the
+    number of points, and which centreline point each belongs to, stays the same.
+    :param points: (N, 2) closed boundary as returned by generate_track
+    :param max_loop_length: Only loops up to this long are removed; longer crossings, where separate
+                            parts of the track overlap, are left for the caller to reject
+    :return: Repaired copy of points
+    """
+    points = np.array(points, dtype=float).reshape(-1, 2)
+    n = len(points)
+    for _ in range(max_passes):
+        steps = np.hypot(*(np.roll(points, -1, axis=0) - points).T)
+        arc_length = np.concatenate([[0.0], np.cumsum(steps)])
+        repaired = False
+        for i, j in segment_crossings(points):
+            a, b = points[i], points[(i + 1) % n]
+            c, d = points[j], points[(j + 1) % n]
+            ab, cd = b - a, d - c
+            denominator = ab[0] * cd[1] - ab[1] * cd[0]
+            if denominator == 0:
+                continue  # An earlier repair in this pass already moved these edges
+            t = ((c[0] - a[0]) * cd[1] - (c[1] - a[1]) * cd[0]) / denominator
+            if not 0 <= t <= 1:
+                continue
+            crossing_point = a + t * ab
+            # The loop is the shorter way round between the two edges
+            inside = arc_length[j] - arc_length[i + 1]
+            if inside <= arc_length[-1] - inside:
+                loop = np.arange(i + 1, j + 1)
+                length = inside
+            else:
+                loop = np.arange(j + 1, i + 1 + n) % n
+                length = arc_length[-1] - inside
+            if length <= max_loop_length:
+                points[loop] = crossing_point
+                repaired = True
+        if not repaired:
+            break
+    return points
+
+def resample_centreline(curve_points, track_width, tolerance=0.5, max_spacing=None, max_turn=0.5):
+    """
+    Re-place the centreline points by arc length so that straights get few points and bends many.
+    Between two samples the chord may stray at most tolerance pixels from the curve, for the
+    centreline and for both boundaries: a chord over an arc of length s at curvature k strays
+    about s^2 (k + k^2 w / 2) / 8 on the boundary on the outside of the bend, which is the worst.
+    :param curve_points: Closed centreline as returned by catmull_rom_chain
+    :param track_width: Full width of the track in pixels
+    :param tolerance: Allowed chord error in pixels
+    :param max_spacing: Longest step between samples, by default the track width
+    :param max_turn: Input points where the centreline turns more than this many radians, the
+                     cusps a spline can have, are kept as samples as they are
+    :return: Closed (M, 2) centreline, last point equal to the first like catmull_rom_chain
+    """
+    points = np.asarray(curve_points, dtype=float).reshape(-1, 2)
+    steps = np.hypot(*np.diff(points, axis=0).T)
+    points = np.concatenate([points[:1], points[1:][steps > 0]])  # Drop the repeated joints
+    steps = steps[steps > 0]
+    arc_length = np.concatenate([[0.0], np.cumsum(steps)])
+    if max_spacing is None:
+        max_spacing = track_width
+
+    # Turn at each point between its two steps, wrapping around the closed loop to point 0
+    headings = np.arctan2(*np.diff(points, axis=0)[:, ::-1].T)
+    turns = np.roll((np.diff(headings, append=headings[:1]) + np.pi) % (2 * np.pi) - np.pi, 1)
+    curvature = np.abs(turns) / ((steps + np.roll(steps, 1)) / 2)
+    curvature = np.append(curvature, curvature[0])
+    spacing = np.minimum(np.sqrt(8 * tolerance / np.maximum(curvature + curvature ** 2 * track_width / 2, 1e-12)),
+                         max_spacing)
+
+    # Samples needed up to each point; the samples sit at equal steps of that count
+    needed = np.concatenate([[0.0], np.cumsum(steps / np.minimum(spacing[:-1], spacing[1:]))])
+    count = max(int(math.ceil(needed[-1])), 3)
+    sample_arc = np.interp(np.linspace(0.0, needed[-1], count + 1), needed, arc_length)
+    sample_arc = np.union1d(sample_arc, arc_length[:-1][np.abs(turns) > max_turn])
+    return np.column_stack([np.interp(sample_arc, arc_length, points[:, 0]),
+                            np.interp(sample_arc, arc_length, points[:, 1])])
+
+def polyline_distance(points, polyline, chunk=256):
+    """
+    Distance from each point to the closest edge of a closed polyline.
+    :param points: (N, 2) points
+    :param polyline: (M, 2) vertices, the last one connects back to the first
+    :return: (N,) distances
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    starts = np.asarray(polyline, dtype=float).reshape(-1, 2)
+    vectors = np.roll(starts, -1, axis=0) - starts
+    lengths_sq = np.maximum(np.einsum('ij,ij->i', vectors, vectors), 1e-12)
+    distances = np.empty(len(points))
+    for begin in range(0, len(points), chunk):
+        offsets = points[begin:begin + chunk, None, :] - starts
+        t = np.clip(np.einsum('ijk,jk->ij', offsets, vectors) / lengths_sq, 0.0, 1.0)
+        gaps = offsets - t[..., None] * vectors
+        distances[begin:begin + chunk] = np.sqrt(np.einsum('ijk,ijk->ij', gaps, gaps).min(axis=1))
+    return distances
+
+class TrackGeometry:
+    """
+    The shape of one track, computed once when the track is built and kept as
+    contiguous float arrays: centreline, both boundaries, the centreline segments
+    with their unit tangents and normals, cumulative arc length and curvature.
+    Rendering, sensing, collision and progress code all read these arrays.
+    """
+
+    ARRAYS = ('centreline', 'outer', 'inner', 'segment_vectors', 'segment_lengths',
+              'tangents', 'normals', 'arc_length', 'curvature')
+
+    def __init__(self, curve_points, track_width, miter_limit=None):
+        """
+        :param curve_points: Centreline points as returned by catmull_rom_chain
+        :param track_width: Full width of the track in pixels
+        :param miter_limit: Boundary joints, as for generate_track
+        """
+        self.track_width = track_width
+        self.centreline = np.ascontiguousarray(curve_points, dtype=float).reshape(-1, 2)
+        self.outer, self.inner = generate_track(self.centreline, track_width, miter_limit)
+        # Cut off the loops the boundaries fold into around bends tighter than half the track width
+        self.outer = remove_boundary_loops(self.outer, 2 * track_width)
+        self.inner = remove_boundary_loops(self.inner, 2 * track_width)
+
+        # Segment i runs from centreline point i to point i + 1, the last one closes the loop
+        self.segment_vectors = np.roll(self.centreline, -1, axis=0) - self.centreline
+        self.segment_lengths = np.hypot(self.segment_vectors[:, 0], self.segment_vectors[:, 1])
+        # catmull_rom_chain repeats the joint between spline segments, those segments
+        # have no length and get a zero tangent and normal
+        moving = self.segment_lengths > 0
+        self.tangents = np.zeros_like(self.segment_vectors)
+        self.tangents[moving] = self.segment_vectors[moving] / self.segment_lengths[moving, None]
+        self.normals = np.column_stack([-self.tangents[:, 1], self.tangents[:, 0]])  # As perpendicular()
+
+        # Arc length along the chain up to each point; the chain ends where it started
+        steps = self.segment_lengths[:-1]
+        self.arc_length = np.concatenate([[0.0], np.cumsum(steps)])
+        self.length = self.arc_length[-1]
+
+        # Curvature from the turn between neighbouring steps, skipping the repeated joints
+        moving = steps > 0
+        headings = np.arctan2(self.segment_vectors[:-1][moving, 1], self.segment_vectors[:-1][moving, 0])
+        turns = (np.diff(headings) + np.pi) % (2 * np.pi) - np.pi
+        lengths = steps[moving]
+        joints = np.cumsum(lengths)[:-1]  # Arc length at the point between two steps
+        self.curvature = np.interp(self.arc_length, joints, turns / ((lengths[:-1] + lengths[1:]) / 2))
+
+    @classmethod
+    def from_arrays(cls, track_width, arrays):
+        """
+        Rebuild a geometry from previously computed arrays without recomputing anything.
+        :param arrays: Mapping with an entry for every name in ARRAYS, as returned by arrays()
+        """
+        geometry = cls.__new__(cls)
+        geometry.track_width = track_width
+        for name in cls.ARRAYS:
+            setattr(geometry, name, np.ascontiguousarray(arrays[name], dtype=float))
+        geometry.length = geometry.arc_length[-1]
+        return geometry
+
+    def arrays(self):
+        """The precomputed arrays by name, e.g. to store them with numpy.savez."""
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def start_pose(self, index=START_INDEX):
+        """
+        Where a car starts: the midpoint between the boundaries at point index, facing the next one.
+        :return: (x, y, angle) with the angle in degrees as the game modes use it
+        """
+        x, y = (self.outer[index] + self.inner[index]) / 2
+        next_x, next_y = (self.outer[index + 1] + self.inner[index + 1]) / 2
+        return float(x), float(y), -math.degrees(math.atan2(next_y - y, next_x - x))
+
+    def crossings(self):
+        """Edge pairs where the outer and the inner boundary still cross themselves, see segment_crossings."""
+        return segment_crossings(self.outer), segment_crossings(self.inner)
+
+    def is_simple(self):
+        """False if a boundary crosses itself, e.g. where two parts of the track overlap; such tracks are rejected."""
+        return not any(len(pairs) for pairs in self.crossings())
+
+    def resampled(self, tolerance=0.5, max_spacing=None):
+        """
+        The same track with far fewer points, e.g. for sensors and collision checks that scan every
+        segment: the centreline is resampled by resample_centreline and the boundaries are offset
+        along the bisectors, so they stay half the track width from the centreline between samples.
+        The largest distance of a point of this geometry from the resampled one is kept as resample_error.
+        """
+        centreline = resample_centreline(self.centreline, self.track_width, tolerance, max_spacing)
+        geometry = TrackGeometry(centreline, self.track_width, miter_limit=2)
+        geometry.resample_error = float(max(polyline_distance(self.centreline, geometry.centreline).max(),
+                                            polyline_distance(self.outer, geometry.outer).max(),
+                                            polyline_distance(self.inner, geometry.inner).max()))
+        return geometry
+
+    def distance_to_outer(self, point):
+        """Distance from an (x, y) point to the closest outer boundary point."""
+        return float(np.hypot(self.outer[:, 0] - point[0], self.outer[:, 1] - point[1]).min())
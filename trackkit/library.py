@@ -0,0 +1,188 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .cache import CachedTrack
+from .geometry import TrackGeometry, catmull_rom_chain, corner_angles
+
+NUM_CONTROL_POINTS = 6
+BATCH_SIZE = 4096
+
+
+def random_track_points_batch(rng, count):
+    """
+    Many draws of the six-point generator of random_track_points at once.
+    :param rng: numpy.random.Generator
+    :return: (count, 6, 2) integer array of control points, not yet closed
+    """
+    i = np.arange(NUM_CONTROL_POINTS)
+    top = i < NUM_CONTROL_POINTS // 2
+    # The same ranges as random_track_points: left to right along the top, right to left along the bottom
+    x_low = np.where(top, 40 + (i % 3) * 240, 40 + (2 - (i % 3)) * 240)
+    x_high = np.where(top, 40 + ((i % 3) + 1) * 240, 40 + (3 - (i % 3)) * 240)
+    y_low = np.where(top, 40, 50) + (i // 3) * 250
+    y_high = np.where(top, 40, 50) + ((i // 3) + 1) * 250
+    x = rng.integers(x_low, x_high, size=(count, NUM_CONTROL_POINTS), endpoint=True)
+    y = rng.integers(y_low, y_high, size=(count, NUM_CONTROL_POINTS), endpoint=True)
+    return np.stack([x, y], axis=2)
+
+
+def valid_control_points(points, min_corner_angle=90, min_point_distance=None, simple=True):
+    """
+    Validity checks for a batch of control polygons, each one an array operation over the whole batch.
+    :param points: (count, N, 2) control points, not closed
+    :param min_corner_angle: Every corner must be wider than this many degrees, None to skip
+    :param min_point_distance: Every pair of control points must be at least this far apart, None to skip
+    :param simple: Reject polygons whose edges cross each other
+    :return: (count,) boolean array
+    """
+    points = np.asarray(points, dtype=float)
+    count, n, _ = points.shape
+    valid = np.ones(count, dtype=bool)
+    if min_corner_angle is not None:
+        valid &= (corner_angles(points) > min_corner_angle).all(axis=1)
+    if min_point_distance is not None:
+        distances = np.linalg.norm(points[:, :, None] - points[:, None], axis=3)
+        distances[:, np.arange(n), np.arange(n)] = np.inf
+        valid &= (distances >= min_point_distance).all(axis=(1, 2))
+    if simple:
+        # Edge i runs from point i to point i + 1; test every pair of edges that share no point
+        i, j = np.triu_indices(n, 2)
+        apart = (j - i) % n != n - 1
+        i, j = i[apart], j[apart]
+        a, b = points[:, i], points[:, (i + 1) % n]
+        c, d = points[:, j], points[:, (j + 1) % n]
+
+        def side(p, q, r):
+            return np.sign((q[..., 0] - p[..., 0]) * (r[..., 1] - p[..., 1]) -
+                           (q[..., 1] - p[..., 1]) * (r[..., 0] - p[..., 0]))
+        crossing = (side(a, b, c) * side(a, b, d) < 0) & (side(c, d, a) * side(c, d, b) < 0)
+        valid &= ~crossing.any(axis=1)
+    return valid
+
+
+def _build_geometry(task):
+    """Worker function: one closed control polygon to its TrackGeometry arrays, and whether its boundaries are simple."""
+    track_points, track_width, num_points = task
+    geometry = TrackGeometry(catmull_rom_chain(track_points, num_points), track_width)
+    return geometry.arrays(), geometry.is_simple()
+
+
+class TrackLibrary:
+    """
+    A fixed, indexable set of valid tracks for training and evaluation. The same
+    seed and parameters always give the same tracks, in the same order, whatever
+    the number of worker processes. library[i] is the TrackGeometry of track i, and
+    library.track(i) a CachedTrack the environments can drive on.
+    """
+
+    def __init__(self, track_points, track_width, num_points, arrays, seed=None):
+        """
+        :param track_points: (count, 9, 2) closed control points
+        :param arrays: One dict of TrackGeometry arrays per track
+        """
+        self.track_points = np.asarray(track_points)
+        self.track_width = track_width
+        self.num_points = num_points
+        self.arrays = arrays
+        self.seed = seed
+
+    @classmethod
+    def generate(cls, count, seed, track_width, num_points, workers=None, **checks):
+        """
+        Draw candidates in large batches and filter them with the checks, then build
+        their splines and boundaries spread over a process pool, until count tracks
+        with boundaries that do not cross themselves are found.
+        :param workers: Number of processes, None uses every CPU; with one, tracks are built in this process
+        :param checks: Passed on to valid_control_points
+        """
+        rng = np.random.default_rng(seed)
+        checks.setdefault('min_corner_angle', 90)
+        workers = os.cpu_count() if workers is None else workers
+        executor = ProcessPoolExecutor(workers) if workers > 1 else None
+        pending = np.empty((0, NUM_CONTROL_POINTS, 2), dtype=np.int64)
+        track_points = []
+        arrays = []
+        try:
+            while len(arrays) < count:
+                while len(pending) < count - len(arrays):
+                    candidates = random_track_points_batch(rng, BATCH_SIZE)
+                    pending = np.concatenate([pending, candidates[valid_control_points(candidates, **checks)]])
+                # Build the next candidates in order, so the result does not depend on the worker count.
+                # Tracks whose boundaries still cross themselves are rejected.
+                batch, pending = pending[:count - len(arrays)], pending[count - len(arrays):]
+                # Close every polygon by repeating its first three points, as catmull_rom_chain needs
+                batch = np.concatenate([batch, batch[:, :3]], axis=1)
+                tasks = [(points, track_width, num_points) for points in batch]
+                if executor is None:
+                    results = map(_build_geometry, tasks)
+                else:
+                    results = executor.map(_build_geometry, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+                for points, (geometry_arrays, simple) in zip(batch, results):
+                    if simple:
+                        track_points.append(points)
+                        arrays.append(geometry_arrays)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return cls(track_points, track_width, num_points, arrays, seed)
+
+    def __len__(self):
+        return len(self.track_points)
+
+    def __getitem__(self, index):
+        return TrackGeometry.from_arrays(self.track_width, self.arrays[index])
+
+    def track(self, index, size=(800, 600), render=False):
+        """
+        Track index as a CachedTrack, for GameEnvironment(track=...) or CarSimulation.use_track.
+        Its seed is the index, as library tracks have no seed of their own.
+        :param render: Also draw the background, mask and distance field, which pygame is needed for
+        """
+        track_points = [tuple(point) for point in self.track_points[index].tolist()]
+        return CachedTrack.from_geometry(index, track_points, self[index], size, render)
+
+    def save(self, path):
+        """Store the library in one .npz file, every geometry array concatenated over the tracks."""
+        data = {'track_points': self.track_points, 'track_width': self.track_width,
+                'num_points': self.num_points, 'seed': -1 if self.seed is None else self.seed}
+        for name in TrackGeometry.ARRAYS:
+            parts = [arrays[name] for arrays in self.arrays]
+            data[name] = np.concatenate(parts)
+            data[name + '_offsets'] = np.cumsum([0] + [len(part) for part in parts])
+        np.savez_compressed(path, **data)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = [{} for _ in range(len(data['track_points']))]
+            for name in TrackGeometry.ARRAYS:
+                values, offsets = data[name], data[name + '_offsets']
+                for i, track in enumerate(arrays):
+                    track[name] = values[offsets[i]:offsets[i + 1]]
+            seed = int(data['seed'])
+            return cls(data['track_points'], float(data['track_width']), int(data['num_points']), arrays,
+                       None if seed < 0 else seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded library of valid tracks.")
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--track-width', type=int, default=90)
+    parser.add_argument('--num-points', type=int, default=100)
+    parser.add_argument('--min-corner-angle', type=float, default=90)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='track_library.npz')
+    args = parser.parse_args()
+
+    library = TrackLibrary.generate(args.count, args.seed, args.track_width, args.num_points, args.workers,
+                                    min_corner_angle=args.min_corner_angle)
+    library.save(args.out)
+    print(f"Saved {len(library)} tracks to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
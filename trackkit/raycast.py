@@ -0,0 +1,130 @@
+import numpy as np
+
+
+def polyline_segments(points):
+    """
+    Turn a polyline into segment arrays that can be reused for every ray cast.
+    :param points: Sequence of (x, y) points, consecutive points form one segment
+    :return: (starts, vectors) float arrays of shape (S, 2)
+    """
+    points = np.asarray(points, dtype=float)
+    return points[:-1].copy(), np.diff(points, axis=0)
+
+
+class RayWorkspace:
+    """
+    Scratch arrays for cast_rays with R rays against S segments. Passing the same
+    workspace to every cast keeps the per-step sensing free of new arrays.
+    """
+
+    def __init__(self, num_rays, num_segments):
+        shape = (num_rays, num_segments)
+        self.ray_dx = np.empty((num_rays, 1))
+        self.ray_dy = np.empty((num_rays, 1))
+        self.to_seg_x = np.empty(num_segments)
+        self.to_seg_y = np.empty(num_segments)
+        self.along_ray = np.empty(num_segments)
+        self.seg_scratch = np.empty(num_segments)
+        self.denom = np.empty(shape)
+        self.t = np.empty(shape)
+        self.u = np.empty(shape)
+        self.scratch = np.empty(shape)
+        self.parallel = np.empty(shape, dtype=bool)
+        self.hit = np.empty(shape, dtype=bool)
+        self.flags = np.empty(shape, dtype=bool)
+        self.closest = np.empty(num_rays)
+
+    @property
+    def shape(self):
+        return self.denom.shape
+
+
+def cast_rays(origin_x, origin_y, dir_x, dir_y, max_length, seg_starts, seg_vectors, out=None, workspace=None):
+    """
+    Cast every ray against every segment in one broadcasted pass.
+    :param origin_x, origin_y: Start point shared by all rays
+    :param dir_x, dir_y: Unit ray directions, shape (R,)
+    :param max_length: Length of each ray, also returned when nothing is hit
+    :param seg_starts, seg_vectors: Segment arrays from polyline_segments
+    :param out: Optional (R,) array the distances are written to
+    :param workspace: Optional RayWorkspace of shape (R, S) for the temporaries
+    :return: Distance to the closest hit for each ray, shape (R,)
+    """
+    if workspace is None:
+        workspace = RayWorkspace(len(dir_x), len(seg_starts))
+    w = workspace
+    np.multiply(dir_x, max_length, out=w.ray_dx[:, 0])
+    np.multiply(dir_y, max_length, out=w.ray_dy[:, 0])
+
+    seg_dx = seg_vectors[:, 0]
+    seg_dy = seg_vectors[:, 1]
+    np.subtract(seg_starts[:, 0], origin_x, out=w.to_seg_x)
+    np.subtract(seg_starts[:, 1], origin_y, out=w.to_seg_y)
+
+    # denom = ray_dx * seg_dy - ray_dy * seg_dx
+    np.multiply(w.ray_dx, seg_dy, out=w.denom)
+    np.multiply(w.ray_dy, seg_dx, out=w.scratch)
+    np.subtract(w.denom, w.scratch, out=w.denom)
+    np.abs(w.denom, out=w.scratch)
+    np.less(w.scratch, 1e-8, out=w.parallel)
+    np.copyto(w.denom, 1.0, where=w.parallel)
+
+    # t is the position along the ray, u the position along the segment
+    np.multiply(w.to_seg_x, seg_dy, out=w.along_ray)
+    np.multiply(w.to_seg_y, seg_dx, out=w.seg_scratch)
+    np.subtract(w.along_ray, w.seg_scratch, out=w.along_ray)
+    np.divide(w.along_ray, w.denom, out=w.t)
+    np.multiply(w.to_seg_x, w.ray_dy, out=w.u)
+    np.multiply(w.to_seg_y, w.ray_dx, out=w.scratch)
+    np.subtract(w.u, w.scratch, out=w.u)
+    np.divide(w.u, w.denom, out=w.u)
+
+    # hit = ~parallel & (0 <= t <= 1) & (0 <= u <= 1)
+    np.logical_not(w.parallel, out=w.hit)
+    for values in (w.t, w.u):
+        np.greater_equal(values, 0, out=w.flags)
+        w.hit &= w.flags
+        np.less_equal(values, 1, out=w.flags)
+        w.hit &= w.flags
+    np.logical_not(w.hit, out=w.flags)
+    np.copyto(w.t, 1.0, where=w.flags)
+    w.t.min(axis=1, initial=1.0, out=w.closest)
+    return np.multiply(w.closest, max_length, out=out)
+
+
+def cast_rays_indexed(origin_x, origin_y, dir_x, dir_y, max_length, seg_starts, seg_vectors, grid):
+    """
+    Same result as cast_rays, but each ray is only tested against the segments
+    stored in the grid cells it crosses, so the work depends on the geometry
+    near the car rather than on the size of the whole track.
+    Origins may also be arrays that broadcast against the directions, so the rays of
+    many cars are cast in one call, e.g. origins of shape (N, 1) with directions of shape (N, R).
+    :param grid: SpatialGrid built with SpatialGrid.from_segments over the same segments
+    :return: Distance to the closest hit for each ray, same shape as dir_x
+    """
+    dir_x = np.asarray(dir_x, dtype=float)
+    shape = dir_x.shape
+    dir_x = dir_x.ravel()
+    dir_y = np.asarray(dir_y, dtype=float).ravel()
+    origin_x = np.broadcast_to(origin_x, shape).ravel()
+    origin_y = np.broadcast_to(origin_y, shape).ravel()
+    ray, seg = grid.query_rays(origin_x, origin_y, dir_x, dir_y, max_length)
+
+    ray_dx = max_length * dir_x[ray]
+    ray_dy = max_length * dir_y[ray]
+    seg_dx = seg_vectors[seg, 0]
+    seg_dy = seg_vectors[seg, 1]
+    to_seg_x = seg_starts[seg, 0] - origin_x[ray]
+    to_seg_y = seg_starts[seg, 1] - origin_y[ray]
+
+    denom = ray_dx * seg_dy - ray_dy * seg_dx
+    parallel = np.abs(denom) < 1e-8
+    denom = np.where(parallel, 1.0, denom)
+    t = (to_seg_x * seg_dy - to_seg_y * seg_dx) / denom
+    u = (to_seg_x * ray_dy - to_seg_y * ray_dx) / denom
+    hit = ~parallel & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+
+    closest = np.ones(len(dir_x))
+    np.minimum.at(closest, ray[hit], t[hit])
+    return (closest * max_length).reshape(shape)
+
@@ -0,0 +1,84 @@
+import pygame
+
+TRACK_COLOR = (100, 100, 100)
+LINE_GAP = 10  # Increased gap between line segments
+LINE_SEGMENT_LENGTH = 20  # Decreased length of each line segment
+LINE_WIDTH = 5  # Width of the line
+
+def draw_track(screen, outer_track, inner_track, chain_points, track_width):
+    # Draw the filled track area
+    track_color = (100, 100, 100)  # Color for the filled track area
+    for i in range(len(inner_track)):
+        next_i = (i + 1) % len(inner_track)
+        pygame.draw.polygon(screen, track_color, [inner_track[i], inner_track[next_i], outer_track[next_i], outer_track[i]])
+
+    # Draw the outer track boundary
+    pygame.draw.polygon(screen, track_color, outer_track, width=3)
+
+    # Draw the inner track boundary
+    pygame.draw.polygon(screen, track_color, inner_track, width=3)
+
+    # Draw the central white line in segments
+    segment_start = 0
+    while segment_start < len(chain_points):
+        segment_end = min(segment_start + LINE_SEGMENT_LENGTH, len(chain_points) - 1)
+        pygame.draw.lines(screen, (255, 255, 255), False, chain_points[segment_start:segment_end], width=LINE_WIDTH)
+        segment_start += LINE_SEGMENT_LENGTH + LINE_GAP
+
+def render_track(outer_track, inner_track, chain_points, track_width, size=(800, 600), background=(0, 170, 0)):
+    # Draw the track once onto its own surface, e.g. to build an occupancy mask from it
+    surface = pygame.Surface(size)
+    surface.fill(background)
+    draw_track(surface, outer_track, inner_track, chain_points, track_width)
+    return surface
+
+class TrackLayer:
+    """
+    Frame drawing for a track that does not change while it is driven. The track and the scenery
+    are drawn once onto a background surface. Each frame only the rectangles drawn over in the
+    last frame are restored from it, and only those and this frame's rectangles are sent to the
+    display, instead of redrawing every track polygon and updating the whole window.
+    """
+
+    def __init__(self, screen, background, scenery=()):
+        """
+        :param screen: Display surface the frames are drawn on
+        :param background: Surface with the rendered track, e.g. CachedTrack.surface()
+        :param scenery: (image, position) pairs of static sprites such as the grass tufts, drawn over
+                        the track and under everything drawn each frame
+        """
+        self.screen = screen
+        self.background = background.copy()
+        if pygame.display.get_surface() is not None:
+            self.background = self.background.convert()  # Match the display format for fast blits
+        for image, position in scenery:
+            self.background.blit(image, position)
+        self.last_frame = []
+        self.frame = []
+        self.full_update = True
+
+    def begin(self):
+        """Start a frame by restoring the background wherever the last frame drew."""
+        if self.full_update:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.last_frame:
+                self.screen.blit(self.background, rect, rect)
+
+    def mark(self, *rects):
+        """Record rectangles drawn over this frame, as returned by Surface.blit and pygame.draw."""
+        self.frame.extend(rects)
+
+    def blit(self, image, position):
+        rect = self.screen.blit(image, position)
+        self.frame.append(rect)
+        return rect
+
+    def end(self):
+        """Send the changed parts of the frame to the display: what was erased and what was drawn."""
+        if self.full_update:
+            pygame.display.update()
+            self.full_update = False
+        else:
+            pygame.display.update(self.last_frame + self.frame)
+        self.last_frame, self.frame = self.frame, []
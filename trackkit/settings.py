@@ -0,0 +1,22 @@
+import os
+import random
+
+TRACK_WIDTH_RANGE = (80, 100)
+
+
+def track_width(seed=None):
+    """
+    Track width in pixels, drawn from TRACK_WIDTH_RANGE with its own generator so the global
+    random state is left alone. The same seed always gives the same width, None a random one.
+    """
+    return random.Random(seed).randint(*TRACK_WIDTH_RANGE)
+
+
+def _track_width_from_environment():
+    """TRACK_WIDTH fixes the width, TRACK_WIDTH_SEED draws it reproducibly; otherwise a new width per run."""
+    if os.environ.get('TRACK_WIDTH'):
+        return int(os.environ['TRACK_WIDTH'])
+    return track_width(os.environ.get('TRACK_WIDTH_SEED') or None)
+
+
+TRACK_WIDTH = _track_width_from_environment()
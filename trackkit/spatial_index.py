@@ -0,0 +1,95 @@
+import numpy as np
+
+
+class SpatialGrid:
+    """
+    Uniform grid over the bounding boxes of the track's boundary segments, built once
+    per track. query_rays returns the segments stored in the cells each ray crosses,
+    so cast_rays_indexed only tests geometry along the rays. It serves batches of
+    cars; one car's rays are cheaper to test against every segment with cast_rays.
+    """
+
+    def __init__(self, mins, maxs, cell_size=32.0, ids=None):
+        """
+        :param mins, maxs: (M, 2) arrays with the bounding box corners of each item
+        :param cell_size: Side length of a grid cell in pixels
+        :param ids: Item id stored for each box, defaults to the box index
+        """
+        mins = np.asarray(mins, dtype=float).reshape(-1, 2)
+        maxs = np.asarray(maxs, dtype=float).reshape(-1, 2)
+        if ids is None:
+            ids = np.arange(len(mins))
+        ids = np.asarray(ids, dtype=np.intp)
+
+        self.cell_size = float(cell_size)
+        self.origin = mins.min(axis=0) if len(mins) else np.zeros(2)
+        extent = (maxs.max(axis=0) if len(maxs) else np.zeros(2)) - self.origin
+        self.shape = (np.floor(extent / self.cell_size).astype(np.intp) + 1)
+
+        lo = self._cell_coords(mins)
+        hi = self._cell_coords(maxs)
+        span = hi - lo + 1
+        counts = span[:, 0] * span[:, 1]
+
+        # Expand every box into the list of cells it covers
+        owner = np.repeat(np.arange(len(mins)), counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cx = lo[owner, 0] + offset % span[owner, 0]
+        cy = lo[owner, 1] + offset // span[owner, 0]
+        cells = self._cell_index(cx, cy)
+
+        order = np.argsort(cells, kind="stable")
+        self.items = ids[owner[order]]
+        self.cell_start = np.searchsorted(cells[order], np.arange(self.shape[0] * self.shape[1] + 1))
+
+    @classmethod
+    def from_segments(cls, starts, vectors, cell_size=32.0):
+        starts = np.asarray(starts, dtype=float)
+        ends = starts + np.asarray(vectors, dtype=float)
+        return cls(np.minimum(starts, ends), np.maximum(starts, ends), cell_size)
+
+    def _cell_coords(self, points):
+        coords = np.floor((np.asarray(points, dtype=float) - self.origin) / self.cell_size).astype(np.intp)
+        return np.clip(coords, 0, self.shape - 1)
+
+    def _cell_index(self, cx, cy):
+        return cy * self.shape[0] + cx
+
+    def _expand(self, cells):
+        """For each flat cell index, the positions in self.items of the ids stored there."""
+        starts = self.cell_start[cells]
+        counts = self.cell_start[cells + 1] - starts
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(np.arange(len(cells)), counts), np.repeat(starts, counts) + offset
+
+    def query_rays(self, x, y, dir_x, dir_y, length):
+        """
+        Candidate (ray, item) pairs for rays from (x, y), covering the cells each
+        ray crosses. Rays are sampled at most
+        one cell apart and both corner cells of each step are added, so diagonal
+        crossings are never missed. An item may appear more than once per ray.
+        :param x, y: Ray origins, a shared point or one per ray (broadcast against the directions)
+        :param dir_x, dir_y: Unit ray directions
+        :return: (ray_index, item_id) arrays of equal length, ray_index into dir_x.ravel()
+        """
+        dir_x = np.asarray(dir_x, dtype=float)
+        x = np.broadcast_to(x, dir_x.shape).reshape(-1, 1)
+        y = np.broadcast_to(y, dir_x.shape).reshape(-1, 1)
+        dir_x = dir_x.reshape(-1, 1)
+        dir_y = np.asarray(dir_y, dtype=float).reshape(-1, 1)
+        t = np.minimum(np.arange(0.0, length + self.cell_size, self.cell_size), length)
+        points = np.stack([x + dir_x * t, y + dir_y * t], axis=-1)
+        coords = self._cell_coords(points)
+        cx, cy = coords[..., 0], coords[..., 1]
+        cells = np.concatenate([
+            self._cell_index(cx, cy),
+            self._cell_index(cx[:, 1:], cy[:, :-1]),
+            self._cell_index(cx[:, :-1], cy[:, 1:]),
+        ], axis=1)
+        # Drop repeated cells within each ray; sorting short rows is cheaper than one np.unique
+        cells.sort(axis=1)
+        first = np.ones(cells.shape, dtype=bool)
+        first[:, 1:] = cells[:, 1:] != cells[:, :-1]
+        rays = np.broadcast_to(np.arange(len(dir_x))[:, None], cells.shape)[first]
+        ray_index, positions = self._expand(cells[first])
+        return rays[ray_index], self.items[positions]